@@ -0,0 +1,290 @@
+"""Micro-benchmarks for the hand lifecycle hot paths.
+
+Times hand evaluation and settlement, action validation, ``add_action``,
+repository (de)serialization and response formatting on synthetic hands
+generated by self-play from a fixed seed, bucketed by action count. Results can be saved
+as a baseline and later runs compared against it::
+
+    python -m app.cli.benchmark --save            # record benchmarks/baseline.json
+    python -m app.cli.benchmark                   # compare, exit 1 on regression
+    python -m app.cli.benchmark --filter evaluate --threshold 0.1
+
+Baselines are only meaningful on the machine that recorded them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+from app.cli.simulate import InProcessDriver, Recorder, load_policy, play_hand
+from app.models.codec import encode_hand
+from app.models.game import Hand
+from app.models.serialization import hand_to_json
+from app.repositories.hand_repository import hand_save_steps, hand_to_header_params, row_to_hand
+from app.services.game_service import GameService
+from app.services.settlement import settle_hand, settle_hands
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "benchmarks", "baseline.json"
+)
+
+# Action-count buckets for the synthetic hands: name -> (min, max) inclusive.
+BUCKETS = {"short": (1, 8), "medium": (9, 20), "long": (21, 1000)}
+
+
+def generate_hands(seed: int, per_bucket: int) -> Dict[str, List[Hand]]:
+    """Completed hands from seeded self-play, ``per_bucket`` per action-count bucket."""
+    async def play() -> List[Hand]:
+        driver = InProcessDriver(Recorder(), use_db=False)
+        policies = [load_policy(name) for name in ("random", "station", "aggressive") * 2]
+        rng = random.Random(seed)
+        repository = driver.service.hand_repository.repository
+        await driver.start()
+        try:
+            while any(len(hands) < per_bucket for hands in by_bucket.values()):
+                await play_hand(driver, policies, rng, 1000, driver.recorder)
+                hand = list(repository.hands.values())[-1]
+                for name, (low, high) in BUCKETS.items():
+                    if low <= len(hand.actions) <= high and len(by_bucket[name]) < per_bucket:
+                        by_bucket[name].append(hand)
+        finally:
+            await driver.stop()
+
+    by_bucket: Dict[str, List[Hand]] = {name: [] for name in BUCKETS}
+    asyncio.run(play())
+    return by_bucket
+
+
+def fresh_copy(service: GameService, hand: Hand) -> Hand:
+    """New hand with the same cards as ``hand`` and no actions taken."""
+    copy = service.create_new_hand([p.stack + p.total_invested for p in sorted(hand.players, key=lambda p: p.position)])
+    service.deal_hole_cards(copy, {p.position: p.hole_cards for p in hand.players})
+    return service.deal_board_cards(copy, hand.board_cards)
+
+
+def replay(service: GameService, hand: Hand, count: Optional[int] = None) -> Hand:
+    """Fresh copy of ``hand`` with its first ``count`` actions applied."""
+    copy = fresh_copy(service, hand)
+    for action in hand.actions[:count]:
+        copy = service.add_action(copy, action.player_position, action.action_type, action.amount)
+    return copy
+
+
+def hand_to_row(hand: Hand, binary: bool = False) -> Dict:
+    """Database row for a hand as HAND_SELECT returns it after a full flush."""
+    params = hand_to_header_params(hand, binary)
+    # Binary headers cover every flushed action, so no log tail is selected.
+    action_log = [] if binary else [[a.player_position, a.action_type, a.amount, a.round] for a in hand.actions]
+    return {
+        "id": params[0],
+        "players_data": params[1],
+        "actions_data": "[]",
+        "board_cards": params[2],
+        "pot_size": params[3],
+        "current_round": params[4],
+        "is_completed": params[5],
+        "winner_positions": params[6],
+        "winnings": params[7],
+        "created_at": params[8],
+        "actions_count": params[9],
+        "hand_data": params[10],
+        "version": params[11],
+        "action_log": json.dumps(action_log),
+    }
+
+
+def build_cases(hands: Dict[str, List[Hand]]) -> Dict[str, Callable[[], int]]:
+    """Benchmark callables by name; each returns the number of operations it ran."""
+    service = GameService()
+    engine = service.poker_engine
+    cases: Dict[str, Callable[[], int]] = {}
+
+    for bucket, bucket_hands in hands.items():
+        # Mid-hand states for validation: halfway through each hand's actions.
+        midway = [replay(service, hand, len(hand.actions) // 2) for hand in bucket_hands]
+        sessions = [engine.create_session(hand) for hand in midway]
+        actors = [session.actor_position() or 0 for session in sessions]
+        rows = [hand_to_row(hand) for hand in bucket_hands]
+        binary_rows = [hand_to_row(hand, binary=True) for hand in bucket_hands]
+
+        def evaluate_hand(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                engine.evaluate_hand(hand)
+            return len(bucket_hands)
+
+        def settle_hand_(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                settle_hand(hand)
+            return len(bucket_hands)
+
+        def settle_hands_batch(bucket_hands=bucket_hands):
+            settle_hands(bucket_hands)
+            return len(bucket_hands)
+
+        def validate_action(midway=midway, actors=actors):
+            for hand, position in zip(midway, actors):
+                engine.validate_action(hand, position, "call")
+            return len(midway)
+
+        def get_valid_actions(midway=midway, actors=actors):
+            for hand, position in zip(midway, actors):
+                engine.get_valid_actions(hand, position)
+            return len(midway)
+
+        def get_valid_actions_session(midway=midway, actors=actors, sessions=sessions):
+            for hand, position, session in zip(midway, actors, sessions):
+                engine.get_valid_actions(hand, position, session)
+            return len(midway)
+
+        def add_action(bucket_hands=bucket_hands):
+            # Per action, including building the session on the first one.
+            actions = 0
+            for hand in bucket_hands:
+                copy = fresh_copy(service, hand)
+                for action in hand.actions:
+                    copy = service.add_action(copy, action.player_position, action.action_type, action.amount)
+                actions += len(hand.actions)
+            return actions
+
+        def row_to_hand_(rows=rows):
+            for row in rows:
+                row_to_hand(row)
+            return len(rows)
+
+        def row_to_hand_binary(rows=binary_rows):
+            for row in rows:
+                row_to_hand(row)
+            return len(rows)
+
+        def save_serialization(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                hand_save_steps(hand)
+            return len(bucket_hands)
+
+        def save_serialization_binary(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                hand_save_steps(hand, binary=True)
+            return len(bucket_hands)
+
+        def format_hand_for_display(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                service.format_hand_for_display(hand)
+            return len(bucket_hands)
+
+        def hand_to_response(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                hand_to_json(hand)
+            return len(bucket_hands)
+
+        def hand_to_response_binary(bucket_hands=bucket_hands):
+            for hand in bucket_hands:
+                encode_hand(hand)
+            return len(bucket_hands)
+
+        cases.update({
+            f"evaluate_hand[{bucket}]": evaluate_hand,
+            f"settle_hand[{bucket}]": settle_hand_,
+            f"settle_hands[{bucket}]": settle_hands_batch,
+            f"validate_action[{bucket}]": validate_action,
+            f"get_valid_actions[{bucket}]": get_valid_actions,
+            f"get_valid_actions_session[{bucket}]": get_valid_actions_session,
+            f"add_action[{bucket}]": add_action,
+            f"row_to_hand[{bucket}]": row_to_hand_,
+            f"row_to_hand_binary[{bucket}]": row_to_hand_binary,
+            f"save_serialization[{bucket}]": save_serialization,
+            f"save_serialization_binary[{bucket}]": save_serialization_binary,
+            f"format_hand_for_display[{bucket}]": format_hand_for_display,
+            f"hand_to_response[{bucket}]": hand_to_response,
+            f"hand_to_response_binary[{bucket}]": hand_to_response_binary,
+        })
+    return cases
+
+
+def measure(func: Callable[[], int], repeat: int, min_time: float) -> Dict:
+    """Per-operation time in microseconds: median and best of ``repeat`` rounds."""
+    func()  # warm-up
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+
+    per_op = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ops = sum(func() for _ in range(loops))
+        per_op.append((time.perf_counter() - started) / ops * 1e6)
+    return {"median_us": round(statistics.median(per_op), 3), "min_us": round(min(per_op), 3)}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Cases whose median is more than ``threshold`` slower than the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and result["median_us"] > base["median_us"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hand lifecycle hot paths.")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic hands")
+    parser.add_argument("--hands", type=int, default=20, help="synthetic hands per action-count bucket")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case")
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per round")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(generate_hands(args.seed, args.hands))
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'case':<40}{'median us':>12}{'min us':>12}{'baseline':>12}{'change':>9}")
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, args.repeat, args.min_time)
+        line = f"{name:<40}{results[name]['median_us']:>12}{results[name]['min_us']:>12}"
+        base = baseline.get(name)
+        if base:
+            change = results[name]["median_us"] / base["median_us"] - 1
+            line += f"{base['median_us']:>12}{change:>+9.1%}"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "machine": platform.platform(),
+                "seed": args.seed,
+                "hands": args.hands,
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
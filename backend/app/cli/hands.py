@@ -0,0 +1,302 @@
+"""Bulk hand export, import and settlement checks.
+
+Exports stream hands newest first from a server-side cursor; imports load
+hands with COPY in batches, skipping ids that already exist; ``settle``
+re-settles stored completed hands in vectorized batches and reports those
+whose stored winnings differ; ``stats`` rolls completed hands missing from
+the player stats up in parallel, or rebuilds the stats from scratch;
+``reindex`` fills in the search columns of hands stored before they existed;
+``archive`` moves completed hands of old month partitions into compressed
+segment files and drops the partitions they empty; ``migrate-partitions``
+moves a hands table from before monthly partitioning, or partitioned by a
+``created_at`` without time zone, into TIMESTAMPTZ partitions, once, before
+the app can start on it::
+
+    python -m app.cli.hands export hands.phhs
+    python -m app.cli.hands export hands.pkhs --limit 100000
+    python -m app.cli.hands import hands.phhs --batch-size 5000
+    python -m app.cli.hands settle --limit 100000 --cross-check
+    python -m app.cli.hands stats --workers 8 --rebuild
+    python -m app.cli.hands reindex
+    python -m app.cli.hands archive --older-than-days 90
+    python -m app.cli.hands migrate-partitions
+
+The format follows the file extension (.phh/.phhs for PHH, anything else
+binary) unless ``--format`` is given; ``-`` reads stdin or writes stdout.
+"""
+import argparse
+import codecs
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.database.connection import init_database, migrate_hands_to_partitions
+from app.database.partitions import next_month
+from app.models.codec import STREAM_MAGIC, HandStreamDecoder, frame_hand
+from app.models.game import Hand
+from app.models.phh import PHHSDecoder, hand_to_phh
+from app.repositories.hand_repository import HandRepository, decode_cursor
+from app.repositories.stats_repository import StatsRepository
+from app.services.player_stats import hand_stat_rows
+from app.services.poker_engine import PokerEngine
+from app.services.settlement import settle_hands
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+def _format_for(path: str, format: Optional[str]) -> str:
+    if format:
+        return format
+    return "phh" if path.endswith((".phh", ".phhs")) else "binary"
+
+
+def _progress(label: str, count: int, started: float):
+    elapsed = time.perf_counter() - started
+    print(f"{label} {count} hands in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} hands/s)", file=sys.stderr)
+
+
+def export_hands(path: str, format: str, limit: Optional[int] = None, cursor: Optional[str] = None) -> int:
+    """Write hands to ``path``; returns how many were written."""
+    repository = HandRepository()
+    after = decode_cursor(cursor) if cursor else None
+    out = sys.stdout.buffer if path == "-" else open(path, "wb")
+    started = time.perf_counter()
+    count = 0
+    try:
+        if format == "binary":
+            out.write(STREAM_MAGIC)
+        for hand in repository.stream_hands(after, limit):
+            count += 1
+            if format == "binary":
+                out.write(frame_hand(hand))
+            else:
+                out.write(f"[{count}]\n{hand_to_phh(hand)}\n".encode())
+            if count % 100_000 == 0:
+                _progress("Exported", count, started)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    _progress("Exported", count, started)
+    return count
+
+
+def import_hands(path: str, format: str, batch_size: int = 5000) -> int:
+    """Load hands from ``path``; returns how many were inserted."""
+    repository = HandRepository()
+    decoder = PHHSDecoder() if format == "phh" else HandStreamDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")() if format == "phh" else None
+    source = sys.stdin.buffer if path == "-" else open(path, "rb")
+    started = time.perf_counter()
+    received = 0
+    imported = 0
+    batch: List[Hand] = []
+    try:
+        while True:
+            chunk = source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            batch.extend(decoder.feed(text_decoder.decode(chunk) if text_decoder else chunk))
+            if len(batch) >= batch_size:
+                received += len(batch)
+                imported += repository.bulk_insert_hands(batch)
+                batch = []
+                _progress("Read", received, started)
+        if text_decoder:
+            batch.extend(decoder.feed(text_decoder.decode(b"", final=True)))
+        batch.extend(decoder.close())
+        received += len(batch)
+        imported += repository.bulk_insert_hands(batch)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    _progress("Read", received, started)
+    print(f"Imported {imported}, skipped {received - imported} existing", file=sys.stderr)
+    return imported
+
+
+def settle_stored_hands(batch_size: int = 5000, limit: Optional[int] = None, cross_check: bool = False) -> int:
+    """Re-settle stored completed hands; returns how many differ from their stored winnings.
+
+    With ``cross_check`` every settled hand is also replayed through
+    ``PokerEngine.evaluate_hand`` and disagreements are reported.
+    """
+    repository = HandRepository()
+    engine = PokerEngine()
+    started = time.perf_counter()
+    counts = {"settled": 0, "unsettleable": 0, "differ": 0, "engine_mismatches": 0}
+    samples: List[str] = []
+
+    def settle(batch: List[Hand]):
+        for hand, winnings in zip(batch, settle_hands(batch)):
+            if winnings is None:
+                counts["unsettleable"] += 1
+                continue
+            counts["settled"] += 1
+            if winnings != hand.winnings:
+                counts["differ"] += 1
+                samples.append(f"{hand.id}: stored {hand.winnings}, settled {winnings}")
+            if cross_check and winnings != engine.evaluate_hand(hand):
+                counts["engine_mismatches"] += 1
+                samples.append(f"{hand.id}: settled {winnings}, pokerkit {engine.evaluate_hand(hand)}")
+
+    batch: List[Hand] = []
+    for hand in repository.stream_hands(limit=limit):
+        if hand.is_completed:
+            batch.append(hand)
+        if len(batch) >= batch_size:
+            settle(batch)
+            batch = []
+            _progress("Settled", counts["settled"], started)
+    settle(batch)
+    _progress("Settled", counts["settled"], started)
+    print(", ".join(f"{name} {count}" for name, count in counts.items()), file=sys.stderr)
+    for line in samples[:20]:
+        print(f"  {line}", file=sys.stderr)
+    return counts["differ"]
+
+
+def _backfill_partition(args) -> int:
+    """Roll up the unprocessed hands of one id-hash partition; returns how many."""
+    workers, worker, batch_size = args
+    repository = StatsRepository()
+    count = 0
+    rows = []
+    for hand in repository.stream_unprocessed_hands(workers, worker):
+        rows.extend(hand_stat_rows(hand))
+        count += 1
+        if count % batch_size == 0:
+            repository.record_hands(rows)
+            rows = []
+    repository.record_hands(rows)
+    return count
+
+
+def backfill_stats(workers: int = 4, batch_size: int = 2000, rebuild: bool = False) -> int:
+    """Roll completed hands missing from the player stats up; returns how many.
+
+    Hands are split by id hash across ``workers`` processes, each streaming
+    its partition and upserting ``batch_size`` hands per statement. Hands
+    rolled up meanwhile by the app are skipped, so the backfill can run
+    against a live database; ``rebuild`` empties the stats first.
+    """
+    repository = StatsRepository()
+    if rebuild:
+        repository.reset()
+    started = time.perf_counter()
+    jobs = [(workers, worker, batch_size) for worker in range(workers)]
+    if workers <= 1:
+        counts = [_backfill_partition(job) for job in jobs]
+    else:
+        # Spawned, so no worker inherits the parent's pooled connections.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            counts = list(pool.map(_backfill_partition, jobs))
+    _progress("Rolled up", sum(counts), started)
+    return sum(counts)
+
+
+def reindex_hands(batch_size: int = 5000) -> int:
+    """Write the search columns of hands that have none yet; returns how many."""
+    repository = HandRepository()
+    started = time.perf_counter()
+    count = 0
+    batch: List[Hand] = []
+    for hand in repository.stream_unindexed_hands():
+        batch.append(hand)
+        if len(batch) >= batch_size:
+            count += repository.set_search_columns(batch)
+            batch = []
+            _progress("Reindexed", count, started)
+    count += repository.set_search_columns(batch)
+    _progress("Reindexed", count, started)
+    return count
+
+
+def archive_old_hands(older_than_days: int = 90, segment_size: int = 100_000) -> int:
+    """Archive completed hands of the months that ended ``older_than_days`` ago; returns how many.
+
+    Each month is written as segments of up to ``segment_size`` hands. Hands
+    still in progress stay in their partition, which is dropped once empty.
+    """
+    repository = HandRepository()
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    started = time.perf_counter()
+    count = 0
+    stored = 0
+    for month in repository.list_partition_months():
+        if datetime.combine(next_month(month), datetime.min.time()) > cutoff:
+            continue
+        batch: List[Hand] = []
+        for hand in repository.stream_archivable_hands(month):
+            batch.append(hand)
+            if len(batch) >= segment_size:
+                stored += repository.archive_hands(month, batch)["bytes"]
+                count += len(batch)
+                batch = []
+        if batch:
+            stored += repository.archive_hands(month, batch)["bytes"]
+            count += len(batch)
+        repository.drop_partition_if_empty(month)
+        _progress(f"Archived through {month:%Y-%m}:", count, started)
+    print(f"Archived {count} hands into {stored / 1e6:.1f} MB of segments", file=sys.stderr)
+    return count
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk export and import hands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write hands to a file")
+    export_parser.add_argument("path", help="output file, or - for stdout")
+    export_parser.add_argument("--format", choices=("phh", "binary"))
+    export_parser.add_argument("--limit", type=int, help="export at most this many hands")
+    export_parser.add_argument("--cursor", help="start after this history cursor")
+
+    import_parser = commands.add_parser("import", help="load hands from a file")
+    import_parser.add_argument("path", help="input file, or - for stdin")
+    import_parser.add_argument("--format", choices=("phh", "binary"))
+    import_parser.add_argument("--batch-size", type=int, default=5000, help="hands per COPY transaction")
+
+    settle_parser = commands.add_parser("settle", help="re-settle stored completed hands and report differences")
+    settle_parser.add_argument("--limit", type=int, help="check at most this many hands")
+    settle_parser.add_argument("--batch-size", type=int, default=5000, help="hands settled per batch")
+    settle_parser.add_argument("--cross-check", action="store_true", help="also compare with a pokerkit replay")
+
+    stats_parser = commands.add_parser("stats", help="roll completed hands up into the player stats")
+    stats_parser.add_argument("--workers", type=int, default=4, help="parallel backfill processes")
+    stats_parser.add_argument("--batch-size", type=int, default=2000, help="hands upserted per statement")
+    stats_parser.add_argument("--rebuild", action="store_true", help="empty the stats and roll every hand up again")
+
+    reindex_parser = commands.add_parser("reindex", help="fill in the search columns of older hands")
+    reindex_parser.add_argument("--batch-size", type=int, default=5000, help="hands updated per transaction")
+
+    archive_parser = commands.add_parser("archive", help="move completed hands of old months into segment files")
+    archive_parser.add_argument("--older-than-days", type=int, default=90, help="archive months that ended this long ago")
+    archive_parser.add_argument("--segment-size", type=int, default=100_000, help="hands per segment file")
+
+    commands.add_parser("migrate-partitions", help="move a legacy hands table into TIMESTAMPTZ monthly partitions")
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate-partitions":
+        started = time.perf_counter()
+        moved = migrate_hands_to_partitions()
+        print(f"Moved {moved} hands into monthly partitions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        return
+    init_database()
+    if args.command == "export":
+        export_hands(args.path, _format_for(args.path, args.format), args.limit, args.cursor)
+    elif args.command == "import":
+        import_hands(args.path, _format_for(args.path, args.format), args.batch_size)
+    elif args.command == "settle":
+        settle_stored_hands(args.batch_size, args.limit, args.cross_check)
+    elif args.command == "reindex":
+        reindex_hands(args.batch_size)
+    elif args.command == "archive":
+        archive_old_hands(args.older_than_days, args.segment_size)
+    else:
+        backfill_stats(args.workers, args.batch_size, args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
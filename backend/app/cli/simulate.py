@@ -0,0 +1,485 @@
+"""Headless self-play simulator and load generator.
+
+Plays hands between bot policies either directly against ``GameService``
+(in-process, optionally without a database) or against a running API over
+HTTP, and reports throughput, per-operation latency and database writes::
+
+    python -m app.cli.simulate --hands 2000 --concurrency 16
+    python -m app.cli.simulate --hands 2000 --no-db --policy random,station
+    python -m app.cli.simulate --url http://localhost:8000 --hands 5000 --concurrency 64 --processes 4
+
+Policies are given per seat as a comma-separated list (cycled over the six
+seats); each entry is a built-in name or ``package.module:ClassName`` for a
+custom policy implementing ``choose(options, rng)``.
+"""
+import abc
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.models.cards import RANKS, SUITS
+from app.models.game import Hand
+
+DECK = [rank + suit for rank in RANKS for suit in SUITS]
+
+# Hands stuck this long without completing are abandoned.
+MAX_ACTIONS_PER_HAND = 200
+
+
+class Policy(abc.ABC):
+    """Chooses an action for the seat the hand is waiting on.
+
+    ``options`` is the ``GameService.get_action_options`` payload for the
+    acting player; return an ``(action_type, amount)`` pair where the amount
+    is the bet/raise-to total and is ignored for other actions.
+    """
+
+    @abc.abstractmethod
+    def choose(self, options: Dict, rng: random.Random) -> Tuple[str, int]:
+        ...
+
+
+class CallingStationPolicy(Policy):
+    """Never folds or raises: checks when possible, otherwise calls."""
+
+    def choose(self, options: Dict, rng: random.Random) -> Tuple[str, int]:
+        valid = options["valid_actions"]
+        if "check" in valid:
+            return "check", 0
+        if "call" in valid:
+            return "call", 0
+        return ("allin", 0) if "allin" in valid else ("fold", 0)
+
+
+class RandomPolicy(Policy):
+    """Picks uniformly among mostly-passive actions with occasional sized bets."""
+
+    weights = {"fold": 1, "check": 4, "call": 4, "bet": 2, "raise": 1, "allin": 0.1}
+
+    def choose(self, options: Dict, rng: random.Random) -> Tuple[str, int]:
+        valid = options["valid_actions"]
+        if "check" in valid and len(valid) > 1:
+            # Folding for free is legal but never sensible.
+            valid = [a for a in valid if a != "fold"]
+        action = rng.choices(valid, weights=[self.weights.get(a, 1) for a in valid])[0]
+        if action in ("bet", "raise"):
+            low = options["min_raise_to"]
+            high = options["max_raise_to"] or low
+            return action, rng.randint(low, max(low, min(high, low * 3)))
+        return action, 0
+
+
+class AggressivePolicy(Policy):
+    """Raises the minimum whenever allowed, otherwise calls."""
+
+    def choose(self, options: Dict, rng: random.Random) -> Tuple[str, int]:
+        valid = options["valid_actions"]
+        for action in ("raise", "bet"):
+            if action in valid and rng.random() < 0.5:
+                return action, options["min_raise_to"]
+        return CallingStationPolicy().choose(options, rng)
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "station": CallingStationPolicy,
+    "aggressive": AggressivePolicy,
+}
+
+
+def load_policy(name: str) -> Policy:
+    """Instantiate a built-in policy or one given as ``module:ClassName``."""
+    if name in POLICIES:
+        return POLICIES[name]()
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown policy {name!r}; use one of {sorted(POLICIES)} or module:ClassName")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class Recorder:
+    """Latency samples per operation plus simulation counters."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def record(self, operation: str, started: float):
+        self.latencies[operation].append(time.perf_counter() - started)
+
+    def merge(self, other: Dict):
+        for operation, samples in other["latencies"].items():
+            self.latencies[operation].extend(samples)
+        for name, value in other["counters"].items():
+            self.counters[name] += value
+
+    def to_dict(self) -> Dict:
+        return {"latencies": dict(self.latencies), "counters": dict(self.counters)}
+
+
+class CountingRepository:
+    """Repository wrapper counting save calls and the rows they write."""
+
+    def __init__(self, repository, recorder: Recorder):
+        self.repository = repository
+        self.recorder = recorder
+
+    async def save_hand(
+        self,
+        hand: Hand,
+        from_seq: int = 0,
+        write_header: bool = True,
+        expected_version: Optional[int] = None
+    ) -> bool:
+        self.recorder.counters["db_transactions"] += 1
+        self.recorder.counters["db_action_rows"] += len(hand.actions) - from_seq
+        self.recorder.counters["db_header_rows"] += int(write_header)
+        return await self.repository.save_hand(hand, from_seq, write_header, expected_version)
+
+    async def save_hands(self, saves: List) -> List[bool]:
+        self.recorder.counters["db_transactions"] += 1
+        self.recorder.counters["db_action_rows"] += sum(len(save.actions) for save in saves)
+        self.recorder.counters["db_header_rows"] += sum(save.header is not None for save in saves)
+        return await self.repository.save_hands(saves)
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+
+class MemoryHandRepository:
+    """Stand-in repository keeping hands in a dict, for runs without a database."""
+
+    def __init__(self):
+        self.hands: Dict[str, Hand] = {}
+
+    async def save_hand(
+        self,
+        hand: Hand,
+        from_seq: int = 0,
+        write_header: bool = True,
+        expected_version: Optional[int] = None
+    ) -> bool:
+        self.hands[hand.id] = hand
+        return True
+
+    async def get_hand_version(self, hand_id: str) -> Optional[int]:
+        hand = self.hands.get(hand_id)
+        return hand.version if hand is not None else None
+
+    async def get_hand_by_id(self, hand_id: str) -> Optional[Hand]:
+        return self.hands.get(hand_id)
+
+    async def get_all_hands(self, limit: int = 50) -> List[Hand]:
+        return list(self.hands.values())[-limit:]
+
+    async def get_hand_keys_page(self, limit: int = 50, after=None) -> List:
+        keys = sorted(((hand.created_at, hand.id) for hand in self.hands.values()), reverse=True)
+        return [(hand_id, created_at) for created_at, hand_id in keys if after is None or (created_at, hand_id) < after][:limit]
+
+    async def get_hands_by_ids(self, hand_ids: List[str]) -> List[Hand]:
+        return [self.hands[hand_id] for hand_id in hand_ids if hand_id in self.hands]
+
+
+class MemoryStatsRepository:
+    """Stand-in stats repository counting rolled-up hands, for runs without a database."""
+
+    def __init__(self):
+        self.hand_ids = set()
+
+    async def record_hands(self, rows) -> int:
+        self.hand_ids.update(row.hand_id for row in rows)
+        return len(rows)
+
+
+class InProcessDriver:
+    """Drives a ``GameService`` the same way the route handlers do."""
+
+    def __init__(self, recorder: Recorder, use_db: bool = True):
+        from app.services.game_service import GameService
+
+        self.recorder = recorder
+        self.use_db = use_db
+        self.service = GameService()
+        repository = self.service.hand_repository if use_db else MemoryHandRepository()
+        counting = CountingRepository(repository, recorder)
+        self.service.hand_repository = counting
+        self.service.live_hands.repository = counting
+        if use_db:
+            self.service.hand_writer.repository = counting
+        else:
+            # The stand-in keeps Hand objects, so saves skip the group-commit writer.
+            self.service.live_hands.writer = counting
+            self.service.stats_recorder.repository = MemoryStatsRepository()
+
+    async def start(self):
+        if self.use_db:
+            from app.database.connection import init_pool, init_database
+            from app.database.async_connection import init_async_pool
+
+            init_pool()
+            init_database()
+            await init_async_pool()
+        self.service.start()
+
+    async def stop(self):
+        await self.service.stop()
+        if self.use_db:
+            from app.database.connection import close_pool
+            from app.database.async_connection import close_async_pool
+
+            await close_async_pool()
+            close_pool()
+
+    async def create_hand(self, stacks: List[int]) -> str:
+        started = time.perf_counter()
+        hand = self.service.create_new_hand(stacks)
+        if not await self.service.save_hand(hand):
+            raise RuntimeError("Failed to save hand")
+        self.recorder.record("create_hand", started)
+        return hand.id
+
+    async def _mutate(self, operation: str, hand_id: str, mutate) -> Hand:
+        started = time.perf_counter()
+        async with self.service.hand_lock(hand_id):
+            hand = await self.service.get_hand_by_id(hand_id)
+            hand = mutate(hand)
+            if not await self.service.save_hand(hand):
+                raise RuntimeError("Failed to save hand")
+        self.recorder.record(operation, started)
+        return hand
+
+    async def deal_cards(self, hand_id: str, cards_by_position: Dict[int, str]):
+        await self._mutate("deal_cards", hand_id, lambda hand: self.service.deal_hole_cards(hand, cards_by_position))
+
+    async def deal_board(self, hand_id: str, board_cards: str):
+        await self._mutate("deal_board", hand_id, lambda hand: self.service.deal_board_cards(hand, board_cards))
+
+    async def options(self, hand_id: str, player_position: int) -> Dict:
+        started = time.perf_counter()
+        hand = await self.service.get_hand_by_id(hand_id)
+        options = self.service.get_action_options(hand, player_position)
+        self.recorder.record("valid_actions", started)
+        return options
+
+    async def act(self, hand_id: str, player_position: int, action_type: str, amount: int) -> bool:
+        hand = await self._mutate(
+            "action", hand_id,
+            lambda hand: self.service.add_action(hand, player_position, action_type, amount)
+        )
+        return hand.is_completed
+
+
+class HttpDriver:
+    """Drives a running API through its public endpoints."""
+
+    def __init__(self, recorder: Recorder, base_url: str, concurrency: int):
+        self.recorder = recorder
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.client = None
+        self._flushes_at_start = 0
+
+    async def _health_flushes(self) -> int:
+        response = await self.client.get("/health")
+        return response.json().get("live_hands", {}).get("flushes", 0)
+
+    async def start(self):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30.0)
+        self._flushes_at_start = await self._health_flushes()
+
+    async def stop(self):
+        # The server's live-hand flush count is the closest view of its writes.
+        self.recorder.counters["db_transactions"] += await self._health_flushes() - self._flushes_at_start
+        await self.client.aclose()
+
+    async def _request(self, operation: str, method: str, path: str, **kwargs) -> Dict:
+        started = time.perf_counter()
+        response = await self.client.request(method, path, **kwargs)
+        self.recorder.record(operation, started)
+        if response.status_code >= 400:
+            self.recorder.counters[f"http_{response.status_code}"] += 1
+            raise RuntimeError(f"{method} {path}: {response.status_code} {response.text}")
+        return response.json()
+
+    async def create_hand(self, stacks: List[int]) -> str:
+        hand = await self._request("create_hand", "POST", "/api/hands", json={"player_stacks": stacks})
+        return hand["id"]
+
+    async def deal_cards(self, hand_id: str, cards_by_position: Dict[int, str]):
+        payload = {"hand_id": hand_id, "cards_by_position": {str(p): c for p, c in cards_by_position.items()}}
+        await self._request("deal_cards", "POST", "/api/hands/deal-cards", json=payload)
+
+    async def deal_board(self, hand_id: str, board_cards: str):
+        payload = {"hand_id": hand_id, "board_cards": board_cards}
+        await self._request("deal_board", "POST", "/api/hands/deal-board", json=payload)
+
+    async def options(self, hand_id: str, player_position: int) -> Dict:
+        return await self._request(
+            "valid_actions", "GET", f"/api/hands/{hand_id}/valid-actions",
+            params={"player_position": player_position}
+        )
+
+    async def act(self, hand_id: str, player_position: int, action_type: str, amount: int) -> bool:
+        payload = {
+            "hand_id": hand_id,
+            "player_position": player_position,
+            "action_type": action_type,
+            "amount": amount,
+        }
+        hand = await self._request("action", "POST", "/api/hands/action", json=payload)
+        return hand["is_completed"]
+
+
+async def play_hand(driver, policies: List[Policy], rng: random.Random, stack: int, recorder: Recorder):
+    """Deal a random hand and let the policies play it to completion."""
+    deck = rng.sample(DECK, 17)
+    hand_id = await driver.create_hand([stack] * 6)
+    await driver.deal_cards(hand_id, {p: deck[2 * p] + deck[2 * p + 1] for p in range(6)})
+    await driver.deal_board(hand_id, "".join(deck[12:17]))
+
+    position = 3  # under the gun
+    for _ in range(MAX_ACTIONS_PER_HAND):
+        options = await driver.options(hand_id, position)
+        if not options["is_actor"]:
+            if options["actor_position"] is None:
+                break
+            position = options["actor_position"]
+            options = await driver.options(hand_id, position)
+        action_type, amount = policies[position].choose(options, rng)
+        recorder.counters["actions"] += 1
+        if await driver.act(hand_id, position, action_type, amount):
+            recorder.counters["hands_completed"] += 1
+            return
+        position = (position + 1) % 6
+    recorder.counters["hands_stalled"] += 1
+
+
+async def run_worker(args, worker_index: int, hands: int) -> Dict:
+    """Play ``hands`` hands with ``args.concurrency`` concurrent tables."""
+    recorder = Recorder()
+    policies = [load_policy(name) for name in args.policy.split(",")]
+    policies = [policies[i % len(policies)] for i in range(6)]
+    if args.url:
+        driver = HttpDriver(recorder, args.url, args.concurrency)
+    else:
+        driver = InProcessDriver(recorder, use_db=not args.no_db)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(hands):
+        queue.put_nowait(i)
+
+    async def table(table_index: int):
+        rng = random.Random(f"{args.seed}:{worker_index}:{table_index}")
+        while not queue.empty():
+            queue.get_nowait()
+            try:
+                await play_hand(driver, policies, rng, args.stack, recorder)
+            except Exception as e:
+                recorder.counters["hands_failed"] += 1
+                if recorder.counters["hands_failed"] <= 5:
+                    print(f"worker {worker_index}: hand failed: {e}")
+
+    await driver.start()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(table(i) for i in range(args.concurrency)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await driver.stop()
+    result = recorder.to_dict()
+    result["elapsed"] = elapsed
+    return result
+
+
+def _worker_main(job) -> Dict:
+    args, worker_index, hands = job
+    return asyncio.run(run_worker(args, worker_index, hands))
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(recorder: Recorder, elapsed: float) -> Dict:
+    """Summary of a run: throughput, latency percentiles in ms and counters."""
+    counters = dict(recorder.counters)
+    completed = counters.get("hands_completed", 0)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "hands_per_s": round(completed / elapsed, 1) if elapsed else 0.0,
+        "actions_per_s": round(counters.get("actions", 0) / elapsed, 1) if elapsed else 0.0,
+        "counters": counters,
+        "latency_ms": {
+            operation: {
+                "count": len(samples),
+                "p50": round(percentile(samples, 0.50) * 1000, 3),
+                "p99": round(percentile(samples, 0.99) * 1000, 3),
+            }
+            for operation, samples in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def print_report(summary: Dict):
+    counters = summary["counters"]
+    print(f"Hands: {counters.get('hands_completed', 0)} completed, "
+          f"{counters.get('hands_stalled', 0)} stalled, {counters.get('hands_failed', 0)} failed "
+          f"in {summary['elapsed_s']}s")
+    print(f"Throughput: {summary['hands_per_s']} hands/s, {summary['actions_per_s']} actions/s")
+    writes = f"DB writes: {counters.get('db_transactions', 0)} transactions"
+    if "db_action_rows" in counters:
+        writes += f", {counters['db_action_rows']} action rows, {counters.get('db_header_rows', 0)} header rows"
+    print(writes)
+    print(f"{'operation':<16}{'count':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for operation, stats in summary["latency_ms"].items():
+        print(f"{operation:<16}{stats['count']:>10}{stats['p50']:>10}{stats['p99']:>10}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Play bot hands against the game service.")
+    parser.add_argument("--hands", type=int, default=1000, help="total hands to play")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent tables per process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes")
+    parser.add_argument("--url", help="base URL of a running API; default plays in-process")
+    parser.add_argument("--no-db", action="store_true", help="in-process only: keep hands in memory")
+    parser.add_argument("--policy", default="random", help="comma-separated policies, cycled over seats")
+    parser.add_argument("--stack", type=int, default=1000, help="starting stack for every seat")
+    parser.add_argument("--seed", type=int, default=0, help="seed for deals and bot decisions")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    for name in args.policy.split(","):
+        load_policy(name)
+
+    shares = [args.hands * (i + 1) // args.processes - args.hands * i // args.processes for i in range(args.processes)]
+    jobs = [(args, i, share) for i, share in enumerate(shares)]
+
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [_worker_main(jobs[0])]
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.map(_worker_main, jobs)
+    elapsed = time.perf_counter() - started
+
+    recorder = Recorder()
+    for result in results:
+        recorder.merge(result)
+    summary = report(recorder, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,19 @@
-from .connection import get_db_connection, init_database
+from .connection import (
+    ConnectionPool,
+    PoolTimeoutError,
+    close_pool,
+    get_db_connection,
+    get_pool_stats,
+    init_database,
+    init_pool,
+)
 
-__all__ = ["get_db_connection", "init_database"]
+__all__ = [
+    "ConnectionPool",
+    "PoolTimeoutError",
+    "close_pool",
+    "get_db_connection",
+    "get_pool_stats",
+    "init_database",
+    "init_pool",
+]
@@ -0,0 +1,69 @@
+import asyncpg
+import os
+import time
+from typing import Optional, Dict
+from contextlib import asynccontextmanager
+from app.metrics import DB_POOL_WAIT
+
+_pool: Optional[asyncpg.Pool] = None
+
+
+async def init_async_pool() -> asyncpg.Pool:
+    """Create the process-wide asyncpg pool from environment settings."""
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=int(os.getenv("POSTGRES_PORT", "5432")),
+            database=os.getenv("POSTGRES_DB", "poker_db"),
+            user=os.getenv("POSTGRES_USER", "poker_user"),
+            password=os.getenv("POSTGRES_PASSWORD", "poker_pass"),
+            min_size=int(os.getenv("POSTGRES_ASYNC_POOL_MIN_SIZE", "2")),
+            max_size=int(os.getenv("POSTGRES_ASYNC_POOL_MAX_SIZE", "20")),
+            max_inactive_connection_lifetime=float(
+                os.getenv("POSTGRES_POOL_HEALTH_CHECK_INTERVAL", "30")
+            ),
+        )
+    return _pool
+
+
+async def close_async_pool():
+    """Close the process-wide asyncpg pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Get the process-wide asyncpg pool, creating it on first use."""
+    return _pool if _pool is not None else await init_async_pool()
+
+
+def get_async_pool_stats() -> Optional[Dict]:
+    """Async pool statistics, or None if the pool has not been created."""
+    if _pool is None:
+        return None
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+    }
+
+
+@asynccontextmanager
+async def get_async_connection():
+    """Acquire a pooled connection, waiting at most POSTGRES_POOL_TIMEOUT seconds."""
+    pool = await get_async_pool()
+    timeout = float(os.getenv("POSTGRES_POOL_TIMEOUT", "5"))
+    started = time.monotonic()
+    conn = await pool.acquire(timeout=timeout)
+    DB_POOL_WAIT.labels("async").observe(time.monotonic() - started)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
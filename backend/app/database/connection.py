@@ -1,12 +1,30 @@
 import psycopg2
 import psycopg2.extras
 import os
-from typing import Optional
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict
 from contextlib import contextmanager
+from datetime import datetime
+from app.database.partitions import (
+    copy_legacy_hands,
+    create_partitions_statement,
+    legacy_hands,
+    next_month,
+    partition_month,
+    rename_legacy_hands,
+)
+from app.metrics import DB_POOL_WAIT
 
-def get_db_connection():
-    """Get database connection using environment variables."""
-    return psycopg2.connect(
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def _connect_kwargs() -> Dict:
+    """Connection parameters from environment variables."""
+    return dict(
         host=os.getenv("POSTGRES_HOST", "localhost"),
         port=os.getenv("POSTGRES_PORT", "5432"),
         database=os.getenv("POSTGRES_DB", "poker_db"),
@@ -14,43 +32,402 @@ def get_db_connection():
         password=os.getenv("POSTGRES_PASSWORD", "poker_pass")
     )
 
+
+def get_db_connection():
+    """Get database connection using environment variables."""
+    return psycopg2.connect(**_connect_kwargs())
+
+
+class ConnectionPool:
+    """Bounded, thread-safe psycopg2 connection pool.
+
+    Connections are opened lazily up to ``max_size``; callers block for at
+    most ``timeout`` seconds when the pool is exhausted. Connections that sat
+    idle longer than ``health_check_interval`` are pinged before reuse and
+    replaced if the ping fails.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+        **connect_kwargs
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size bounds")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._connect_kwargs = connect_kwargs or _connect_kwargs()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = deque()  # (connection, last_used_monotonic)
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "connections_created": 0,
+            "connections_discarded": 0,
+        }
+        for _ in range(min_size):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic()))
+
+    def _open(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._size += 1
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats["connections_discarded"] += 1
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, waiting up to ``timeout`` seconds."""
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed")
+
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeoutError(
+                    f"No database connection available within {self.timeout}s"
+                )
+        waited = time.monotonic() - started
+        DB_POOL_WAIT.labels("sync").observe(waited)
+
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.popleft() if self._idle else None
+                if entry is None:
+                    conn = self._open()
+                    break
+                conn, last_used = entry
+                if self._is_healthy(conn, last_used):
+                    break
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool."""
+        try:
+            if discard or self._closed or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        self._closed = True
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict:
+        """Snapshot of pool size and usage counters."""
+        with self._lock:
+            idle = len(self._idle)
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                idle=idle,
+                in_use=self._size - idle,
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> ConnectionPool:
+    """Create the process-wide connection pool from environment settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                min_size=int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+                timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", "5")),
+                health_check_interval=float(
+                    os.getenv("POSTGRES_POOL_HEALTH_CHECK_INTERVAL", "30")
+                ),
+            )
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    """Get the process-wide pool, creating it on first use."""
+    return _pool if _pool is not None else init_pool()
+
+
+def get_pool_stats() -> Optional[Dict]:
+    """Pool statistics, or None if the pool has not been created."""
+    return _pool.stats() if _pool is not None else None
+
+
 @contextmanager
-def get_db_cursor():
-    """Context manager for database operations."""
-    conn = None
+def get_db_cursor(name: Optional[str] = None):
+    """Context manager for database operations on a pooled connection.
+
+    Passing ``name`` opens a server-side cursor that fetches rows in batches
+    of ``cursor.itersize`` while iterated, instead of all at once.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor = conn.cursor(name=name, cursor_factory=psycopg2.extras.RealDictCursor)
         yield cursor
+        cursor.close()  # named cursors must close before the commit ends them
         conn.commit()
     except Exception as e:
-        if conn:
+        try:
             conn.rollback()
+        except Exception:
+            broken = True
+        if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            broken = True
         raise e
     finally:
-        if conn:
-            cursor.close()
-            conn.close()
+        if cursor is not None and not cursor.closed:
+            try:
+                cursor.close()
+            except psycopg2.ProgrammingError:
+                pass  # named cursor already ended by the rollback
+        pool.putconn(conn, discard=broken)
 
 def init_database():
-    """Initialize database with required tables."""
+    """Initialize database with required tables.
+
+    Raises RuntimeError while ``hands`` is a plain table from before monthly
+    partitioning or has a ``created_at`` without time zone;
+    ``migrate_hands_to_partitions`` converts it once.
+    """
     with get_db_cursor() as cursor:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS hands (
-                id VARCHAR(36) PRIMARY KEY,
-                players_data JSONB NOT NULL,
-                actions_data JSONB NOT NULL,
-                board_cards VARCHAR(20) DEFAULT '',
-                pot_size INTEGER DEFAULT 0,
-                current_round VARCHAR(20) DEFAULT 'preflop',
-                is_completed BOOLEAN DEFAULT FALSE,
-                winner_positions JSONB DEFAULT '[]',
-                winnings JSONB DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        if legacy_hands(cursor):
+            raise RuntimeError(
+                "The hands table is not partitioned by a TIMESTAMPTZ created_at; "
+                "run `python -m app.cli.hands migrate-partitions` first"
             )
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_hands_created_at 
-            ON hands(created_at DESC)
-        """)
+        _create_tables(cursor)
+
+def migrate_hands_to_partitions() -> int:
+    """Copy a legacy hands table into monthly partitions keyed by a TIMESTAMPTZ created_at.
+
+    One transaction: the old table is renamed, the schema created and the
+    rows copied over before the old table is dropped. Returns the rows moved
+    (0 if ``hands`` is already current).
+    """
+    with get_db_cursor() as cursor:
+        if not rename_legacy_hands(cursor):
+            return 0
+        # Segments archived from hands without time zone hold naive UTC bounds.
+        _segment_times_with_zone(cursor, "UTC")
+        _create_tables(cursor)
+        return copy_legacy_hands(cursor)
+
+def _create_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hands (
+            id VARCHAR(36) NOT NULL,
+            players_data JSONB NOT NULL,
+            actions_data JSONB NOT NULL,
+            board_cards VARCHAR(20) DEFAULT '',
+            pot_size INTEGER DEFAULT 0,
+            current_round VARCHAR(20) DEFAULT 'preflop',
+            is_completed BOOLEAN DEFAULT FALSE,
+            winner_positions JSONB DEFAULT '[]',
+            winnings JSONB DEFAULT '{}',
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_hands_created_at 
+        ON hands(created_at DESC)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_hands_created_at_id
+        ON hands(created_at DESC, id DESC)
+    """)
+
+    cursor.execute("""
+        ALTER TABLE hands
+        ADD COLUMN IF NOT EXISTS actions_count INTEGER NOT NULL DEFAULT 0
+    """)
+
+    cursor.execute("""
+        ALTER TABLE hands
+        ADD COLUMN IF NOT EXISTS hand_data BYTEA
+    """)
+
+    cursor.execute("""
+        ALTER TABLE hands
+        ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0
+    """)
+
+    # Hand search columns; NULL on hands written before they existed
+    # until `python -m app.cli.hands reindex` fills them in.
+    cursor.execute("""
+        ALTER TABLE hands
+        ADD COLUMN IF NOT EXISTS preflop_raises SMALLINT,
+        ADD COLUMN IF NOT EXISTS board_codes SMALLINT[],
+        ADD COLUMN IF NOT EXISTS hole_combos INTEGER[]
+    """)
+
+    for index in (
+        "idx_hands_winner_positions ON hands USING GIN (winner_positions jsonb_path_ops)",
+        "idx_hands_board_codes ON hands USING GIN (board_codes)",
+        "idx_hands_hole_combos ON hands USING GIN (hole_combos)",
+        "idx_hands_pot_size ON hands(pot_size)",
+        "idx_hands_round_created_at ON hands(current_round, created_at DESC, id DESC)",
+        "idx_hands_preflop_raises_created_at ON hands(preflop_raises, created_at DESC, id DESC)",
+    ):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index}")
+
+    today = partition_month(datetime.utcnow())
+    cursor.execute(create_partitions_statement([today, next_month(today)]))
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hand_segments (
+            id SERIAL PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            hand_count INTEGER NOT NULL,
+            min_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            max_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _segment_times_with_zone(cursor)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS hand_actions (
+            hand_id VARCHAR(36) NOT NULL,
+            seq INTEGER NOT NULL,
+            position SMALLINT NOT NULL,
+            type VARCHAR(10) NOT NULL,
+            amount INTEGER NOT NULL DEFAULT 0,
+            round VARCHAR(20) NOT NULL,
+            PRIMARY KEY (hand_id, seq)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS poker_tables (
+            id VARCHAR(36) PRIMARY KEY,
+            player_names JSONB NOT NULL,
+            stacks JSONB NOT NULL,
+            buy_in INTEGER NOT NULL,
+            dealer_position SMALLINT NOT NULL DEFAULT 0,
+            current_hand_id VARCHAR(36),
+            hands_played INTEGER NOT NULL DEFAULT 0,
+            rebuys JSONB NOT NULL DEFAULT '[]',
+            is_closed BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS player_stats (
+            player_name TEXT NOT NULL,
+            position SMALLINT NOT NULL,
+            hands INTEGER NOT NULL DEFAULT 0,
+            vpip_hands INTEGER NOT NULL DEFAULT 0,
+            pfr_hands INTEGER NOT NULL DEFAULT 0,
+            postflop_aggressive INTEGER NOT NULL DEFAULT 0,
+            postflop_calls INTEGER NOT NULL DEFAULT 0,
+            showdowns INTEGER NOT NULL DEFAULT 0,
+            showdowns_won INTEGER NOT NULL DEFAULT 0,
+            hands_won INTEGER NOT NULL DEFAULT 0,
+            net_winnings BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (player_name, position)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stats_processed_hands (
+            hand_id VARCHAR(36) PRIMARY KEY,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _segment_times_with_zone(cursor, zone: Optional[str] = None):
+    """Convert hand_segments times created as TIMESTAMP to TIMESTAMPTZ.
+
+    Postgres stored the aware hand times written to those columns as the
+    session's local time, which is how the conversion reads them back
+    unless ``zone`` names the zone they were written in.
+    """
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'hand_segments' AND data_type = 'timestamp without time zone'
+    """)
+    columns = [row["column_name"] for row in cursor.fetchall()]
+    if columns:
+        using = " USING {} AT TIME ZONE %s" if zone is not None else ""
+        cursor.execute(
+            "ALTER TABLE hand_segments " + ", ".join(
+                f"ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE" + using.format(column) for column in columns
+            ),
+            (zone,) * len(columns) if zone is not None else None
+        )
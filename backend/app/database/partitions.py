@@ -0,0 +1,146 @@
+"""Monthly range partitions of the hands table.
+
+``hands`` is partitioned by ``created_at`` into one table per calendar month
+(UTC), named ``hands_yYYYYmMM``. There is no default partition, so a month
+must have its partition before hands of that month are written: startup
+creates the current and next month, and writers create the months of the
+hands they store. Partition DDL runs under an advisory lock so concurrent
+writers and the archiver never race on creating or dropping a month.
+"""
+import re
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional
+
+# Advisory lock key serializing partition DDL ('hands' in ASCII).
+PARTITION_LOCK = 0x68616E6473
+
+LEGACY_TABLE = "hands_legacy"
+
+_PARTITION_NAME = re.compile(r"^hands_y(\d{4})m(\d{2})$")
+
+LIST_PARTITIONS_QUERY = """
+SELECT c.relname FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'hands'::regclass
+ORDER BY c.relname
+"""
+
+
+def partition_month(created_at: datetime) -> date:
+    """First day of the UTC month holding ``created_at`` (naive times are UTC)."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return date(created_at.year, created_at.month, 1)
+
+
+def next_month(month: date) -> date:
+    """First day of the month after ``month``."""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Table name of the partition for ``month``."""
+    return f"hands_y{month.year:04d}m{month.month:02d}"
+
+
+def month_of_partition(name: str) -> Optional[date]:
+    """Month a partition table name stands for, or None for other tables."""
+    match = _PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def create_partitions_statement(months: Iterable[date]) -> str:
+    """One statement creating the partitions of ``months`` that do not exist yet."""
+    creates = "".join(
+        f"\n    CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF hands"
+        f" FOR VALUES FROM ({_bound(month)}) TO ({_bound(next_month(month))});"
+        for month in sorted(set(months))
+    )
+    return f"DO $$\nBEGIN\n    PERFORM pg_advisory_xact_lock({PARTITION_LOCK});{creates}\nEND $$"
+
+
+def drop_partition_if_empty_statement(month: date) -> str:
+    """One statement dropping the partition of ``month`` if it holds no hands."""
+    name = partition_name(month)
+    return f"""DO $$
+BEGIN
+    PERFORM pg_advisory_xact_lock({PARTITION_LOCK});
+    IF to_regclass('{name}') IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {name}) THEN
+        DROP TABLE {name};
+    END IF;
+END $$"""
+
+
+def legacy_hands(cursor) -> bool:
+    """Whether ``hands`` must be migrated before use.
+
+    That is a plain table from before monthly partitioning, or partitions
+    keyed by a ``created_at TIMESTAMP`` without time zone (the schema
+    startup created before it matched init.sql).
+    """
+    cursor.execute("""
+        SELECT c.relkind, a.atttypid = 'timestamp'::regtype AS naive
+        FROM pg_class c
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = 'created_at'
+        WHERE c.oid = to_regclass('hands')
+    """)
+    row = cursor.fetchone()
+    return row is not None and (row["relkind"] == "r" or row["naive"])
+
+
+def rename_legacy_hands(cursor) -> bool:
+    """Move a legacy hands table (see ``legacy_hands``) and its partitions out of the way.
+
+    Returns True if there was one; the current schema is then created in
+    its place and ``copy_legacy_hands`` moves the rows over.
+    """
+    if not legacy_hands(cursor):
+        return False
+    cursor.execute(LIST_PARTITIONS_QUERY)
+    partitions = [row["relname"] for row in cursor.fetchall()]
+    cursor.execute(f"ALTER TABLE hands RENAME TO {LEGACY_TABLE}")
+    for name in partitions:
+        cursor.execute(f"ALTER TABLE {name} RENAME TO {LEGACY_TABLE}_{name}")
+    # Constraint and index names are schema-wide, so free them for the new table.
+    cursor.execute(f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT hands_pkey TO {LEGACY_TABLE}_pkey")
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", (LEGACY_TABLE,))
+    for index in [row["indexname"] for row in cursor.fetchall()]:
+        if index != f"{LEGACY_TABLE}_pkey":
+            cursor.execute(f"DROP INDEX {index}")
+    return True
+
+
+def copy_legacy_hands(cursor) -> int:
+    """Copy the renamed legacy hands table into the partitions and drop it; returns the rows moved.
+
+    Times without a time zone are UTC, as the app wrote them.
+    """
+    cursor.execute(f"SELECT min(created_at) AS first, max(created_at) AS last FROM {LEGACY_TABLE}")
+    row = cursor.fetchone()
+    if row["first"] is not None:
+        months: List[date] = [partition_month(row["first"])]
+        while months[-1] < partition_month(row["last"]):
+            months.append(next_month(months[-1]))
+        cursor.execute(create_partitions_statement(months))
+    cursor.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position",
+        (LEGACY_TABLE,)
+    )
+    columns = cursor.fetchall()
+    names = ", ".join(column["column_name"] for column in columns)
+    values = ", ".join(
+        f"{column['column_name']} AT TIME ZONE 'UTC'" if column["data_type"] == "timestamp without time zone"
+        else column["column_name"]
+        for column in columns
+    )
+    cursor.execute(f"""
+        INSERT INTO hands ({names})
+        SELECT {values} FROM {LEGACY_TABLE} WHERE created_at IS NOT NULL
+    """)
+    moved = cursor.rowcount
+    cursor.execute(f"DROP TABLE {LEGACY_TABLE}")
+    return moved
@@ -1,11 +1,49 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from app.routes import hands
+from app.routes import hands, stats, tables
+from app.database.connection import init_pool, close_pool, init_database, get_pool_stats
+from app.database.async_connection import init_async_pool, close_async_pool, get_async_pool_stats
+from app.services.game_service import GameService
+from app.services.hand_evaluator import get_evaluator
+from app.services.sharding import ShardMap
+from app.services.table_manager import TableManager
+from app.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, render_stats
 
 load_dotenv()
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the connection pool and singleton services for the app lifetime."""
+    try:
+        init_pool()
+        init_database()
+        await init_async_pool()
+    except Exception:
+        logger.exception("Database initialization error")
+    if os.getenv("HAND_EVALUATOR_PRELOAD", "1") == "1":
+        try:
+            await asyncio.to_thread(get_evaluator)
+        except Exception:
+            logger.exception("Hand evaluator initialization error")
+    app.state.game_service = GameService()
+    app.state.game_service.start()
+    app.state.table_manager = TableManager(app.state.game_service, ShardMap.from_env())
+    yield
+    await app.state.game_service.stop()
+    await close_async_pool()
+    close_pool()
 
-app = FastAPI(title="Texas Hold'em Poker Backend", version="0.1.0")
+app = FastAPI(title="Texas Hold'em Poker Backend", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,14 +51,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(hands.router, prefix="/api", tags=["hands"])
+app.include_router(tables.router, prefix="/api", tags=["tables"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
+
+
+def _service_stats() -> str:
+    service = app.state.game_service
+    return (
+        render_stats("poker_db_pool", get_pool_stats())
+        + render_stats("poker_async_db_pool", get_async_pool_stats())
+        + render_stats("poker_live_hands", service.live_hands.stats())
+        + render_stats("poker_hand_writes", service.hand_writer.stats())
+        + render_stats("poker_completed_hands_cache", service.completed_hands.stats())
+        + render_stats("poker_hand_events", service.events.stats())
+        + render_stats("poker_player_stats", service.stats_recorder.stats())
+        + render_stats("poker_tables", app.state.table_manager.stats())
+    )
+
+REGISTRY.add_collector(_service_stats)
 
 @app.get("/")
 async def root():
     return {"message": "Texas Hold'em Poker Backend API"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "database_pool": get_pool_stats(),
+        "async_database_pool": get_async_pool_stats(),
+        "live_hands": app.state.game_service.live_hands.stats(),
+        "hand_writes": app.state.game_service.hand_writer.stats(),
+        "completed_hands": app.state.game_service.completed_hands.stats(),
+        "hand_events": app.state.game_service.events.stats(),
+        "player_stats": app.state.game_service.stats_recorder.stats(),
+        "tables": app.state.table_manager.stats(),
+    }
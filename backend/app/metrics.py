@@ -0,0 +1,319 @@
+"""Process metrics in the Prometheus text exposition format.
+
+A small in-process registry of counters and histograms, an ASGI middleware
+timing every HTTP request and counting the database statements it ran, and
+hooks the repositories, engine and routes call around their hot paths.
+Recording a sample is a dict lookup, a bisect and an increment under a
+lock, about a microsecond; a timed database call costs a few, against
+round trips of hundreds::
+
+    DB_QUERY_DURATION.labels("query").observe(0.0021)
+    GET /metrics
+"""
+import abc
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends "; charset=utf-8" to text/* responses.
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Default latency buckets (seconds), as in the Prometheus client libraries.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# For in-process work measured in microseconds, e.g. (de)serializing a hand.
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class _Metric(abc.ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        ...
+
+    @abc.abstractmethod
+    def _render_samples(self) -> List[str]:
+        ...
+
+    def labels(self, *values):
+        """Child metric for one combination of label values."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values!r}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self) -> List[tuple]:
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. of requests or errors."""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_format_value(child.value)}" for values, child in self._samples()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry=None
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for values, child in self._samples():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                label = self._label_text(values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{label} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors called at scrape time for point-in-time values."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], str]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], str]):
+        """Add a callable returning exposition text to append on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        text = "\n".join(lines) + "\n"
+        for collector in self._collectors:
+            try:
+                text += collector()
+            except Exception:
+                # A broken collector must not take the whole scrape down.
+                logger.exception("Metrics collector %r failed", collector)
+        return text
+
+
+def render_stats(prefix: str, stats: Optional[Dict]) -> str:
+    """Numeric entries of a ``stats()`` dict as gauges named ``<prefix>_<key>``."""
+    if not stats:
+        return ""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {_format_value(value)}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter(
+    "poker_http_requests_total", "HTTP requests by method, route and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "poker_http_request_duration_seconds",
+    "Time until the response started, by method and route.",
+    ("method", "route"),
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "poker_http_request_db_queries",
+    "Database statements run per HTTP request.",
+    ("method", "route"),
+    COUNT_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "poker_db_query_duration_seconds", "Repository database calls by operation.", ("operation",)
+)
+DB_ERRORS = Counter("poker_db_errors_total", "Repository database calls that raised.", ("operation",))
+DB_POOL_WAIT = Histogram(
+    "poker_db_pool_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",), FAST_BUCKETS + DEFAULT_BUCKETS[1:]
+)
+HAND_EVALUATION_DURATION = Histogram(
+    "poker_hand_evaluation_duration_seconds", "PokerEngine.evaluate_hand replays.", buckets=FAST_BUCKETS + DEFAULT_BUCKETS[1:]
+)
+ENGINE_ERRORS = Counter(
+    "poker_engine_errors_total", "Engine replay and settlement failures by kind.", ("kind",)
+)
+SERIALIZATION_DURATION = Histogram(
+    "poker_serialization_duration_seconds", "Hand (de)serialization by format.", ("format",), FAST_BUCKETS
+)
+
+# Statement counter of the HTTP request being served, if any.
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+
+def count_query():
+    """Count one database statement against the current request."""
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+class timed_query:
+    """Context manager timing a repository call and counting it against the current request."""
+    __slots__ = ("operation", "started")
+
+    def __init__(self, operation: str):
+        self.operation = operation
+
+    def __enter__(self):
+        count_query()
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, traceback):
+        DB_QUERY_DURATION.labels(self.operation).observe(time.perf_counter() - self.started)
+        if exc_type is not None:
+            DB_ERRORS.labels(self.operation).inc()
+        return False
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and statement count per request.
+
+    Requests are labelled with their route template (``/api/hands/{hand_id}``)
+    rather than the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict] = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None or endpoint not in self._route_paths:
+            self._route_paths = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        queries = [0]
+        status = [500]
+        timed = [False]
+
+        async def send_and_time(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                timed[0] = True
+                HTTP_REQUEST_DURATION.labels(scope["method"], self._route(scope)).observe(
+                    time.perf_counter() - started
+                )
+            await send(message)
+
+        token = _request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_and_time)
+        finally:
+            _request_queries.reset(token)
+            route = self._route(scope)
+            if not timed[0]:
+                HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route, status[0]).inc()
+            HTTP_REQUEST_DB_QUERIES.labels(scope["method"], route).observe(queries[0])
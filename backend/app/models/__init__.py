@@ -1,3 +1,4 @@
-from .game import Hand, Player, GameAction
+from .game import Hand, Player, GameAction, ActionType, Round
+from .table import Table
 
-__all__ = ["Hand", "Player", "GameAction"]
+__all__ = ["Hand", "Player", "GameAction", "ActionType", "Round", "Table"]
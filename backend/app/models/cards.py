@@ -0,0 +1,52 @@
+from typing import List
+
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+
+# Integer card code: rank * 4 + suit, so 0 = 2c ... 51 = As.
+CARD_CODES = {r + s: i * 4 + j for i, r in enumerate(RANKS) for j, s in enumerate(SUITS)}
+CARD_STRINGS = {code: card for card, code in CARD_CODES.items()}
+# Two-card strings indexed by first * 52 + second, shared by every decoded hand.
+HOLE_CARD_STRINGS = [CARD_STRINGS[i // 52] + CARD_STRINGS[i % 52] for i in range(52 * 52)]
+
+
+def card_to_code(card: str) -> int:
+    """Convert a two-character card such as 'Ah' to its integer code."""
+    try:
+        return CARD_CODES[card[0].upper() + card[1].lower()]
+    except (KeyError, IndexError):
+        raise ValueError(f"Invalid card: {card!r}")
+
+
+def code_to_card(code: int) -> str:
+    """Convert an integer card code back to its two-character string."""
+    return CARD_STRINGS[code]
+
+
+def parse_cards(cards: str) -> List[int]:
+    """Parse a concatenated card string such as 'AhKs' into integer codes."""
+    if not cards:
+        return []
+    if len(cards) % 2:
+        raise ValueError(f"Invalid card string: {cards!r}")
+    return [card_to_code(cards[i:i + 2]) for i in range(0, len(cards), 2)]
+
+
+def format_cards(codes) -> str:
+    """Format integer card codes as a concatenated card string."""
+    return "".join(CARD_STRINGS[int(code)] for code in codes)
+
+
+def normalize_cards(cards: str, min_count: int = 0, max_count: int = 52) -> str:
+    """Canonical form of a card string, e.g. 'ahks' -> 'AhKs'.
+
+    Raises ValueError on an invalid or repeated card, or a card count outside
+    ``min_count``..``max_count``.
+    """
+    codes = parse_cards(cards)
+    if len(set(codes)) != len(codes):
+        raise ValueError(f"Repeated card in {cards!r}")
+    if not min_count <= len(codes) <= max_count:
+        expected = str(min_count) if min_count == max_count else f"{min_count} to {max_count}"
+        raise ValueError(f"Expected {expected} cards, got {cards!r}")
+    return format_cards(codes)
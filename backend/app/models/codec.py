@@ -0,0 +1,271 @@
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+from app.models.cards import HOLE_CARD_STRINGS, card_to_code, code_to_card
+from app.models.game import Hand, Player, GameAction, ActionType, Round, InvalidHandError, validate_hand
+
+# Compact binary encoding of a Hand. Layout (little-endian), version 1:
+#
+#   header   u8 version, u8 flags, i64 created_at (µs since the Unix epoch, UTC),
+#            u32 pot_size, u8 current_round
+#   id       16 raw bytes when it is a UUID, else u8 length + UTF-8
+#   board    u8 count + one byte per card (code = rank * 4 + suit)
+#   players  u8 count + fixed 17-byte records: u8 position, u8 flags,
+#            i32 stack, i32 current_bet, i32 total_invested, 2 card bytes
+#            (0xFF when unknown); then u8 length + UTF-8 for each player
+#            whose name is not the default "Player <position + 1>"
+#   actions  u16 count + 6-byte records: u8 position, u8 (round << 4 | type),
+#            i32 amount
+#   result   u8 count + (u8 position, i32 amount) winnings,
+#            u8 count + u8 positions of winner_positions
+CODEC_VERSION = 1
+
+ROUNDS = (Round.PREFLOP, Round.FLOP, Round.TURN, Round.RIVER)
+ACTION_TYPES = (
+    ActionType.FOLD, ActionType.CHECK, ActionType.CALL, ActionType.BET, ActionType.RAISE, ActionType.ALLIN,
+)
+_ROUND_CODES = {round_: i for i, round_ in enumerate(ROUNDS)}
+_ACTION_TYPE_CODES = {action_type: i for i, action_type in enumerate(ACTION_TYPES)}
+
+_HAND_FLAG_UUID_ID = 1
+_HAND_FLAG_COMPLETED = 2
+_HAND_FLAG_AWARE_TIME = 4
+
+_PLAYER_FLAGS = ("is_dealer", "is_small_blind", "is_big_blind", "is_folded")
+_PLAYER_FLAG_CUSTOM_NAME = 1 << 4
+
+_UNKNOWN_CARD = 0xFF
+# (action_type, round) for every packed action byte, to skip per-action shifts.
+_UNPACKED_ACTIONS = {
+    r << 4 | t: (action_type, round_)
+    for r, round_ in enumerate(ROUNDS)
+    for t, action_type in enumerate(ACTION_TYPES)
+}
+_EPOCH = datetime(1970, 1, 1)
+
+_HEADER = struct.Struct("<BBqIB")
+_PLAYER = struct.Struct("<BBiiiBB")
+_ACTION = struct.Struct("<BBi")
+_WINNING = struct.Struct("<Bi")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+# Framing for files and streams of encoded hands: STREAM_MAGIC, then each
+# hand as a u32 byte length followed by its encoding.
+STREAM_MAGIC = b"PKHS\x01"
+
+# Media types for one encoded hand and for a framed stream of them.
+HAND_MEDIA_TYPE = "application/x-poker-hand"
+HAND_STREAM_MEDIA_TYPE = "application/x-poker-hands"
+
+
+def _encode_micros(created_at: datetime) -> tuple:
+    aware = created_at.tzinfo is not None
+    if aware:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = created_at - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds, aware
+
+
+def _hole_card_bytes(hole_cards: Optional[str]) -> tuple:
+    try:
+        if hole_cards and len(hole_cards) == 4:
+            return card_to_code(hole_cards[:2]), card_to_code(hole_cards[2:])
+    except ValueError:
+        pass
+    return _UNKNOWN_CARD, _UNKNOWN_CARD
+
+
+def encode_hand(hand: Hand) -> bytes:
+    """Encode a hand in the compact binary format."""
+    micros, aware = _encode_micros(hand.created_at)
+    flags = (_HAND_FLAG_COMPLETED if hand.is_completed else 0) | (_HAND_FLAG_AWARE_TIME if aware else 0)
+    try:
+        parsed_id = uuid.UUID(hand.id)
+    except ValueError:
+        parsed_id = None
+    if parsed_id is not None and str(parsed_id) == hand.id:
+        flags |= _HAND_FLAG_UUID_ID
+        id_bytes = parsed_id.bytes
+    else:
+        raw_id = hand.id.encode()
+        id_bytes = _U8.pack(len(raw_id)) + raw_id
+
+    parts = [_HEADER.pack(CODEC_VERSION, flags, micros, hand.pot_size, _ROUND_CODES[hand.current_round]), id_bytes]
+
+    board = [card_to_code(hand.board_cards[i:i + 2]) for i in range(0, len(hand.board_cards or ""), 2)]
+    parts.append(_U8.pack(len(board)) + bytes(board))
+
+    parts.append(_U8.pack(len(hand.players)))
+    names = []
+    for p in hand.players:
+        player_flags = sum(1 << i for i, name in enumerate(_PLAYER_FLAGS) if getattr(p, name))
+        if p.name != f"Player {p.position + 1}":
+            player_flags |= _PLAYER_FLAG_CUSTOM_NAME
+            raw_name = p.name.encode()
+            if len(raw_name) > 255:
+                raise ValueError(f"Player name of hand {hand.id} is longer than 255 bytes")
+            names.append(_U8.pack(len(raw_name)) + raw_name)
+        parts.append(_PLAYER.pack(
+            p.position, player_flags, p.stack, p.current_bet, p.total_invested, *_hole_card_bytes(p.hole_cards)
+        ))
+    parts.extend(names)
+
+    parts.append(_U16.pack(len(hand.actions)))
+    parts.extend(
+        _ACTION.pack(a.player_position, _ROUND_CODES[a.round] << 4 | _ACTION_TYPE_CODES[a.action_type], a.amount)
+        for a in hand.actions
+    )
+
+    winnings = hand.winnings or {}
+    parts.append(_U8.pack(len(winnings)))
+    parts.extend(_WINNING.pack(int(position), amount) for position, amount in winnings.items())
+    parts.append(_U8.pack(len(hand.winner_positions)) + bytes(hand.winner_positions))
+    return b"".join(parts)
+
+
+def decode_hand(data: bytes) -> Hand:
+    """Decode a hand produced by ``encode_hand``."""
+    data = memoryview(data).cast("B")  # also accepts psycopg2's BYTEA memoryviews
+    version, flags, micros, pot_size, round_index = _HEADER.unpack_from(data, 0)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported hand encoding version {version}")
+    offset = _HEADER.size
+
+    if flags & _HAND_FLAG_UUID_ID:
+        raw = data[offset:offset + 16].hex()
+        hand_id = f"{raw[:8]}-{raw[8:12]}-{raw[12:16]}-{raw[16:20]}-{raw[20:]}"
+        offset += 16
+    else:
+        length = data[offset]
+        hand_id = bytes(data[offset + 1:offset + 1 + length]).decode()
+        offset += 1 + length
+
+    seconds, microseconds = divmod(micros, 1_000_000)
+    created_at = _EPOCH + timedelta(0, seconds, microseconds)
+    if flags & _HAND_FLAG_AWARE_TIME:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    count = data[offset]
+    board_cards = "".join(code_to_card(code) for code in data[offset + 1:offset + 1 + count])
+    offset += 1 + count
+
+    count = data[offset]
+    offset += 1
+    players = []
+    named = []
+    for _ in range(count):
+        position, player_flags, stack, current_bet, total_invested, first, second = _PLAYER.unpack_from(data, offset)
+        offset += _PLAYER.size
+        players.append(Player(
+            position,
+            f"Player {position + 1}",
+            stack,
+            None if first == _UNKNOWN_CARD else HOLE_CARD_STRINGS[first * 52 + second],
+            bool(player_flags & 1),
+            bool(player_flags & 2),
+            bool(player_flags & 4),
+            bool(player_flags & 8),
+            current_bet,
+            total_invested,
+        ))
+        if player_flags & _PLAYER_FLAG_CUSTOM_NAME:
+            named.append(players[-1])
+    for player in named:
+        length = data[offset]
+        player.name = bytes(data[offset + 1:offset + 1 + length]).decode()
+        offset += 1 + length
+
+    (count,) = _U16.unpack_from(data, offset)
+    offset += 2
+    actions = []
+    for position, packed, amount in _ACTION.iter_unpack(data[offset:offset + count * _ACTION.size]):
+        action_type, round_ = _UNPACKED_ACTIONS[packed]
+        actions.append(GameAction(position, action_type, amount, round_))
+    offset += count * _ACTION.size
+
+    count = data[offset]
+    offset += 1
+    winnings = dict(_WINNING.iter_unpack(data[offset:offset + count * _WINNING.size]))
+    offset += count * _WINNING.size
+    count = data[offset]
+    winner_positions = list(data[offset + 1:offset + 1 + count])
+
+    return Hand(
+        id=hand_id,
+        players=players,
+        actions=actions,
+        board_cards=board_cards,
+        pot_size=pot_size,
+        current_round=ROUNDS[round_index],
+        is_completed=bool(flags & _HAND_FLAG_COMPLETED),
+        winner_positions=winner_positions,
+        winnings=winnings,
+        created_at=created_at,
+    )
+
+
+def frame_hand(hand: Hand) -> bytes:
+    """One length-prefixed stream record for a hand."""
+    encoded = encode_hand(hand)
+    return _U32.pack(len(encoded)) + encoded
+
+
+def encode_stream(hands: Iterable[Hand]) -> Iterator[bytes]:
+    """Framed stream of encoded hands, starting with STREAM_MAGIC."""
+    yield STREAM_MAGIC
+    for hand in hands:
+        yield frame_hand(hand)
+
+
+class HandStreamDecoder:
+    """Incremental decoder for ``encode_stream`` output fed in arbitrary chunks.
+
+    Each hand is checked with ``validate_hand``; a bad one raises
+    InvalidHandError with its index in the stream.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._header_seen = False
+        self._count = 0
+
+    def feed(self, chunk: bytes) -> List[Hand]:
+        """Add bytes; returns the hands completed by them."""
+        self._buffer += chunk
+        if not self._header_seen:
+            if len(self._buffer) < len(STREAM_MAGIC):
+                return []
+            if bytes(self._buffer[:len(STREAM_MAGIC)]) != STREAM_MAGIC:
+                raise ValueError("Not a binary hand stream")
+            del self._buffer[:len(STREAM_MAGIC)]
+            self._header_seen = True
+
+        hands = []
+        offset = 0
+        while len(self._buffer) - offset >= _U32.size:
+            (length,) = _U32.unpack_from(self._buffer, offset)
+            if len(self._buffer) - offset - _U32.size < length:
+                break
+            start = offset + _U32.size
+            index = self._count
+            self._count += 1
+            try:
+                hand = decode_hand(bytes(self._buffer[start:start + length]))
+            except (struct.error, IndexError, KeyError, UnicodeDecodeError, ValueError) as e:
+                raise InvalidHandError(index, f"Corrupt hand record: {e}")
+            try:
+                hands.append(validate_hand(hand))
+            except ValueError as e:
+                raise InvalidHandError(index, str(e))
+            offset = start + length
+        del self._buffer[:offset]
+        return hands
+
+    def close(self) -> List[Hand]:
+        """Finish the stream; raises if it ended mid-record."""
+        if self._buffer:
+            raise ValueError("Truncated binary hand stream")
+        return []
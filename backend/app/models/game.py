@@ -1,9 +1,31 @@
 from dataclasses import dataclass
+from enum import StrEnum
 from typing import List, Optional
 from datetime import datetime
 import uuid
+from app.models.cards import normalize_cards
 
-@dataclass
+
+class ActionType(StrEnum):
+    """Player action; members compare and hash equal to their string values."""
+    FOLD = "fold"
+    CHECK = "check"
+    CALL = "call"
+    BET = "bet"
+    RAISE = "raise"
+    ALLIN = "allin"
+
+
+class Round(StrEnum):
+    """Betting round, in dealing order."""
+    PREFLOP = "preflop"
+    FLOP = "flop"
+    TURN = "turn"
+    RIVER = "river"
+
+
+# Models use __slots__ so thousands of live hands stay compact in memory.
+@dataclass(slots=True)
 class Player:
     position: int
     name: str
@@ -16,25 +38,26 @@ class Player:
     current_bet: int = 0
     total_invested: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class GameAction:
     player_position: int
-    action_type: str  # fold, check, call, bet, raise, allin
+    action_type: ActionType
     amount: int = 0
-    round: str = "preflop"  # preflop, flop, turn, river
+    round: Round = Round.PREFLOP
 
-@dataclass
+@dataclass(slots=True)
 class Hand:
     id: str
     players: List[Player]
     actions: List[GameAction]
     board_cards: str = ""
     pot_size: int = 0
-    current_round: str = "preflop"
+    current_round: Round = Round.PREFLOP
     is_completed: bool = False
     winner_positions: List[int] = None
     winnings: dict = None  # position -> amount won/lost
     created_at: Optional[datetime] = None
+    version: int = 0  # bumped by every change; stored for optimistic concurrency
     
     def __post_init__(self):
         if self.id is None:
@@ -45,3 +68,78 @@ class Hand:
             self.winnings = {}
         if self.created_at is None:
             self.created_at = datetime.utcnow()
+
+
+# Longest player name in characters; 50 characters are at most 200 UTF-8
+# bytes, within the binary encoding's one-byte name length.
+MAX_PLAYER_NAME_LENGTH = 50
+
+
+def check_player_names(names: List[str]) -> None:
+    """Raise ValueError if a player name is longer than MAX_PLAYER_NAME_LENGTH."""
+    for name in names:
+        if len(name) > MAX_PLAYER_NAME_LENGTH:
+            raise ValueError(f"Player name longer than {MAX_PLAYER_NAME_LENGTH} characters: {name[:20]!r}...")
+
+
+class InvalidHandError(ValueError):
+    """Raised by the import decoders for a hand that fails ``validate_hand``; ``index`` counts from 0."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"Hand {index}: {message}")
+        self.index = index
+        self.message = message
+
+
+def validate_hand(hand: Hand) -> Hand:
+    """Check a hand built outside the API (an import) as creating and dealing do.
+
+    Six seats at positions 0-5, names within MAX_PLAYER_NAME_LENGTH, two
+    hole cards or none per player and up to five board cards, no card dealt
+    twice. Cards are put in canonical form. Raises ValueError.
+    """
+    if sorted(p.position for p in hand.players) != list(range(6)):
+        raise ValueError("Must have exactly 6 players at positions 0-5")
+    check_player_names([p.name for p in hand.players])
+    dealt = hand.board_cards = normalize_cards(hand.board_cards or "", 0, 5)
+    for player in hand.players:
+        if player.hole_cards:
+            player.hole_cards = normalize_cards(player.hole_cards, 2, 2)
+            dealt += player.hole_cards
+    normalize_cards(dealt)
+    return hand
+
+
+def apply_action(hand: Hand, action: GameAction) -> None:
+    """Move chips for an action and append it to the hand's action list."""
+    player = next(p for p in hand.players if p.position == action.player_position)
+    
+    if action.action_type == "fold":
+        player.is_folded = True
+    elif action.action_type == "call":
+        max_bet = max(p.current_bet for p in hand.players if not p.is_folded)
+        # A player who cannot cover the bet calls all-in for their stack.
+        call_amount = min(max_bet - player.current_bet, player.stack)
+        player.current_bet += call_amount
+        player.total_invested += call_amount
+        player.stack -= call_amount
+        hand.pot_size += call_amount
+    elif action.action_type == "bet":
+        player.current_bet = action.amount
+        player.total_invested += action.amount
+        player.stack -= action.amount
+        hand.pot_size += action.amount
+    elif action.action_type == "raise":
+        raise_amount = action.amount - player.current_bet
+        player.current_bet = action.amount
+        player.total_invested += raise_amount
+        player.stack -= raise_amount
+        hand.pot_size += raise_amount
+    elif action.action_type == "allin":
+        all_in_amount = player.stack
+        player.current_bet += all_in_amount
+        player.total_invested += all_in_amount
+        player.stack = 0
+        hand.pot_size += all_in_amount
+    
+    hand.actions.append(action)
@@ -0,0 +1,296 @@
+import json
+import re
+import tomllib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.models.game import (
+    Hand, Player, GameAction, ActionType, Round, InvalidHandError, apply_action, check_player_names, validate_hand,
+)
+
+# PHH (Poker Hand History, https://phh.readthedocs.io) mapping for the app's
+# no-limit hold'em hands. PHH numbers players p1..pN from the small blind, so
+# p1 is the small blind and pN the dealer; positions follow the table's own
+# layout (dealer at position 0, small blind at 1) on import. Fields the
+# standard has no room for are kept in underscore-prefixed user fields.
+SMALL_BLIND = 20
+BIG_BLIND = 40
+
+ROUNDS = tuple(Round)
+_BOARD_SLICES = ((0, 6), (6, 8), (8, 10))
+_SECTION_HEADER = re.compile(r"^\[(\d+)\]\s*$")
+
+
+def _seat_order(hand: Hand) -> List[Player]:
+    ordered = sorted(hand.players, key=lambda p: p.position)
+    sb_index = next((i for i, p in enumerate(ordered) if p.is_small_blind), 0)
+    return ordered[sb_index:] + ordered[:sb_index]
+
+
+def bet_targets(hand: Hand) -> Iterator[Tuple[GameAction, int, int]]:
+    """Replay the chip-moving actions (calls, bets, raises, all-ins) of a hand.
+
+    Yields each action with the round bet it brings the player to and the
+    highest bet before it; the action is aggressive when the first exceeds
+    the second. Calls are capped at the player's stack.
+    """
+    order = _seat_order(hand)
+    stacks = {p.position: p.stack + p.total_invested for p in order}
+    bets = {p.position: 0 for p in order}
+    for p, blind in zip(order, (SMALL_BLIND, BIG_BLIND)):
+        bets[p.position] = blind
+        stacks[p.position] -= blind
+    current_round = None
+    for action in hand.actions:
+        if action.round != current_round:
+            if current_round is not None:
+                bets = dict.fromkeys(bets, 0)
+            current_round = action.round
+        position = action.player_position
+        if action.action_type in ("fold", "check") or position not in bets:
+            continue
+        max_bet = max(bets.values())
+        if action.action_type == "call":
+            target = min(max_bet, bets[position] + stacks[position])
+        elif action.action_type == "allin":
+            target = bets[position] + stacks[position]
+        else:
+            target = action.amount
+        yield action, target, max_bet
+        stacks[position] -= target - bets[position]
+        bets[position] = target
+
+
+def preflop_raise_count(hand: Hand) -> int:
+    """Bets, raises and raising all-ins made preflop: 1 is a raised pot, 2 a 3-bet pot."""
+    return sum(
+        1 for action, target, max_bet in bet_targets(hand)
+        if action.round == Round.PREFLOP and target > max_bet
+    )
+
+
+def _toml_list(values) -> str:
+    return "[" + ", ".join(json.dumps(v) for v in values) + "]"
+
+
+def hand_to_phh(hand: Hand) -> str:
+    """Serialize a hand as the body of one PHH section."""
+    order = _seat_order(hand)
+    seat = {p.position: i + 1 for i, p in enumerate(order)}
+    starting = [p.stack + p.total_invested for p in order]
+    stacks = {p.position: p.stack + p.total_invested for p in order}
+    bets = {p.position: 0 for p in order}
+    blinds = [SMALL_BLIND, BIG_BLIND] + [0] * (len(order) - 2)
+    for p, blind in zip(order, blinds):
+        bets[p.position] = blind
+        stacks[p.position] -= blind
+
+    actions = [f"d dh p{seat[p.position]} {p.hole_cards or '????'}" for p in order]
+    street = 0
+
+    def deal_through(target: int):
+        nonlocal street
+        while street < target:
+            start, end = _BOARD_SLICES[street]
+            street += 1
+            if len(hand.board_cards or "") < end:
+                break
+            actions.append(f"d db {hand.board_cards[start:end]}")
+            for position in bets:
+                bets[position] = 0
+
+    for action in hand.actions:
+        deal_through(ROUNDS.index(action.round))
+        position = action.player_position
+        max_bet = max(bets.values())
+        if action.action_type == "fold":
+            actions.append(f"p{seat[position]} f")
+            continue
+        if action.action_type in ("check", "call"):
+            target = min(max_bet, bets[position] + stacks[position])
+        elif action.action_type == "allin":
+            target = bets[position] + stacks[position]
+        else:
+            target = action.amount
+        if target > max_bet:
+            actions.append(f"p{seat[position]} cbr {target}")
+        else:
+            actions.append(f"p{seat[position]} cc")
+        stacks[position] -= target - bets[position]
+        bets[position] = target
+
+    active = [p for p in order if not p.is_folded]
+    if hand.is_completed and len(active) > 1:
+        deal_through(len(ROUNDS) - 1)  # showdown runout
+    elif not hand.is_completed:
+        deal_through(ROUNDS.index(hand.current_round))
+
+    lines = [
+        'variant = "NT"',
+        "ante_trimming_status = false",
+        f"antes = {_toml_list([0] * len(order))}",
+        f"blinds_or_straddles = {_toml_list(blinds)}",
+        f"min_bet = {BIG_BLIND}",
+        f"starting_stacks = {_toml_list(starting)}",
+        "actions = [\n" + "".join(f"  {json.dumps(a)},\n" for a in actions) + "]",
+        f"players = {_toml_list([p.name for p in order])}",
+    ]
+    if hand.is_completed:
+        winnings = {int(k): v for k, v in (hand.winnings or {}).items()}
+        lines.append(f"finishing_stacks = {_toml_list([s + winnings.get(p.position, 0) for p, s in zip(order, starting)])}")
+    lines.append(f"_id = {json.dumps(hand.id)}")
+    if hand.created_at is not None:
+        lines.append(f"_created_at = {json.dumps(hand.created_at.isoformat())}")
+    lines.append(f"_board_cards = {json.dumps(hand.board_cards or '')}")
+    return "\n".join(lines) + "\n"
+
+
+def phh_to_hand(data: Dict) -> Hand:
+    """Build a hand from one parsed PHH section."""
+    if data.get("variant") != "NT":
+        raise ValueError(f"Unsupported PHH variant: {data.get('variant')!r}")
+    starting = data["starting_stacks"]
+    count = len(starting)
+    names = data.get("players") or []
+    check_player_names(names)
+    blinds = data.get("blinds_or_straddles") or [0] * count
+
+    # p1 (small blind) sits at position 1, pN (dealer) at position 0.
+    players = []
+    for i, stack in enumerate(starting):
+        position = (i + 1) % count
+        players.append(Player(
+            position=position,
+            name=names[i] if i < len(names) else f"Player {position + 1}",
+            stack=stack - blinds[i],
+            is_dealer=(i == count - 1),
+            is_small_blind=(i == 0),
+            is_big_blind=(i == 1),
+            current_bet=blinds[i],
+            total_invested=blinds[i],
+        ))
+
+    created_at = data.get("_created_at")
+    hand = Hand(
+        id=data.get("_id"),
+        players=sorted(players, key=lambda p: p.position),
+        actions=[],
+        pot_size=sum(blinds),
+        current_round=Round.PREFLOP,
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+    )
+
+    entries = [entry.split("#", 1)[0].split() for entry in data.get("actions", [])]
+    finishing = data.get("finishing_stacks")
+    # Board dealt after the last player action of a finished hand is the
+    # showdown runout; the table does not advance rounds for it.
+    last_action = max((i for i, parts in enumerate(entries) if parts[0].startswith("p")), default=-1)
+
+    board = ""
+    for index, parts in enumerate(entries):
+        entry = " ".join(parts)
+        if parts[:2] == ["d", "dh"]:
+            player = players[int(parts[2][1:]) - 1]
+            player.hole_cards = None if "?" in parts[3] else parts[3]
+        elif parts[:2] == ["d", "db"]:
+            board += parts[2]
+            if finishing is not None and index > last_action:
+                continue
+            for player in players:
+                player.current_bet = 0
+            hand.current_round = ROUNDS[min(ROUNDS.index(hand.current_round) + 1, len(ROUNDS) - 1)]
+        elif parts[0].startswith("p"):
+            player = players[int(parts[0][1:]) - 1]
+            max_bet = max(p.current_bet for p in players if not p.is_folded)
+            if parts[1] == "f":
+                action_type, amount = ActionType.FOLD, 0
+            elif parts[1] == "cc":
+                amount = 0
+                if player.current_bet >= max_bet:
+                    action_type = ActionType.CHECK
+                elif player.current_bet + player.stack < max_bet:
+                    action_type = ActionType.ALLIN  # calling for less than the full bet
+                else:
+                    action_type = ActionType.CALL
+            elif parts[1] == "cbr":
+                amount = int(parts[2])
+                action_type = ActionType.BET if max_bet == 0 else ActionType.RAISE
+            elif parts[1] == "sm":
+                if len(parts) > 2 and player.hole_cards is None:
+                    player.hole_cards = parts[2]
+                continue
+            else:
+                raise ValueError(f"Unsupported PHH action: {entry!r}")
+            apply_action(hand, GameAction(
+                player_position=player.position,
+                action_type=action_type,
+                amount=amount,
+                round=hand.current_round,
+            ))
+        else:
+            raise ValueError(f"Unsupported PHH action: {entry!r}")
+
+    hand.board_cards = data.get("_board_cards", board)
+    if finishing is not None:
+        hand.is_completed = True
+        hand.winnings = {
+            player.position: final - stack
+            for player, final, stack in zip(players, finishing, starting)
+        }
+        hand.winner_positions = [position for position, amount in hand.winnings.items() if amount > 0]
+    return hand
+
+
+def hands_to_phhs(hands) -> str:
+    """Serialize hands as a multi-hand .phhs document."""
+    return "\n".join(f"[{i}]\n{hand_to_phh(hand)}" for i, hand in enumerate(hands, start=1))
+
+
+class PHHSDecoder:
+    """Incremental .phhs parser fed text in arbitrary chunks.
+
+    Sections are parsed one at a time as soon as the next ``[n]`` header
+    arrives, so arbitrarily large files are read in constant memory. Each
+    hand is checked with ``validate_hand``; a bad one raises
+    InvalidHandError with its index in the document.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._section: List[str] = []
+        self._count = 0
+
+    def _parse_section(self) -> Optional[Hand]:
+        text = "".join(self._section)
+        self._section = []
+        if not text.strip():
+            return None
+        index = self._count
+        self._count += 1
+        try:
+            return validate_hand(phh_to_hand(tomllib.loads(text)))
+        except (KeyError, IndexError, TypeError) as e:
+            raise InvalidHandError(index, f"Invalid PHH hand: {e!r}")
+        except ValueError as e:
+            raise InvalidHandError(index, str(e))
+
+    def feed(self, text: str) -> List[Hand]:
+        """Add text; returns the hands completed by it."""
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        hands = []
+        for line in lines:
+            if _SECTION_HEADER.match(line):
+                hand = self._parse_section()
+                if hand is not None:
+                    hands.append(hand)
+            else:
+                self._section.append(line + "\n")
+        return hands
+
+    def close(self) -> List[Hand]:
+        """Finish the document and return its last hand."""
+        if self._pending:
+            self._section.append(self._pending)
+            self._pending = ""
+        hand = self._parse_section()
+        return [hand] if hand is not None else []
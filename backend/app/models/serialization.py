@@ -0,0 +1,44 @@
+import json
+from json.encoder import encode_basestring
+from typing import Iterable
+from app.models.game import Hand, Player
+
+# JSON written straight from the models, without building the intermediate
+# dicts json.dumps would need. The output parses to the same value as
+# json.dumps of the equivalent dict.
+_BOOL = {False: "false", True: "true"}
+
+
+def _string_or_null(value) -> str:
+    return "null" if value is None else encode_basestring(value)
+
+
+def _player_json(p: Player) -> str:
+    return (
+        f'{{"position":{p.position},"name":{encode_basestring(p.name)},"stack":{p.stack},'
+        f'"hole_cards":{_string_or_null(p.hole_cards)},"is_dealer":{_BOOL[p.is_dealer]},'
+        f'"is_small_blind":{_BOOL[p.is_small_blind]},"is_big_blind":{_BOOL[p.is_big_blind]},'
+        f'"is_folded":{_BOOL[p.is_folded]},"current_bet":{p.current_bet},"total_invested":{p.total_invested}}}'
+    )
+
+
+def players_to_json(players: Iterable[Player]) -> str:
+    """JSON array of player objects, as stored in hands.players_data."""
+    return "[" + ",".join(_player_json(p) for p in players) + "]"
+
+
+def hand_to_json(hand: Hand) -> str:
+    """JSON object for a hand in the API's hand response shape."""
+    # Action types and rounds are fixed enum values that never need escaping.
+    actions = ",".join(
+        f'{{"player_position":{a.player_position},"action_type":"{a.action_type}",'
+        f'"amount":{a.amount},"round":"{a.round}"}}'
+        for a in hand.actions
+    )
+    return (
+        f'{{"id":{encode_basestring(hand.id)},"players":{players_to_json(hand.players)},'
+        f'"actions":[{actions}],"board_cards":{_string_or_null(hand.board_cards)},'
+        f'"pot_size":{hand.pot_size},"current_round":"{hand.current_round}",'
+        f'"is_completed":{_BOOL[hand.is_completed]},'
+        f'"winner_positions":{json.dumps(hand.winner_positions)},"winnings":{json.dumps(hand.winnings)}}}'
+    )
@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+SEATS = 6
+
+
+@dataclass(slots=True)
+class Table:
+    """A six-seat table dealing one hand after another.
+
+    ``stacks`` are the seats' chips at the start of ``current_hand_id``, so
+    the next hand's stacks follow from that hand's result alone.
+    """
+    id: str
+    player_names: List[str]
+    stacks: List[int]
+    buy_in: int
+    dealer_position: int = 0
+    current_hand_id: Optional[str] = None
+    hands_played: int = 0
+    rebuys: List[int] = None  # per seat: times topped back up to the buy-in
+    is_closed: bool = False
+    created_at: Optional[datetime] = None
+
+    def __post_init__(self):
+        if self.rebuys is None:
+            self.rebuys = [0] * len(self.stacks)
+        if self.created_at is None:
+            self.created_at = datetime.utcnow()
@@ -1,4 +1,17 @@
-from .base import BaseRepository
+from .base import BaseRepository, ConcurrentUpdateError
 from .hand_repository import HandRepository
+from .async_base import AsyncBaseRepository
+from .async_hand_repository import AsyncHandRepository
+from .table_repository import AsyncTableRepository
+from .stats_repository import StatsRepository, AsyncStatsRepository
 
-__all__ = ["BaseRepository", "HandRepository"]
+__all__ = [
+    "BaseRepository",
+    "ConcurrentUpdateError",
+    "HandRepository",
+    "AsyncBaseRepository",
+    "AsyncHandRepository",
+    "AsyncTableRepository",
+    "StatsRepository",
+    "AsyncStatsRepository",
+]
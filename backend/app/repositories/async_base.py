@@ -0,0 +1,105 @@
+import re
+from abc import ABC
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from app.database.async_connection import get_async_connection
+from app.metrics import count_query, timed_query
+from app.repositories.base import ConcurrentUpdateError
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+@lru_cache(maxsize=256)
+def to_asyncpg_query(query: str) -> str:
+    """Rewrite psycopg2 ``%s`` placeholders as asyncpg ``$n`` placeholders."""
+    counter = iter(range(1, query.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", query)
+
+
+class AsyncBaseRepository(ABC):
+    """Base repository class with awaitable database operations.
+
+    Queries use the same ``%s`` placeholder style as ``BaseRepository`` so
+    SQL can be shared between the sync and async repositories.
+    """
+
+    def __init__(self):
+        pass
+
+    async def execute_query(self, query: str, params: tuple = None):
+        """Execute a query and return results."""
+        with timed_query("query"):
+            async with get_async_connection() as conn:
+                return await conn.fetch(to_asyncpg_query(query), *(params or ()))
+
+    async def execute_single(self, query: str, params: tuple = None):
+        """Execute a query and return single result."""
+        with timed_query("single"):
+            async with get_async_connection() as conn:
+                return await conn.fetchrow(to_asyncpg_query(query), *(params or ()))
+
+    async def execute_insert(self, query: str, params: tuple = None):
+        """Execute an insert query."""
+        with timed_query("insert"):
+            async with get_async_connection() as conn:
+                status = await conn.execute(to_asyncpg_query(query), *(params or ()))
+                return int(status.split()[-1]) if status and status.split()[-1].isdigit() else 0
+
+    async def execute_in_transaction(self, steps):
+        """Execute (query, [params, ...]) steps in a single transaction.
+
+        See ``BaseRepository.execute_in_transaction`` for guarded steps.
+        """
+        with timed_query("transaction"):
+            async with get_async_connection() as conn:
+                async with conn.transaction():
+                    for query, params_list, *required in steps:
+                        if not params_list:
+                            continue
+                        if not required:
+                            await conn.executemany(to_asyncpg_query(query), params_list)
+                            continue
+                        # executemany reports no row counts, so run guarded steps one by one.
+                        affected = 0
+                        for params in params_list:
+                            status = await conn.execute(to_asyncpg_query(query), *params)
+                            affected += int(status.split()[-1])
+                        if affected < required[0]:
+                            raise ConcurrentUpdateError(f"Expected {required[0]} rows, affected {affected}")
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Connection with an open transaction, committed when the block exits.
+
+        For transactions whose later statements depend on earlier results;
+        queries must be rewritten with ``to_asyncpg_query``.
+        """
+        with timed_query("transaction"):
+            async with get_async_connection() as conn:
+                async with conn.transaction():
+                    yield conn
+
+    async def stream_query(self, query: str, params: tuple = None, batch_size: int = 500):
+        """Yield result rows from a server-side cursor, ``batch_size`` at a time."""
+        # Not timed: the cursor stays open for as long as the caller iterates.
+        count_query()
+        async with get_async_connection() as conn:
+            async with conn.transaction():
+                cursor = conn.cursor(to_asyncpg_query(query), *(params or ()), prefetch=batch_size)
+                async for row in cursor:
+                    yield row
+
+    async def copy_and_merge(self, setup, copies, merge_query: str):
+        """Bulk-load rows with COPY and merge them, all in one transaction.
+
+        See ``BaseRepository.copy_and_merge``; rows are sent with asyncpg's
+        binary COPY.
+        """
+        with timed_query("copy"):
+            async with get_async_connection() as conn:
+                async with conn.transaction():
+                    for statement in setup:
+                        await conn.execute(statement)
+                    for table, columns, rows in copies:
+                        await conn.copy_records_to_table(table, records=rows, columns=list(columns))
+                    return await conn.fetchval(merge_query)
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from app.metrics import SERIALIZATION_DURATION
+from app.repositories.async_base import AsyncBaseRepository, to_asyncpg_query
+from app.repositories.base import ConcurrentUpdateError
+from app.repositories.hand_repository import (
+    GET_HAND_QUERY,
+    GET_HAND_VERSION_QUERY,
+    COMPLETED_HANDS_QUERY,
+    HANDS_BY_IDS_QUERY,
+    hand_save_steps,
+    hand_saves_params,
+    save_headers_query,
+    APPEND_ACTIONS_QUERY,
+    LOCK_HAND_VERSIONS_QUERY,
+    SET_VERSIONS_QUERY,
+    HandSave,
+    hand_bulk_copies,
+    BULK_STAGE_QUERIES,
+    BULK_MERGE_QUERY,
+    hand_storage_format,
+    hands_page_query,
+    hand_keys_query,
+    hand_search_query,
+    row_to_hand,
+    HandSearch,
+    SEGMENTS_QUERY,
+    hand_key,
+    mark_partitions,
+    missing_partitions,
+    row_key,
+)
+from app.database.partitions import create_partitions_statement
+from app.repositories.hand_archive import (
+    HandArchive,
+    get_hand_archive,
+    merge_newest_first,
+    merge_newest_first_async,
+)
+from app.models.game import Hand
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHandRepository(AsyncBaseRepository):
+    """Awaitable counterpart of HandRepository backed by the asyncpg pool."""
+
+    def __init__(self, storage_format: Optional[str] = None):
+        super().__init__()
+        self.storage_format = hand_storage_format(storage_format)
+        self.binary = self.storage_format == "binary"
+        self.archive = get_hand_archive()
+
+    async def _archive(self, force: bool = False) -> HandArchive:
+        """The archive view, reloading its catalog when stale (or ``force``)."""
+        if force or self.archive.stale():
+            self.archive.load_catalog(await self.execute_query(SEGMENTS_QUERY))
+        return self.archive
+
+    async def _read_archive(self, read, *args):
+        """Run an archive read in a worker thread; segment reads are blocking I/O and zlib."""
+        if not len(self.archive):
+            return read(*args)
+        return await asyncio.to_thread(read, *args)
+
+    async def ensure_partitions(self, hands: Iterable[Hand], force: bool = False):
+        """Create the month partitions ``hands`` belong to, unless known to exist."""
+        months = missing_partitions(hands, force)
+        if months:
+            await self.execute_insert(create_partitions_statement(months))
+            mark_partitions(months)
+
+    async def save_hand(
+        self,
+        hand: Hand,
+        from_seq: int = 0,
+        write_header: bool = True,
+        expected_version: Optional[int] = None
+    ) -> bool:
+        """Append actions from ``from_seq`` to the log and upsert the header row.
+
+        Raises ConcurrentUpdateError if ``expected_version`` is given and the
+        stored hand is at another version.
+        """
+        try:
+            await self.ensure_partitions([hand])
+            await self.execute_in_transaction(
+                hand_save_steps(hand, from_seq, write_header, self.binary, expected_version)
+            )
+            return True
+        except ConcurrentUpdateError:
+            raise
+        except Exception:
+            logger.exception("Error saving hand %s", hand.id)
+            return False
+
+    async def save_hands(self, saves: List[HandSave]) -> List[bool]:
+        """Save a batch of distinct hands in one transaction; returns which were written.
+
+        A save whose ``expected_version`` no longer matches is left out and
+        reported as False. Their partitions must exist (``ensure_partitions``).
+        Database errors roll back the whole batch and are raised.
+        """
+        if len(saves) == 1:
+            # Alone, the guarded per-hand steps take one round trip less.
+            try:
+                await self.execute_in_transaction(saves[0].steps())
+                return [True]
+            except ConcurrentUpdateError:
+                return [False]
+        async with self.transaction() as conn:
+            rows = await conn.fetch(
+                to_asyncpg_query(LOCK_HAND_VERSIONS_QUERY),
+                [save.id for save in saves],
+                list({save.created_at for save in saves})
+            )
+            stored = {row["id"]: row["version"] for row in rows}
+            written = [not save.conflicts(stored.get(save.id)) for save in saves]
+            # Headers in id order, the order their rows were locked in.
+            accepted = sorted((save for save, ok in zip(saves, written) if ok), key=lambda save: save.id)
+            headers, versions, actions = hand_saves_params(accepted)
+            if headers:
+                await conn.execute(
+                    to_asyncpg_query(save_headers_query(len(headers))),
+                    *[param for header in headers for param in header]
+                )
+            if versions[0]:
+                await conn.execute(to_asyncpg_query(SET_VERSIONS_QUERY), *versions)
+            if actions:
+                await conn.execute(to_asyncpg_query(APPEND_ACTIONS_QUERY), *actions)
+        return written
+
+    async def bulk_insert_hands(self, hands: List[Hand]) -> int:
+        """Insert hands and their action logs with COPY; existing ids are skipped.
+
+        Returns the number of hands inserted.
+        """
+        if not hands:
+            return 0
+        # Imported hands may be from any month, including dropped ones.
+        await self.ensure_partitions(hands, force=True)
+        return await self.copy_and_merge(BULK_STAGE_QUERIES, hand_bulk_copies(hands, self.binary), BULK_MERGE_QUERY)
+
+    async def get_hand_version(self, hand_id: str) -> Optional[int]:
+        """Stored version of a hand, without loading it."""
+        result = await self.execute_single(GET_HAND_VERSION_QUERY, (hand_id,))
+        return result['version'] if result else None
+
+    async def get_hand_by_id(self, hand_id: str) -> Optional[Hand]:
+        """Get a hand by its ID."""
+        result = await self.execute_single(GET_HAND_QUERY, (hand_id,))
+
+        if not result:
+            # Misses are checked against segment bloom filters; the catalog is
+            # only reloaded when stale, not on every miss.
+            return await self._read_archive((await self._archive()).get, hand_id)
+
+        return self._row_to_hand(result)
+
+    async def get_all_hands(self, limit: int = 50) -> List[Hand]:
+        """Get all hands ordered by creation date."""
+        return await self.get_hands_page(limit)
+
+    async def get_completed_hands(self, limit: int = 50) -> List[Hand]:
+        """Get completed hands only."""
+        results = await self.execute_query(COMPLETED_HANDS_QUERY, (limit,))
+        hands = [self._row_to_hand(row) for row in results]
+        archived = await self._read_archive((await self._archive()).hands_page, None, limit)
+
+        return list(merge_newest_first(hands, archived, hand_key, limit))
+
+    async def get_hands_page(self, limit: int = 50, after: Optional[Tuple[datetime, str]] = None) -> List[Hand]:
+        """Get up to ``limit`` hands older than the ``after`` (created_at, id) key."""
+        results = await self.execute_query(*hands_page_query(after, limit))
+        hands = [self._row_to_hand(row) for row in results]
+        archived = await self._read_archive((await self._archive()).hands_page, after, limit)
+
+        return list(merge_newest_first(hands, archived, hand_key, limit))
+
+    async def get_hand_keys_page(
+        self,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Tuple[str, datetime]]:
+        """(id, created_at) of up to ``limit`` hands older than the ``after`` key."""
+        results = await self.execute_query(*hand_keys_query(after, limit))
+        keys = [(row['id'], row['created_at']) for row in results]
+        archived = await self._read_archive((await self._archive()).keys_page, after, limit)
+
+        return list(merge_newest_first(keys, archived, row_key, limit))
+
+    async def search_hand_keys(
+        self,
+        search: HandSearch,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Tuple[str, datetime]]:
+        """(id, created_at) of up to ``limit`` hands matching ``search`` older than the ``after`` key."""
+        results = await self.execute_query(*hand_search_query(search, after, limit))
+
+        return [(row['id'], row['created_at']) for row in results]
+
+    async def get_hands_by_ids(self, hand_ids: List[str]) -> List[Hand]:
+        """Get the hands with the given IDs, in no particular order."""
+        if not hand_ids:
+            return []
+        results = await self.execute_query(HANDS_BY_IDS_QUERY, (list(hand_ids),))
+        hands = [self._row_to_hand(row) for row in results]
+        found = {hand.id for hand in hands}
+        missing = [hand_id for hand_id in hand_ids if hand_id not in found]
+        archived = await self._read_archive((await self._archive()).get_many, missing) if missing else []
+
+        return hands + archived
+
+    async def stream_hands(
+        self,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Hand]:
+        """Iterate hands newest first through a server-side cursor, archived ones included."""
+        archive = await self._archive()
+        hot = (self._row_to_hand(row) async for row in self.stream_query(*hands_page_query(after, limit)))
+        async for hand in merge_newest_first_async(hot, archive.iter_hands(after), hand_key, limit):
+            yield hand
+
+    def _row_to_hand(self, row) -> Hand:
+        """Convert database record to Hand object."""
+        started = time.perf_counter()
+        hand = row_to_hand(row)
+        SERIALIZATION_DURATION.labels("row").observe(time.perf_counter() - started)
+        return hand
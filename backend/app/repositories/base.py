@@ -1,5 +1,28 @@
+import csv
+import io
+import uuid
 from abc import ABC, abstractmethod
 from app.database.connection import get_db_cursor
+from app.metrics import count_query, timed_query
+
+# COPY csv spelling of NULL, so empty strings still load as empty strings.
+_CSV_NULL = "\\N"
+
+
+def _csv_row(row) -> list:
+    """COPY csv fields for a row: None as NULL, bytes in bytea hex form, lists as arrays."""
+    return [
+        _CSV_NULL if value is None
+        else "\\x" + value.hex() if isinstance(value, (bytes, memoryview))
+        else "{" + ",".join(map(str, value)) + "}" if isinstance(value, list)
+        else value
+        for value in row
+    ]
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a guarded transaction step affects fewer rows than required."""
+
 
 class BaseRepository(ABC):
     """Base repository class with common database operations."""
@@ -9,18 +32,66 @@ class BaseRepository(ABC):
     
     def execute_query(self, query: str, params: tuple = None):
         """Execute a query and return results."""
-        with get_db_cursor() as cursor:
+        with timed_query("query"), get_db_cursor() as cursor:
             cursor.execute(query, params)
             return cursor.fetchall()
     
     def execute_single(self, query: str, params: tuple = None):
         """Execute a query and return single result."""
-        with get_db_cursor() as cursor:
+        with timed_query("single"), get_db_cursor() as cursor:
             cursor.execute(query, params)
             return cursor.fetchone()
     
     def execute_insert(self, query: str, params: tuple = None):
         """Execute an insert query."""
-        with get_db_cursor() as cursor:
+        with timed_query("insert"), get_db_cursor() as cursor:
             cursor.execute(query, params)
             return cursor.rowcount
+    
+    def execute_in_transaction(self, steps):
+        """Execute (query, [params, ...]) steps in a single transaction.
+
+        A step may carry a third element, the number of rows it must affect;
+        if it affects fewer the transaction rolls back with
+        ConcurrentUpdateError.
+        """
+        with timed_query("transaction"), get_db_cursor() as cursor:
+            for query, params_list, *required in steps:
+                if params_list:
+                    cursor.executemany(query, params_list)
+                    if required and cursor.rowcount < required[0]:
+                        raise ConcurrentUpdateError(f"Expected {required[0]} rows, affected {cursor.rowcount}")
+    
+    def stream_query(self, query: str, params: tuple = None, batch_size: int = 500):
+        """Yield result rows from a server-side cursor, ``batch_size`` at a time."""
+        # Not timed: the cursor stays open for as long as the caller iterates.
+        count_query()
+        with get_db_cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+    
+    def copy_and_merge(self, setup, copies, merge_query: str):
+        """Bulk-load rows with COPY and merge them, all in one transaction.
+
+        ``setup`` statements run first (typically creating staging tables),
+        then each ``(table, columns, rows)`` in ``copies`` is streamed in with
+        ``COPY ... FROM STDIN`` and finally ``merge_query`` runs; its first
+        column of the first row is returned.
+        """
+        with timed_query("copy"), get_db_cursor() as cursor:
+            for statement in setup:
+                cursor.execute(statement)
+            for table, columns, rows in copies:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(_csv_row(row) for row in rows)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN "
+                    f"WITH (FORMAT csv, NULL '{_CSV_NULL}')",
+                    buffer
+                )
+            cursor.execute(merge_query)
+            row = cursor.fetchone()
+            return next(iter(row.values())) if row else None
@@ -0,0 +1,435 @@
+"""Cold storage of completed hands in compressed columnar segment files.
+
+The archiver moves completed hands out of old ``hands`` partitions into
+segment files and lists each file in the ``hand_segments`` table; the hand
+repositories read through to them (``HandArchive``) so lookups by id and the
+history see hot and archived hands alike.
+
+A segment holds hands newest first, the order of the history. Layout
+(little-endian)::
+
+    SEGMENT_MAGIC, u32 header length, JSON header
+    columns  each zlib-compressed: ids (S36), created_at (i64 µs since the
+             Unix epoch, UTC), id_order (i32 argsort of ids), hand_ends (u32
+             end of each hand in its block), block_offsets (i64), bloom (u8),
+             versions (i64 hand version, which the codec does not store;
+             segments written without it read as version 0)
+    blocks   BLOCK_SIZE hands each, app.models.codec encodings back to back,
+             zlib-compressed one block at a time
+
+The header gives each column's dtype, offset and length. Only the bloom
+filter is read when a segment is opened; the key columns are loaded on the
+first lookup that passes it, and a hand costs one block read. Reads are
+blocking file I/O and decompression, and may run in worker threads.
+"""
+import asyncio
+import hashlib
+import heapq
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.models.codec import decode_hand, encode_hand
+from app.models.game import Hand
+
+SEGMENT_MAGIC = b"PKSG\x01"
+SEGMENT_SUFFIX = ".pkseg"
+BLOCK_SIZE = 1024
+BLOOM_BITS_PER_HAND = 10
+BLOOM_HASHES = 7
+# Archived hands read per worker-thread hop when merged into an async stream.
+STREAM_BATCH_SIZE = 256
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "hand_archive")
+
+_U32 = struct.Struct("<I")
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+Key = Tuple[int, str]  # (created_at µs, id), compared newest first
+
+
+def _micros(created_at: datetime) -> int:
+    if created_at.tzinfo is not None:
+        return (created_at - _EPOCH_UTC) // timedelta(microseconds=1)
+    return (created_at - _EPOCH) // timedelta(microseconds=1)
+
+
+def _bloom_positions(hand_id: str, bits: int) -> List[int]:
+    digest = hashlib.blake2b(hand_id.encode(), digest_size=16).digest()
+    first, second = struct.unpack("<QQ", digest)
+    return [(first + i * second) % bits for i in range(BLOOM_HASHES)]
+
+
+def write_segment(path: str, hands: Sequence[Hand]) -> Dict:
+    """Write ``hands`` (newest first) as a segment file; returns its catalog fields.
+
+    The file is written under a temporary name, synced and renamed, so a
+    segment is either complete or absent.
+    """
+    count = len(hands)
+    ids = np.array([hand.id.encode() for hand in hands], dtype="S36")
+    created = np.array([_micros(hand.created_at) for hand in hands], dtype=np.int64)
+    bloom_bits = max(count * BLOOM_BITS_PER_HAND, 64)
+    bloom = np.zeros(bloom_bits, dtype=bool)
+    blocks = []
+    hand_ends = np.zeros(count, dtype=np.uint32)
+    for start in range(0, count, BLOCK_SIZE):
+        encoded = [encode_hand(hand) for hand in hands[start:start + BLOCK_SIZE]]
+        hand_ends[start:start + len(encoded)] = np.cumsum([len(data) for data in encoded])
+        blocks.append(zlib.compress(b"".join(encoded)))
+    for hand in hands:
+        bloom[_bloom_positions(hand.id, bloom_bits)] = True
+    columns = {
+        "ids": ids,
+        "created_at": created,
+        "id_order": np.argsort(ids, kind="stable").astype(np.int32),
+        "hand_ends": hand_ends,
+        "block_offsets": np.cumsum([0] + [len(block) for block in blocks], dtype=np.int64),
+        "bloom": np.packbits(bloom),
+        "versions": np.array([hand.version for hand in hands], dtype=np.int64),
+    }
+
+    sections = []
+    layout = {}
+    offset = 0
+    for name, values in columns.items():
+        data = zlib.compress(values.tobytes())
+        layout[name] = [values.dtype.str, offset, len(data)]
+        sections.append(data)
+        offset += len(data)
+    header = json.dumps({
+        "count": count,
+        "block_size": BLOCK_SIZE,
+        "bloom_bits": bloom_bits,
+        "aware": bool(hands) and hands[0].created_at.tzinfo is not None,
+        "columns": layout,
+        "blocks_offset": offset,
+    }).encode()
+
+    temporary = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temporary, "wb") as out:
+        out.write(SEGMENT_MAGIC + _U32.pack(len(header)) + header)
+        for data in sections + blocks:
+            out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temporary, path)
+    return {
+        "hand_count": count,
+        "min_created_at": min(hand.created_at for hand in hands) if hands else None,
+        "max_created_at": max(hand.created_at for hand in hands) if hands else None,
+        "bytes": os.path.getsize(path),
+    }
+
+
+class HandSegment:
+    """One segment file; key columns are loaded on demand and can be dropped again."""
+
+    def __init__(self, path: str, hand_count: int, min_created_at: datetime, max_created_at: datetime):
+        self.path = path
+        self.hand_count = hand_count
+        self.min_key = _micros(min_created_at)
+        self.max_key = _micros(max_created_at)
+        self._header: Optional[Dict] = None
+        self._data_offset = 0
+        self._bloom: Optional[np.ndarray] = None
+        self._keys: Optional[Tuple[np.ndarray, ...]] = None
+        self._block: Tuple[int, bytes] = (-1, b"")
+        # Guards loading the header, bloom filter and key columns.
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._bloom is not None:
+            return
+        with self._lock:
+            if self._bloom is not None:
+                return
+            with open(self.path, "rb") as source:
+                magic = source.read(len(SEGMENT_MAGIC))
+                if magic != SEGMENT_MAGIC:
+                    raise ValueError(f"Not a hand segment: {self.path}")
+                (length,) = _U32.unpack(source.read(_U32.size))
+                self._header = json.loads(source.read(length))
+                self._data_offset = len(SEGMENT_MAGIC) + _U32.size + length
+            self._bloom = np.unpackbits(self._column("bloom"))[:self._header["bloom_bits"]].astype(bool)
+
+    def _column(self, name: str) -> np.ndarray:
+        dtype, offset, length = self._header["columns"][name]
+        with open(self.path, "rb") as source:
+            source.seek(self._data_offset + offset)
+            return np.frombuffer(zlib.decompress(source.read(length)), dtype=np.dtype(dtype))
+
+    def might_contain(self, hand_id: str) -> bool:
+        """Bloom filter check: False means the hand is certainly not here."""
+        self._open()
+        return bool(self._bloom[_bloom_positions(hand_id, self._header["bloom_bits"])].all())
+
+    def keys(self):
+        """(ids, created_at, id_order, hand_ends, block_offsets, versions) columns, loading them if needed."""
+        keys = self._keys
+        if keys is None:
+            self._open()
+            with self._lock:
+                keys = self._keys
+                if keys is None:
+                    columns = ("ids", "created_at", "id_order", "hand_ends", "block_offsets")
+                    keys = [self._column(name) for name in columns]
+                    if "versions" in self._header["columns"]:
+                        keys.append(self._column("versions"))
+                    else:
+                        keys.append(np.zeros(self.hand_count, dtype=np.int64))
+                    keys = self._keys = tuple(keys)
+        return keys
+
+    def unload(self):
+        """Drop the key columns and cached block; the bloom filter stays."""
+        self._keys = None
+        self._block = (-1, b"")
+
+    def index_of(self, hand_id: str) -> Optional[int]:
+        """Position of a hand in the segment, or None."""
+        if not self.might_contain(hand_id):
+            return None
+        ids, _, id_order, _, _, _ = self.keys()
+        target = hand_id.encode()
+        found = int(np.searchsorted(ids, target, sorter=id_order))
+        if found < len(ids) and ids[id_order[found]] == target:
+            return int(id_order[found])
+        return None
+
+    def start_after(self, after: Optional[Key]) -> int:
+        """Index of the first hand strictly older than the ``after`` key."""
+        if after is None:
+            return 0
+        ids, created, _, _, _, _ = self.keys()
+        newest_first = -created
+        low = int(np.searchsorted(newest_first, -after[0], side="left"))
+        high = int(np.searchsorted(newest_first, -after[0], side="right"))
+        target = after[1].encode()
+        return low + int(np.count_nonzero(ids[low:high] >= target))
+
+    def created_at(self, micros: int) -> datetime:
+        """A stored timestamp as an aware UTC datetime, like hands.created_at."""
+        return _EPOCH_UTC + timedelta(microseconds=micros)
+
+    def hand(self, index: int) -> Hand:
+        """Decode the hand at ``index``."""
+        _, _, _, hand_ends, block_offsets, versions = self.keys()
+        block_size = self._header["block_size"]
+        block = index // block_size
+        # Read into a local, as another thread may swap the cached block.
+        cached = self._block
+        if cached[0] != block:
+            with open(self.path, "rb") as source:
+                source.seek(self._data_offset + self._header["blocks_offset"] + int(block_offsets[block]))
+                data = source.read(int(block_offsets[block + 1] - block_offsets[block]))
+            cached = self._block = (block, zlib.decompress(data))
+        start = int(hand_ends[index - 1]) if index % block_size else 0
+        hand = decode_hand(cached[1][start:int(hand_ends[index])])
+        hand.version = int(versions[index])
+        if hand.created_at.tzinfo is None:
+            # Archived from hands without time zone, whose times were UTC.
+            hand.created_at = hand.created_at.replace(tzinfo=timezone.utc)
+        return hand
+
+    def iter_keys(self, after: Optional[Key]) -> Iterator[Tuple[Key, "HandSegment", int]]:
+        """(key, segment, index) of the hands older than ``after``, newest first."""
+        ids, created, _, _, _, _ = self.keys()
+        for index in range(self.start_after(after), len(ids)):
+            yield (int(created[index]), ids[index].decode()), self, index
+
+
+class HandArchive:
+    """Read-through view of the segments listed in hand_segments.
+
+    The catalog is loaded by the repositories (``load_catalog``) when it is
+    older than ``refresh_interval`` seconds, so a hand archived by another
+    process is found within that long. At most ``max_loaded`` segments keep their key columns in memory.
+    """
+
+    def __init__(self, directory: str, refresh_interval: float = 5.0, max_loaded: int = 8):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.max_loaded = max_loaded
+        self._segments: Dict[str, HandSegment] = {}
+        self._loaded: "OrderedDict[str, HandSegment]" = OrderedDict()
+        self._loaded_lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def stale(self) -> bool:
+        """Whether the catalog is due for a reload."""
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def load_catalog(self, rows: Iterable):
+        """Replace the catalog with hand_segments rows, keeping already opened segments."""
+        segments = {}
+        for row in rows:
+            path = row["path"]
+            segments[path] = self._segments.get(path) or HandSegment(
+                os.path.join(self.directory, path), row["hand_count"], row["min_created_at"], row["max_created_at"]
+            )
+        self._segments = segments
+        with self._loaded_lock:
+            for path in [path for path in self._loaded if path not in segments]:
+                del self._loaded[path]
+        self._refreshed_at = time.monotonic()
+
+    def new_segment_path(self, month: date) -> str:
+        """Catalog path (relative to the archive directory) for a new segment of ``month``."""
+        os.makedirs(self.directory, exist_ok=True)
+        return f"hands-{month:%Y-%m}-{uuid.uuid4().hex[:12]}{SEGMENT_SUFFIX}"
+
+    def write(self, path: str, hands: Sequence[Hand]) -> Dict:
+        """Write a segment at a catalog path; see ``write_segment``."""
+        return write_segment(os.path.join(self.directory, path), hands)
+
+    def _touch(self, segment: HandSegment):
+        # Iterators hold on to the columns they use, so unloading is always safe.
+        with self._loaded_lock:
+            self._loaded[segment.path] = segment
+            self._loaded.move_to_end(segment.path)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)[1].unload()
+
+    def get(self, hand_id: str) -> Optional[Hand]:
+        """An archived hand by id, or None."""
+        for segment in self._segments.values():
+            index = segment.index_of(hand_id)
+            if index is not None:
+                self._touch(segment)
+                return segment.hand(index)
+        return None
+
+    def get_many(self, hand_ids: Iterable[str]) -> List[Hand]:
+        """The archived hands among ``hand_ids``, in no particular order."""
+        hands = []
+        for hand_id in hand_ids:
+            hand = self.get(hand_id)
+            if hand is not None:
+                hands.append(hand)
+        return hands
+
+    def _page(self, after: Optional[Tuple[datetime, str]], limit: Optional[int]) -> List[Tuple[Key, HandSegment, int]]:
+        after_key = (_micros(after[0]), after[1]) if after is not None else None
+        entries: List[Tuple[Key, HandSegment, int]] = []
+        for segment in sorted(self._segments.values(), key=lambda s: s.max_key, reverse=True):
+            if after_key is not None and segment.min_key > after_key[0]:
+                continue
+            if limit is not None and len(entries) >= limit and segment.max_key < entries[-1][0][0]:
+                break
+            self._touch(segment)
+            entries.extend(islice(segment.iter_keys(after_key), limit))
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+            if limit is not None:
+                del entries[limit:]
+        return entries
+
+    def keys_page(self, after: Optional[Tuple[datetime, str]], limit: Optional[int]) -> List[Tuple[str, datetime]]:
+        """(id, created_at) of up to ``limit`` archived hands older than ``after``, newest first."""
+        return [(key[1], segment.created_at(key[0])) for key, segment, _ in self._page(after, limit)]
+
+    def hands_page(self, after: Optional[Tuple[datetime, str]], limit: Optional[int]) -> List[Hand]:
+        """Up to ``limit`` archived hands older than ``after``, newest first."""
+        return [segment.hand(index) for _, segment, index in self._page(after, limit)]
+
+    def iter_hands(self, after: Optional[Tuple[datetime, str]] = None) -> Iterator[Hand]:
+        """Every archived hand older than ``after``, newest first."""
+        after_key = (_micros(after[0]), after[1]) if after is not None else None
+        streams = [segment.iter_keys(after_key) for segment in self._segments.values()]
+        for _, segment, index in heapq.merge(*streams, key=lambda entry: entry[0], reverse=True):
+            yield segment.hand(index)
+
+
+def merge_newest_first(hot: Iterable, cold: Iterable, key, limit: Optional[int] = None) -> Iterator:
+    """Merge newest-first hot and archived items by ``key``, up to ``limit``.
+
+    A hand both stored and archived (imported again after archiving) has
+    the same key in both, so the archived copy right after it is skipped.
+    """
+    previous = None
+    count = 0
+    for item in heapq.merge(hot, cold, key=key, reverse=True):
+        if limit is not None and count >= limit:
+            return
+        item_key = key(item)
+        if item_key == previous:
+            continue
+        previous = item_key
+        count += 1
+        yield item
+
+
+async def merge_newest_first_async(
+    hot: AsyncIterator,
+    cold: Iterator,
+    key,
+    limit: Optional[int] = None
+) -> AsyncIterator:
+    """``merge_newest_first`` for an async hot stream.
+
+    The archived items are read in worker threads, STREAM_BATCH_SIZE at a
+    time, so segment reads never block the event loop.
+    """
+    batch: List = []
+
+    async def next_cold():
+        nonlocal batch
+        if not batch:
+            batch = await asyncio.to_thread(lambda: list(islice(cold, STREAM_BATCH_SIZE)))
+            batch.reverse()
+        return batch.pop() if batch else None
+
+    cold_item = await next_cold()
+    previous = None
+    count = 0
+
+    def emit(item) -> bool:
+        nonlocal previous, count
+        item_key = key(item)
+        if item_key == previous:
+            return False
+        previous = item_key
+        count += 1
+        return True
+
+    async for item in hot:
+        while cold_item is not None and key(cold_item) > key(item):
+            if limit is not None and count >= limit:
+                return
+            if emit(cold_item):
+                yield cold_item
+            cold_item = await next_cold()
+        if limit is not None and count >= limit:
+            return
+        if emit(item):
+            yield item
+    while cold_item is not None and (limit is None or count < limit):
+        if emit(cold_item):
+            yield cold_item
+        cold_item = await next_cold()
+
+
+_archive: Optional[HandArchive] = None
+
+
+def get_hand_archive() -> HandArchive:
+    """Process-wide archive view, configured by HAND_ARCHIVE_DIR and HAND_ARCHIVE_REFRESH."""
+    global _archive
+    if _archive is None:
+        _archive = HandArchive(
+            os.getenv("HAND_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR),
+            float(os.getenv("HAND_ARCHIVE_REFRESH", "5")),
+        )
+    return _archive
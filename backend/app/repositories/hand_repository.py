@@ -1,162 +1,845 @@
+import base64
 import json
-from typing import List, Optional
-from app.repositories.base import BaseRepository
-from app.models.game import Hand, Player, GameAction
-from datetime import datetime
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.database.partitions import (
+    LIST_PARTITIONS_QUERY,
+    create_partitions_statement,
+    drop_partition_if_empty_statement,
+    month_of_partition,
+    next_month,
+    partition_month,
+)
+from app.metrics import SERIALIZATION_DURATION
+from app.repositories.base import BaseRepository, ConcurrentUpdateError
+from app.repositories.hand_archive import HandArchive, get_hand_archive, merge_newest_first
+from app.models.cards import parse_cards
+from app.models.codec import decode_hand, encode_hand
+from app.models.game import Hand, Player, GameAction, ActionType, Round, apply_action
+from app.models.phh import preflop_raise_count
+from app.models.serialization import players_to_json
+from datetime import datetime, timezone
 
-class HandRepository(BaseRepository):
-    """Repository for hand data operations using raw SQL."""
-    
-    def save_hand(self, hand: Hand) -> bool:
-        """Save a hand to the database using UPSERT."""
-        query = """
-            INSERT INTO hands (
-                id, players_data, actions_data, board_cards, pot_size,
-                current_round, is_completed, winner_positions, winnings, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO UPDATE SET
-                players_data = EXCLUDED.players_data,
-                actions_data = EXCLUDED.actions_data,
-                board_cards = EXCLUDED.board_cards,
-                pot_size = EXCLUDED.pot_size,
-                current_round = EXCLUDED.current_round,
-                is_completed = EXCLUDED.is_completed,
-                winner_positions = EXCLUDED.winner_positions,
-                winnings = EXCLUDED.winnings
+logger = logging.getLogger(__name__)
+
+# The hands row is a compact header: player state as of the last round
+# change (or deal/completion) plus the number of logged actions it covers.
+# Actions themselves live one row each in the append-only hand_actions log.
+# With binary storage the header is kept in hand_data instead (players_data
+# is left empty), encoded by app.models.codec together with the actions it
+# covers, so reads only fetch the log past actions_count.
+_HEADER_VALUES = "(%s, %s, '[]', %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+
+SAVE_HAND_HEADER_QUERY = f"""
+INSERT INTO hands (
+    id, players_data, actions_data, board_cards, pot_size,
+    current_round, is_completed, winner_positions, winnings, created_at,
+    actions_count, hand_data, version, preflop_raises, board_codes, hole_combos
+) VALUES {_HEADER_VALUES}
+ON CONFLICT (id, created_at) DO UPDATE SET
+    players_data = EXCLUDED.players_data,
+    actions_data = EXCLUDED.actions_data,
+    board_cards = EXCLUDED.board_cards,
+    pot_size = EXCLUDED.pot_size,
+    current_round = EXCLUDED.current_round,
+    is_completed = EXCLUDED.is_completed,
+    winner_positions = EXCLUDED.winner_positions,
+    winnings = EXCLUDED.winnings,
+    actions_count = EXCLUDED.actions_count,
+    hand_data = EXCLUDED.hand_data,
+    version = EXCLUDED.version,
+    preflop_raises = EXCLUDED.preflop_raises,
+    board_codes = EXCLUDED.board_codes,
+    hole_combos = EXCLUDED.hole_combos
+"""
+
+# Optimistic concurrency: every save stores the hand's version, and a writer
+# that names the version it last persisted or loaded only succeeds if the
+# row still has it. The *_CAS_QUERY variants take that expected version as
+# their last parameter and affect no row when another writer got there first.
+SAVE_HAND_HEADER_CAS_QUERY = SAVE_HAND_HEADER_QUERY + "WHERE hands.version = %s\n"
+
+SET_VERSION_QUERY = "UPDATE hands SET version = %s WHERE id = %s AND created_at = %s"
+
+SET_VERSION_CAS_QUERY = SET_VERSION_QUERY + " AND version = %s"
+
+GET_HAND_VERSION_QUERY = "SELECT version FROM hands WHERE id = %s"
+
+# Group commit (app.services.hand_writer): a batch of distinct hands is saved
+# in one transaction. Their rows are locked and their versions read first, in
+# id order, so compare-and-swap is decided per hand and a conflicting hand is
+# left out of the batch instead of failing it. The others are then written
+# with one multi-row statement each for headers, versions and actions.
+LOCK_HAND_VERSIONS_QUERY = """
+SELECT id, version FROM hands
+WHERE id = ANY(%s) AND created_at = ANY(%s)
+ORDER BY id
+FOR UPDATE
+"""
+
+SET_VERSIONS_QUERY = """
+UPDATE hands h SET version = v.version
+FROM unnest(%s::varchar[], %s::int[]) AS v(id, version)
+WHERE h.id = v.id AND h.created_at = ANY(%s)
+"""
+
+APPEND_ACTIONS_QUERY = """
+INSERT INTO hand_actions (hand_id, seq, position, type, amount, round)
+SELECT * FROM unnest(%s::varchar[], %s::int[], %s::smallint[], %s::varchar[], %s::int[], %s::varchar[])
+ON CONFLICT (hand_id, seq) DO NOTHING
+"""
+
+APPEND_ACTION_QUERY = """
+INSERT INTO hand_actions (hand_id, seq, position, type, amount, round)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (hand_id, seq) DO NOTHING
+"""
+
+HAND_SELECT = """
+SELECT h.*, COALESCE((
+    SELECT json_agg(json_build_array(a.position, a.type, a.amount, a.round) ORDER BY a.seq)
+    FROM hand_actions a
+    WHERE a.hand_id = h.id AND (h.hand_data IS NULL OR a.seq >= h.actions_count)
+), '[]'::json) AS action_log
+FROM hands h
+"""
+
+GET_HAND_QUERY = HAND_SELECT + "WHERE h.id = %s"
+
+ALL_HANDS_QUERY = HAND_SELECT + """
+ORDER BY h.created_at DESC, h.id DESC
+LIMIT %s
+"""
+
+# Keyset pagination: hands strictly older than the (created_at, id) cursor,
+# served by idx_hands_created_at_id.
+HANDS_AFTER_QUERY = HAND_SELECT + """
+WHERE (h.created_at, h.id) < (%s, %s)
+ORDER BY h.created_at DESC, h.id DESC
+LIMIT %s
+"""
+
+# History keys only, so pages can be filled from in-memory copies and only
+# the remaining hands fetched with HANDS_BY_IDS_QUERY.
+HAND_KEYS_QUERY = """
+SELECT id, created_at FROM hands
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+
+HAND_KEYS_AFTER_QUERY = """
+SELECT id, created_at FROM hands
+WHERE (created_at, id) < (%s, %s)
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+
+HANDS_BY_IDS_QUERY = HAND_SELECT + "WHERE h.id = ANY(%s)"
+
+COMPLETED_HANDS_QUERY = HAND_SELECT + """
+WHERE h.is_completed = TRUE
+ORDER BY h.created_at DESC
+LIMIT %s
+"""
+
+
+# Bulk import: COPY into per-transaction staging tables, then insert the
+# hands that do not exist yet together with their action logs.
+HAND_COPY_COLUMNS = (
+    "id", "players_data", "actions_data", "board_cards", "pot_size", "current_round",
+    "is_completed", "winner_positions", "winnings", "created_at", "actions_count", "hand_data", "version",
+    "preflop_raises", "board_codes", "hole_combos",
+)
+# Names of the hand_to_header_params values, in order (actions_data is a
+# constant in the header query).
+HAND_HEADER_COLUMNS = tuple(column for column in HAND_COPY_COLUMNS if column != "actions_data")
+ACTION_COPY_COLUMNS = ("hand_id", "seq", "position", "type", "amount", "round")
+
+BULK_STAGE_QUERIES = (
+    "CREATE TEMP TABLE hands_stage (LIKE hands INCLUDING DEFAULTS) ON COMMIT DROP",
+    "CREATE TEMP TABLE hand_actions_stage (LIKE hand_actions INCLUDING DEFAULTS) ON COMMIT DROP",
+)
+
+BULK_MERGE_QUERY = f"""
+WITH inserted AS (
+    INSERT INTO hands ({", ".join(HAND_COPY_COLUMNS)})
+    SELECT {", ".join(HAND_COPY_COLUMNS)} FROM hands_stage
+    ON CONFLICT (id, created_at) DO NOTHING
+    RETURNING id
+), logged AS (
+    INSERT INTO hand_actions ({", ".join(ACTION_COPY_COLUMNS)})
+    SELECT {", ".join("s." + c for c in ACTION_COPY_COLUMNS)}
+    FROM hand_actions_stage s JOIN inserted i ON i.id = s.hand_id
+    ON CONFLICT (hand_id, seq) DO NOTHING
+)
+SELECT count(*) FROM inserted
+"""
+
+
+# Cold storage: segment files listed in hand_segments (app.repositories.hand_archive).
+SEGMENTS_QUERY = "SELECT path, hand_count, min_created_at, max_created_at FROM hand_segments ORDER BY id"
+
+INSERT_SEGMENT_QUERY = """
+INSERT INTO hand_segments (path, hand_count, min_created_at, max_created_at)
+VALUES (%s, %s, %s, %s)
+"""
+
+# Completed hands of one month partition, in segment order.
+ARCHIVABLE_HANDS_QUERY = HAND_SELECT + """
+WHERE h.is_completed = TRUE AND h.created_at >= %s AND h.created_at < %s
+ORDER BY h.created_at DESC, h.id DESC
+"""
+
+DELETE_ARCHIVED_ACTIONS_QUERY = "DELETE FROM hand_actions WHERE hand_id = ANY(%s)"
+
+DELETE_ARCHIVED_HANDS_QUERY = """
+DELETE FROM hands WHERE id = ANY(%s) AND created_at >= %s AND created_at < %s
+"""
+
+# Search columns of hands written before they existed (NULL preflop_raises).
+UNINDEXED_HANDS_QUERY = HAND_SELECT + "WHERE h.preflop_raises IS NULL"
+
+SET_SEARCH_COLUMNS_QUERY = """
+UPDATE hands SET preflop_raises = %s, board_codes = %s, hole_combos = %s
+WHERE id = %s AND created_at = %s
+"""
+
+# Preflop betting patterns of GET /hands/search as (min, max) raise counts.
+PREFLOP_PATTERNS = {
+    "limped": (0, 0),
+    "raised": (1, None),
+    "single_raised": (1, 1),
+    "3bet": (2, None),
+    "4bet": (3, None),
+}
+
+HAND_STORAGE_FORMATS = ("json", "binary")
+
+# Stored strings to enum members; dict lookups are much cheaper than calling the enum.
+_ACTION_TYPES = {action_type.value: action_type for action_type in ActionType}
+_ROUNDS = {round_.value: round_ for round_ in Round}
+
+
+# Months whose partition this process has created or seen created. Hands
+# are saved in the month they are created in, and the archiver only drops
+# partitions with no hands left, so a month stays valid once known here.
+_known_partitions: Set[date] = set()
+
+
+def missing_partitions(hands: Iterable[Hand], force: bool = False) -> Set[date]:
+    """Months of ``hands`` not known to have a partition (all of them with ``force``)."""
+    months = {partition_month(hand.created_at) for hand in hands}
+    return months if force else months - _known_partitions
+
+
+def mark_partitions(months: Iterable[date], exist: bool = True):
+    """Record that the partitions of ``months`` exist (or were dropped)."""
+    if exist:
+        _known_partitions.update(months)
+    else:
+        _known_partitions.difference_update(months)
+
+
+def hand_key(hand: Hand) -> tuple:
+    """History order key of a hand, compared newest first."""
+    return hand.created_at, hand.id
+
+
+def row_key(key: Tuple[str, datetime]) -> tuple:
+    """History order key of an (id, created_at) pair."""
+    return key[1], key[0]
+
+
+def hand_storage_format(storage_format: Optional[str] = None) -> str:
+    """Validated header storage format, defaulting to $HAND_STORAGE_FORMAT."""
+    storage_format = storage_format or os.getenv("HAND_STORAGE_FORMAT", "json")
+    if storage_format not in HAND_STORAGE_FORMATS:
+        raise ValueError(f"Unknown hand storage format: {storage_format!r}")
+    return storage_format
+
+
+def hand_bulk_copies(hands: List[Hand], binary: bool = False) -> list:
+    """COPY batches (table, columns, rows) staging ``hands`` for BULK_MERGE_QUERY."""
+    hand_rows = []
+    action_rows = []
+    for hand in hands:
+        row = dict(zip(HAND_HEADER_COLUMNS, hand_to_header_params(hand, binary)), actions_data="[]")
+        hand_rows.append(tuple(row[column] for column in HAND_COPY_COLUMNS))
+        action_rows.extend(hand_to_action_params(hand))
+    return [
+        ("hands_stage", HAND_COPY_COLUMNS, hand_rows),
+        ("hand_actions_stage", ACTION_COPY_COLUMNS, action_rows),
+    ]
+
+
+def hole_combo(first: int, second: int) -> int:
+    """Order-independent index of a two-card holding, as stored in hole_combos."""
+    low, high = min(first, second), max(first, second)
+    return low * 52 + high
+
+
+def hand_search_columns(hand: Hand) -> tuple:
+    """(preflop_raises, board_codes, hole_combos) indexed by the hand search.
+
+    The header is rewritten on every round change and on completion, so the
+    preflop raise count is final once the hand leaves preflop. Unknown or
+    unparseable cards are left out.
+    """
+    try:
+        board = parse_cards(hand.board_cards)
+    except ValueError:
+        board = []
+    combos = []
+    for player in hand.players:
+        try:
+            hole = parse_cards(player.hole_cards)
+        except ValueError:
+            continue
+        if len(hole) == 2:
+            combos.append(hole_combo(*hole))
+    return preflop_raise_count(hand), board, sorted(combos)
+
+
+@dataclass
+class HandSearch:
+    """Filters of a hand search; unset fields match every hand."""
+    winner_position: Optional[int] = None
+    min_pot: Optional[int] = None
+    max_pot: Optional[int] = None
+    street: Optional[str] = None
+    pattern: Optional[str] = None
+    board_cards: Optional[str] = None
+    hole_cards: Optional[str] = None
+
+
+def hand_search_query(
+    search: HandSearch,
+    after: Optional[Tuple[datetime, str]],
+    limit: int
+) -> Tuple[str, tuple]:
+    """Keys query and parameters for hands matching ``search``, newest first.
+
+    Every filter is served by an index: GIN on winner_positions, board_codes
+    and hole_combos, btree on pot_size, current_round and preflop_raises.
+    ``board_cards`` must all be on the board; ``hole_cards`` are two cards
+    one player held or a single card anyone held. Raises ValueError for
+    unknown streets, patterns or cards.
+    """
+    conditions = []
+    params: list = []
+    if search.winner_position is not None:
+        conditions.append("winner_positions @> %s::jsonb")
+        params.append(json.dumps([search.winner_position]))
+    if search.min_pot is not None:
+        conditions.append("pot_size >= %s")
+        params.append(search.min_pot)
+    if search.max_pot is not None:
+        conditions.append("pot_size <= %s")
+        params.append(search.max_pot)
+    if search.street is not None:
+        if search.street not in _ROUNDS:
+            raise ValueError(f"street must be one of {list(_ROUNDS)}")
+        conditions.append("current_round = %s")
+        params.append(search.street)
+    if search.pattern is not None:
+        if search.pattern not in PREFLOP_PATTERNS:
+            raise ValueError(f"pattern must be one of {list(PREFLOP_PATTERNS)}")
+        low, high = PREFLOP_PATTERNS[search.pattern]
+        conditions.append("preflop_raises >= %s")
+        params.append(low)
+        if high is not None:
+            conditions.append("preflop_raises <= %s")
+            params.append(high)
+    if search.board_cards:
+        board = parse_cards(search.board_cards)
+        if len(board) > 5:
+            raise ValueError("board_cards takes at most five cards")
+        conditions.append("board_codes @> %s::smallint[]")
+        params.append(board)
+    if search.hole_cards:
+        hole = parse_cards(search.hole_cards)
+        if len(hole) == 2 and hole[0] != hole[1]:
+            conditions.append("hole_combos @> %s::int[]")
+            params.append([hole_combo(*hole)])
+        elif len(hole) == 1:
+            conditions.append("hole_combos && %s::int[]")
+            params.append([hole_combo(hole[0], other) for other in range(52) if other != hole[0]])
+        else:
+            raise ValueError("hole_cards takes one card or two different cards")
+    if after is not None:
+        conditions.append("(created_at, id) < (%s, %s)")
+        params.extend(after)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    query = f"""
+SELECT id, created_at FROM hands
+{where}
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+    return query, tuple(params) + (limit,)
+
+
+def encode_cursor(hand: Hand) -> str:
+    """Opaque pagination cursor pointing just past ``hand`` in history order."""
+    raw = json.dumps([hand.created_at.isoformat(), hand.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """The (created_at, id) key of a cursor from ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, hand_id = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+        if created_at.tzinfo is not None:
+            # Raises for times the database could not hold either.
+            created_at.astimezone(timezone.utc)
+        if not isinstance(hand_id, str) or "\x00" in hand_id:
+            raise ValueError(hand_id)
+        return created_at, hand_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def hands_page_query(after: Optional[Tuple[datetime, str]], limit: Optional[int]) -> Tuple[str, tuple]:
+    """History query and parameters for hands after a cursor key, newest first."""
+    # LIMIT NULL means no limit in Postgres.
+    if after is None:
+        return ALL_HANDS_QUERY, (limit,)
+    return HANDS_AFTER_QUERY, (after[0], after[1], limit)
+
+
+def hand_keys_query(after: Optional[Tuple[datetime, str]], limit: Optional[int]) -> Tuple[str, tuple]:
+    """History keys query and parameters, in the same order as hands_page_query."""
+    if after is None:
+        return HAND_KEYS_QUERY, (limit,)
+    return HAND_KEYS_AFTER_QUERY, (after[0], after[1], limit)
+
+
+def hand_header_signature(hand: Hand) -> tuple:
+    """Fields whose change requires rewriting the hands header row."""
+    return (
+        hand.current_round,
+        hand.is_completed,
+        hand.board_cards,
+        tuple(p.hole_cards for p in hand.players),
+    )
+
+
+def hand_to_header_params(hand: Hand, binary: bool = False) -> tuple:
+    """Serialize a Hand into SAVE_HAND_HEADER_QUERY parameters."""
+    if binary:
+        players_data = "[]"
+        hand_data = encode_hand(hand)
+    else:
+        players_data = players_to_json(hand.players)
+        hand_data = None
+
+    params = (
+        hand.id,
+        players_data,
+        hand.board_cards,
+        hand.pot_size,
+        hand.current_round,
+        hand.is_completed,
+        json.dumps(hand.winner_positions),
+        json.dumps(hand.winnings),
+        hand.created_at,
+        len(hand.actions),
+        hand_data,
+        hand.version,
+        *hand_search_columns(hand)
+    )
+    return params
+
+
+def hand_to_action_params(hand: Hand, from_seq: int = 0) -> List[tuple]:
+    """Serialize actions from ``from_seq`` onwards into APPEND_ACTION_QUERY rows."""
+    return [
+        (hand.id, seq, a.player_position, a.action_type, a.amount, a.round)
+        for seq, a in enumerate(hand.actions[from_seq:], start=from_seq)
+    ]
+
+
+@dataclass
+class HandSave:
+    """One hand's save, serialized when it was requested."""
+    id: str
+    created_at: datetime
+    version: int
+    expected_version: Optional[int]
+    header: Optional[tuple]
+    actions: List[tuple]
+
+    def conflicts(self, stored_version: Optional[int]) -> bool:
+        """Whether the save must be refused given the stored row's version.
+
+        Matches the guarded steps: a header write inserts a hand that is not
+        stored yet, a version-only write needs the row.
         """
-        
-        players_data = [
-            {
-                "position": p.position,
-                "name": p.name,
-                "stack": p.stack,
-                "hole_cards": p.hole_cards,
-                "is_dealer": p.is_dealer,
-                "is_small_blind": p.is_small_blind,
-                "is_big_blind": p.is_big_blind,
-                "is_folded": p.is_folded,
-                "current_bet": p.current_bet,
-                "total_invested": p.total_invested
-            }
-            for p in hand.players
-        ]
-        
-        actions_data = [
-            {
-                "player_position": a.player_position,
-                "action_type": a.action_type,
-                "amount": a.amount,
-                "round": a.round
-            }
-            for a in hand.actions
-        ]
-        
-        params = (
-            hand.id,
-            json.dumps(players_data),
-            json.dumps(actions_data),
-            hand.board_cards,
-            hand.pot_size,
-            hand.current_round,
-            hand.is_completed,
-            json.dumps(hand.winner_positions),
-            json.dumps(hand.winnings),
-            hand.created_at
+        if self.expected_version is None:
+            return False
+        if stored_version is None:
+            return self.header is None
+        return stored_version != self.expected_version
+
+    def steps(self) -> list:
+        """Transaction steps storing this save on its own (see ``hand_save_steps``)."""
+        if self.header is not None:
+            if self.expected_version is None:
+                steps = [(SAVE_HAND_HEADER_QUERY, [self.header])]
+            else:
+                steps = [(SAVE_HAND_HEADER_CAS_QUERY, [self.header + (self.expected_version,)], 1)]
+        elif self.expected_version is None:
+            steps = [(SET_VERSION_QUERY, [(self.version, self.id, self.created_at)])]
+        else:
+            steps = [(SET_VERSION_CAS_QUERY, [(self.version, self.id, self.created_at, self.expected_version)], 1)]
+        steps.append((APPEND_ACTION_QUERY, self.actions))
+        return steps
+
+
+def hand_save(
+    hand: Hand,
+    from_seq: int = 0,
+    write_header: bool = True,
+    binary: bool = False,
+    expected_version: Optional[int] = None
+) -> HandSave:
+    """Serialize a hand's header (or version) and its actions from ``from_seq`` for saving."""
+    return HandSave(
+        id=hand.id,
+        created_at=hand.created_at,
+        version=hand.version,
+        expected_version=expected_version,
+        header=hand_to_header_params(hand, binary) if write_header else None,
+        actions=hand_to_action_params(hand, from_seq),
+    )
+
+
+def hand_save_steps(
+    hand: Hand,
+    from_seq: int = 0,
+    write_header: bool = True,
+    binary: bool = False,
+    expected_version: Optional[int] = None
+) -> list:
+    """Transaction steps storing the header or version, then appending new actions.
+
+    With ``expected_version`` the first step is guarded, so the transaction
+    fails with ConcurrentUpdateError if the stored version differs.
+    """
+    return hand_save(hand, from_seq, write_header, binary, expected_version).steps()
+
+
+@lru_cache(maxsize=64)
+def save_headers_query(rows: int) -> str:
+    """SAVE_HAND_HEADER_QUERY upserting ``rows`` headers in one statement."""
+    return SAVE_HAND_HEADER_QUERY.replace(_HEADER_VALUES, ",\n       ".join([_HEADER_VALUES] * rows), 1)
+
+
+def hand_saves_params(saves: List[HandSave]) -> tuple:
+    """Header rows, then SET_VERSIONS_QUERY and APPEND_ACTIONS_QUERY parameters, for ``saves``."""
+    headers = [save for save in saves if save.header is not None]
+    versions = [save for save in saves if save.header is None]
+    actions = [action for save in saves for action in save.actions]
+    return (
+        [save.header for save in headers],
+        ([save.id for save in versions], [save.version for save in versions], [save.created_at for save in versions]),
+        tuple(list(column) for column in zip(*actions)),
+    )
+
+
+def row_to_hand(row) -> Hand:
+    """Convert a header row plus its action log to a Hand object."""
+    hand_data = row.get('hand_data')
+    if hand_data is not None:
+        return _binary_row_to_hand(row, hand_data)
+
+    players_data = row['players_data']
+    if isinstance(players_data, str):
+        players_data = json.loads(players_data)
+
+    players = [
+        Player(
+            position=p['position'],
+            name=p['name'],
+            stack=p['stack'],
+            hole_cards=p['hole_cards'],
+            is_dealer=p['is_dealer'],
+            is_small_blind=p['is_small_blind'],
+            is_big_blind=p['is_big_blind'],
+            is_folded=p['is_folded'],
+            current_bet=p['current_bet'],
+            total_invested=p['total_invested']
         )
-        
+        for p in players_data
+    ]
+
+    winner_positions = row['winner_positions']
+    if isinstance(winner_positions, str):
+        winner_positions = json.loads(winner_positions)
+
+    winnings = row['winnings']
+    if isinstance(winnings, str):
+        winnings = json.loads(winnings)
+    # JSON object keys are strings; positions are ints everywhere else.
+    winnings = {int(position): amount for position, amount in winnings.items()} if winnings else {}
+
+    hand = Hand(
+        id=row['id'],
+        players=players,
+        actions=[],
+        board_cards=row['board_cards'],
+        pot_size=row['pot_size'],
+        current_round=_ROUNDS[row['current_round']],
+        is_completed=row['is_completed'],
+        winner_positions=winner_positions,
+        winnings=winnings,
+        created_at=row['created_at'],
+        version=row['version']
+    )
+
+    action_log = row['action_log']
+    if isinstance(action_log, str):
+        action_log = json.loads(action_log)
+
+    if not action_log:
+        # Rows written before the hand_actions log keep actions inline.
+        actions_data = row['actions_data']
+        if isinstance(actions_data, str):
+            actions_data = json.loads(actions_data)
+        hand.actions = [
+            GameAction(
+                player_position=a['player_position'],
+                action_type=_ACTION_TYPES[a['action_type']],
+                amount=a['amount'],
+                round=_ROUNDS[a['round']]
+            )
+            for a in actions_data
+        ]
+        return hand
+
+    covered = row['actions_count'] or 0
+    hand.actions = [
+        GameAction(position, _ACTION_TYPES[action_type], amount, _ROUNDS[round_])
+        for position, action_type, amount, round_ in action_log[:covered]
+    ]
+    _replay_log(hand, action_log[covered:])
+    return hand
+
+
+def _replay_log(hand: Hand, action_log):
+    # Actions logged after the last header write all belong to the header's
+    # current round, so replaying their chip movements restores live state.
+    for position, action_type, amount, round_ in action_log:
+        apply_action(hand, GameAction(position, _ACTION_TYPES[action_type], amount, _ROUNDS[round_]))
+
+
+def _binary_row_to_hand(row, hand_data) -> Hand:
+    """Decode a binary-stored header; its action_log holds only the uncovered tail."""
+    hand = decode_hand(hand_data)
+    hand.created_at = row['created_at']
+    hand.version = row['version']
+    action_log = row['action_log']
+    if isinstance(action_log, str):
+        action_log = json.loads(action_log)
+    _replay_log(hand, action_log)
+    return hand
+
+
+class HandRepository(BaseRepository):
+    """Repository for hand data operations using raw SQL.
+
+    ``storage_format`` selects how headers are written ("json" or "binary",
+    default $HAND_STORAGE_FORMAT); rows in either format are always readable.
+    Reads fall back to the archived segments, so archived hands are found by
+    id and appear in the history in order.
+    """
+
+    def __init__(self, storage_format: Optional[str] = None):
+        super().__init__()
+        self.storage_format = hand_storage_format(storage_format)
+        self.binary = self.storage_format == "binary"
+        self.archive = get_hand_archive()
+
+    def _archive(self, force: bool = False) -> HandArchive:
+        """The archive view, reloading its catalog when stale (or ``force``)."""
+        if force or self.archive.stale():
+            self.archive.load_catalog(self.execute_query(SEGMENTS_QUERY))
+        return self.archive
+
+    def ensure_partitions(self, hands: Iterable[Hand], force: bool = False):
+        """Create the month partitions ``hands`` belong to, unless known to exist."""
+        months = missing_partitions(hands, force)
+        if months:
+            self.execute_insert(create_partitions_statement(months))
+            mark_partitions(months)
+
+    def save_hand(
+        self,
+        hand: Hand,
+        from_seq: int = 0,
+        write_header: bool = True,
+        expected_version: Optional[int] = None
+    ) -> bool:
+        """Append actions from ``from_seq`` to the log and upsert the header row.
+
+        Raises ConcurrentUpdateError if ``expected_version`` is given and the
+        stored hand is at another version.
+        """
         try:
-            self.execute_insert(query, params)
+            self.ensure_partitions([hand])
+            self.execute_in_transaction(
+                hand_save_steps(hand, from_seq, write_header, self.binary, expected_version)
+            )
             return True
-        except Exception as e:
-            print(f"Error saving hand: {e}")
+        except ConcurrentUpdateError:
+            raise
+        except Exception:
+            logger.exception("Error saving hand %s", hand.id)
             return False
-    
+
+    def bulk_insert_hands(self, hands: List[Hand]) -> int:
+        """Insert hands and their action logs with COPY; existing ids are skipped.
+
+        Returns the number of hands inserted.
+        """
+        if not hands:
+            return 0
+        # Imported hands may be from any month, including dropped ones.
+        self.ensure_partitions(hands, force=True)
+        return self.copy_and_merge(BULK_STAGE_QUERIES, hand_bulk_copies(hands, self.binary), BULK_MERGE_QUERY)
+
+    def get_hand_version(self, hand_id: str) -> Optional[int]:
+        """Stored version of a hand, without loading it."""
+        result = self.execute_single(GET_HAND_VERSION_QUERY, (hand_id,))
+        return result['version'] if result else None
+
     def get_hand_by_id(self, hand_id: str) -> Optional[Hand]:
         """Get a hand by its ID."""
-        query = "SELECT * FROM hands WHERE id = %s"
-        result = self.execute_single(query, (hand_id,))
-        
+        result = self.execute_single(GET_HAND_QUERY, (hand_id,))
+
         if not result:
-            return None
-        
+            # Misses are checked against segment bloom filters; the catalog is
+            # only reloaded when stale, not on every miss.
+            return self._archive().get(hand_id)
+
         return self._row_to_hand(result)
-    
+
     def get_all_hands(self, limit: int = 50) -> List[Hand]:
         """Get all hands ordered by creation date."""
-        query = """
-            SELECT * FROM hands 
-            ORDER BY created_at DESC 
-            LIMIT %s
-        """
-        results = self.execute_query(query, (limit,))
-        
-        return [self._row_to_hand(row) for row in results]
-    
+        return self.get_hands_page(limit)
+
     def get_completed_hands(self, limit: int = 50) -> List[Hand]:
         """Get completed hands only."""
-        query = """
-            SELECT * FROM hands 
-            WHERE is_completed = TRUE 
-            ORDER BY created_at DESC 
-            LIMIT %s
+        results = self.execute_query(COMPLETED_HANDS_QUERY, (limit,))
+        hands = [self._row_to_hand(row) for row in results]
+
+        return list(merge_newest_first(hands, self._archive().hands_page(None, limit), hand_key, limit))
+
+    def get_hands_page(self, limit: int = 50, after: Optional[Tuple[datetime, str]] = None) -> List[Hand]:
+        """Get up to ``limit`` hands older than the ``after`` (created_at, id) key."""
+        results = self.execute_query(*hands_page_query(after, limit))
+        hands = [self._row_to_hand(row) for row in results]
+
+        return list(merge_newest_first(hands, self._archive().hands_page(after, limit), hand_key, limit))
+
+    def get_hand_keys_page(self, limit: int = 50, after: Optional[Tuple[datetime, str]] = None) -> List[Tuple[str, datetime]]:
+        """(id, created_at) of up to ``limit`` hands older than the ``after`` key."""
+        results = self.execute_query(*hand_keys_query(after, limit))
+        keys = [(row['id'], row['created_at']) for row in results]
+
+        return list(merge_newest_first(keys, self._archive().keys_page(after, limit), row_key, limit))
+
+    def search_hand_keys(
+        self,
+        search: HandSearch,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Tuple[str, datetime]]:
+        """(id, created_at) of up to ``limit`` hands matching ``search`` older than the ``after`` key."""
+        results = self.execute_query(*hand_search_query(search, after, limit))
+
+        return [(row['id'], row['created_at']) for row in results]
+
+    def stream_unindexed_hands(self) -> Iterator[Hand]:
+        """Iterate hands stored before the search columns existed."""
+        for row in self.stream_query(UNINDEXED_HANDS_QUERY):
+            yield self._row_to_hand(row)
+
+    def set_search_columns(self, hands: List[Hand]) -> int:
+        """Write the search columns of ``hands`` in one transaction; returns the hands updated."""
+        if not hands:
+            return 0
+        self.execute_in_transaction([
+            (SET_SEARCH_COLUMNS_QUERY, [hand_search_columns(hand) + (hand.id, hand.created_at) for hand in hands])
+        ])
+        return len(hands)
+
+    def get_hands_by_ids(self, hand_ids: List[str]) -> List[Hand]:
+        """Get the hands with the given IDs, in no particular order."""
+        if not hand_ids:
+            return []
+        results = self.execute_query(HANDS_BY_IDS_QUERY, (list(hand_ids),))
+        hands = [self._row_to_hand(row) for row in results]
+        found = {hand.id for hand in hands}
+
+        return hands + self._archive().get_many(hand_id for hand_id in hand_ids if hand_id not in found)
+
+    def stream_hands(self, after: Optional[Tuple[datetime, str]] = None, limit: Optional[int] = None) -> Iterator[Hand]:
+        """Iterate hands newest first through a server-side cursor, archived ones included."""
+        hot = (self._row_to_hand(row) for row in self.stream_query(*hands_page_query(after, limit)))
+        yield from merge_newest_first(hot, self._archive().iter_hands(after), hand_key, limit)
+
+    def list_partition_months(self) -> List[date]:
+        """Months that have a hands partition, oldest first."""
+        months = [month_of_partition(row['relname']) for row in self.execute_query(LIST_PARTITIONS_QUERY)]
+        return sorted(month for month in months if month is not None)
+
+    def stream_archivable_hands(self, month: date) -> Iterator[Hand]:
+        """Completed hands of a month partition, newest first."""
+        bounds = (datetime(month.year, month.month, 1), datetime.combine(next_month(month), datetime.min.time()))
+        for row in self.stream_query(ARCHIVABLE_HANDS_QUERY, bounds):
+            yield self._row_to_hand(row)
+
+    def archive_hands(self, month: date, hands: List[Hand]) -> Dict:
+        """Move completed hands of ``month`` (newest first) into a new segment.
+
+        The segment file is written and synced first; listing it and deleting
+        the hands and their action logs is then one transaction, so every hand
+        is readable from exactly one place at all times. Returns the segment's
+        catalog fields plus ``path``.
         """
-        results = self.execute_query(query, (limit,))
-        
-        return [self._row_to_hand(row) for row in results]
-    
+        archive = self._archive()
+        path = archive.new_segment_path(month)
+        segment = archive.write(path, hands)
+        ids = [hand.id for hand in hands]
+        bounds = (datetime(month.year, month.month, 1), datetime.combine(next_month(month), datetime.min.time()))
+        try:
+            self.execute_in_transaction([
+                (INSERT_SEGMENT_QUERY, [(path, len(hands), segment["min_created_at"], segment["max_created_at"])]),
+                (DELETE_ARCHIVED_ACTIONS_QUERY, [(ids,)]),
+                (DELETE_ARCHIVED_HANDS_QUERY, [(ids,) + bounds], len(ids)),
+            ])
+        except Exception:
+            os.remove(os.path.join(archive.directory, path))
+            raise
+        self._archive(force=True)
+        return dict(segment, path=path)
+
+    def drop_partition_if_empty(self, month: date):
+        """Drop the partition of ``month`` once it holds no hands."""
+        self.execute_insert(drop_partition_if_empty_statement(month))
+        mark_partitions([month], exist=False)
+
     def _row_to_hand(self, row) -> Hand:
         """Convert database row to Hand object."""
-        players_data = row['players_data']
-        if isinstance(players_data, str):
-            players_data = json.loads(players_data)
-        
-        players = [
-            Player(
-                position=p['position'],
-                name=p['name'],
-                stack=p['stack'],
-                hole_cards=p['hole_cards'],
-                is_dealer=p['is_dealer'],
-                is_small_blind=p['is_small_blind'],
-                is_big_blind=p['is_big_blind'],
-                is_folded=p['is_folded'],
-                current_bet=p['current_bet'],
-                total_invested=p['total_invested']
-            )
-            for p in players_data
-        ]
-        
-        actions_data = row['actions_data']
-        if isinstance(actions_data, str):
-            actions_data = json.loads(actions_data)
-        
-        actions = [
-            GameAction(
-                player_position=a['player_position'],
-                action_type=a['action_type'],
-                amount=a['amount'],
-                round=a['round']
-            )
-            for a in actions_data
-        ]
-        
-        winner_positions = row['winner_positions']
-        if isinstance(winner_positions, str):
-            winner_positions = json.loads(winner_positions)
-        
-        winnings = row['winnings']
-        if isinstance(winnings, str):
-            winnings = json.loads(winnings)
-        
-        return Hand(
-            id=row['id'],
-            players=players,
-            actions=actions,
-            board_cards=row['board_cards'],
-            pot_size=row['pot_size'],
-            current_round=row['current_round'],
-            is_completed=row['is_completed'],
-            winner_positions=winner_positions,
-            winnings=winnings,
-            created_at=row['created_at']
-        )
+        started = time.perf_counter()
+        hand = row_to_hand(row)
+        SERIALIZATION_DURATION.labels("row").observe(time.perf_counter() - started)
+        return hand
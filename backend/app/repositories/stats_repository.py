@@ -0,0 +1,101 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+from app.models.game import Hand
+from app.repositories.async_base import AsyncBaseRepository
+from app.repositories.base import BaseRepository
+from app.repositories.hand_repository import HAND_SELECT, row_to_hand
+
+STAT_COLUMNS = (
+    "hands", "vpip_hands", "pfr_hands", "postflop_aggressive", "postflop_calls",
+    "showdowns", "showdowns_won", "hands_won", "net_winnings",
+)
+
+# Rolls per-seat counters (SeatStats, as parallel arrays) into player_stats.
+# Hand ids are claimed in stats_processed_hands first and only the rows of
+# newly claimed hands are added, so replaying a hand changes nothing. Rows
+# are upserted in key order so concurrent writers lock them in the same order.
+RECORD_HANDS_QUERY = f"""
+WITH seat_rows AS (
+    SELECT * FROM unnest(
+        %s::varchar[], %s::text[], %s::smallint[], %s::int[], %s::int[], %s::int[],
+        %s::int[], %s::int[], %s::int[], %s::int[], %s::bigint[]
+    ) AS r(hand_id, player_name, position, vpip, pfr, postflop_aggressive,
+           postflop_calls, showdown, showdown_won, won, net_winnings)
+), claimed AS (
+    INSERT INTO stats_processed_hands (hand_id)
+    SELECT DISTINCT hand_id FROM seat_rows
+    ON CONFLICT (hand_id) DO NOTHING
+    RETURNING hand_id
+)
+INSERT INTO player_stats (player_name, position, {", ".join(STAT_COLUMNS)}, updated_at)
+SELECT r.player_name, r.position, count(*), sum(r.vpip), sum(r.pfr), sum(r.postflop_aggressive),
+       sum(r.postflop_calls), sum(r.showdown), sum(r.showdown_won), sum(r.won), sum(r.net_winnings),
+       CURRENT_TIMESTAMP
+FROM seat_rows r JOIN claimed c ON c.hand_id = r.hand_id
+GROUP BY r.player_name, r.position
+ORDER BY r.player_name, r.position
+ON CONFLICT (player_name, position) DO UPDATE SET
+{",".join(f"{chr(10)}    {c} = player_stats.{c} + EXCLUDED.{c}" for c in STAT_COLUMNS)},
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+RESET_STATS_QUERY = "TRUNCATE player_stats, stats_processed_hands"
+
+# Completed hands not rolled up yet, split into ``workers`` partitions by id hash.
+UNPROCESSED_HANDS_QUERY = HAND_SELECT + """
+WHERE h.is_completed = TRUE
+  AND mod(abs(hashtext(h.id)::bigint), %s) = %s
+  AND NOT EXISTS (SELECT 1 FROM stats_processed_hands p WHERE p.hand_id = h.id)
+"""
+
+STATS_GROUPS = {"player": "player_name", "seat": "position"}
+
+
+def record_hands_params(rows: Sequence[tuple]) -> tuple:
+    """Parameters for RECORD_HANDS_QUERY: one array per field of the SeatStats rows."""
+    return tuple(list(column) for column in zip(*rows)) if rows else ([],) * RECORD_HANDS_QUERY.count("%s")
+
+
+def stats_query(group_by: str, player_name: Optional[str], limit: int) -> tuple:
+    """Rollups summed per player or per seat, most hands first."""
+    if group_by not in STATS_GROUPS:
+        raise ValueError(f"group_by must be one of {sorted(STATS_GROUPS)}")
+    key = STATS_GROUPS[group_by]
+    where = "WHERE player_name = %s" if player_name is not None else ""
+    query = f"""
+SELECT {key}, {", ".join(f"sum({c})::bigint AS {c}" for c in STAT_COLUMNS)}
+FROM player_stats
+{where}
+GROUP BY {key}
+ORDER BY hands DESC, {key}
+LIMIT %s
+"""
+    return query, ((player_name,) if player_name is not None else ()) + (limit,)
+
+
+class StatsRepository(BaseRepository):
+    """Player stats rollups over a pooled psycopg2 connection, for the backfill."""
+
+    def record_hands(self, rows: Sequence[tuple]) -> int:
+        """Add the counters of hands not rolled up yet; returns the rows upserted."""
+        return self.execute_insert(RECORD_HANDS_QUERY, record_hands_params(rows))
+
+    def reset(self):
+        """Empty the rollups and the processed-hands ledger."""
+        self.execute_insert(RESET_STATS_QUERY)
+
+    def stream_unprocessed_hands(self, workers: int = 1, worker: int = 0) -> Iterator[Hand]:
+        """Completed hands in partition ``worker`` of ``workers`` that are not rolled up yet."""
+        for row in self.stream_query(UNPROCESSED_HANDS_QUERY, (workers, worker)):
+            yield row_to_hand(row)
+
+
+class AsyncStatsRepository(AsyncBaseRepository):
+    """Player stats rollups: written as hands complete, read by the stats API."""
+
+    async def record_hands(self, rows: Sequence[tuple]) -> int:
+        """Add the counters of hands not rolled up yet; returns the rows upserted."""
+        return await self.execute_insert(RECORD_HANDS_QUERY, record_hands_params(rows))
+
+    async def get_stats(self, group_by: str = "player", player_name: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Summed rollups per player or per seat."""
+        return [dict(row) for row in await self.execute_query(*stats_query(group_by, player_name, limit))]
@@ -0,0 +1,84 @@
+import json
+import logging
+from typing import Optional
+from app.models.table import Table
+from app.repositories.async_base import AsyncBaseRepository
+
+logger = logging.getLogger(__name__)
+
+# One row per table, rewritten whenever a hand starts or the table closes.
+SAVE_TABLE_QUERY = """
+INSERT INTO poker_tables (
+    id, player_names, stacks, buy_in, dealer_position, current_hand_id,
+    hands_played, rebuys, is_closed, created_at, updated_at
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+ON CONFLICT (id) DO UPDATE SET
+    player_names = EXCLUDED.player_names,
+    stacks = EXCLUDED.stacks,
+    buy_in = EXCLUDED.buy_in,
+    dealer_position = EXCLUDED.dealer_position,
+    current_hand_id = EXCLUDED.current_hand_id,
+    hands_played = EXCLUDED.hands_played,
+    rebuys = EXCLUDED.rebuys,
+    is_closed = EXCLUDED.is_closed,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+GET_TABLE_QUERY = "SELECT * FROM poker_tables WHERE id = %s"
+
+
+def table_to_params(table: Table) -> tuple:
+    """Parameters for SAVE_TABLE_QUERY."""
+    return (
+        table.id,
+        json.dumps(table.player_names),
+        json.dumps(table.stacks),
+        table.buy_in,
+        table.dealer_position,
+        table.current_hand_id,
+        table.hands_played,
+        json.dumps(table.rebuys),
+        table.is_closed,
+        table.created_at,
+    )
+
+
+def row_to_table(row) -> Table:
+    """Convert a poker_tables row to a Table object."""
+    def _json(value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    return Table(
+        id=row['id'],
+        player_names=_json(row['player_names']),
+        stacks=_json(row['stacks']),
+        buy_in=row['buy_in'],
+        dealer_position=row['dealer_position'],
+        current_hand_id=row['current_hand_id'],
+        hands_played=row['hands_played'],
+        rebuys=_json(row['rebuys']),
+        is_closed=row['is_closed'],
+        created_at=row['created_at'],
+    )
+
+
+class AsyncTableRepository(AsyncBaseRepository):
+    """Persistence of tables, so a shard can pick its tables up after a restart."""
+
+    async def save_table(self, table: Table) -> bool:
+        """Insert or update a table's row."""
+        try:
+            await self.execute_insert(SAVE_TABLE_QUERY, table_to_params(table))
+            return True
+        except Exception:
+            logger.exception("Error saving table %s", table.id)
+            return False
+
+    async def get_table_by_id(self, table_id: str) -> Optional[Table]:
+        """Get a table by its ID."""
+        result = await self.execute_single(GET_TABLE_QUERY, (table_id,))
+
+        if not result:
+            return None
+
+        return row_to_table(result)
@@ -1,11 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, Query, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Dict, Optional
-from app.services.game_service import GameService
-from app.models.game import Hand
-from app.database.connection import init_database
+import asyncio
+import codecs
+import json
+import logging
+import os
+import time
+from app.metrics import SERIALIZATION_DURATION
+from app.services.game_service import BatchStepError, GameService
+from app.services.completed_hand_cache import CachedHand
+from app.services.hand_events import HandSubscription
+from app.models.cards import normalize_cards
+from app.models.game import Hand, InvalidHandError
+from app.models.codec import (
+    HAND_MEDIA_TYPE,
+    HAND_STREAM_MEDIA_TYPE,
+    STREAM_MAGIC,
+    HandStreamDecoder,
+    encode_hand,
+    frame_hand,
+)
+from app.models.phh import PHHSDecoder, hand_to_phh
+from app.models.serialization import hand_to_json
+from app.repositories.base import ConcurrentUpdateError
+from app.repositories.hand_repository import HandSearch, encode_cursor, decode_cursor
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Largest page GET /hands returns as a JSON list; stream NDJSON for more.
+MAX_HISTORY_PAGE_SIZE = 500
+
+IMPORT_BATCH_SIZE = 1000
+MAX_BATCH_STEPS = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_MEDIA_TYPES = {"phh": "application/x-phhs", "binary": HAND_STREAM_MEDIA_TYPE}
+
+CONFLICT_DETAIL = "Hand was changed by another request; reload it and retry"
+
+# Seconds between SSE keep-alive comments, so proxies keep idle streams open.
+EVENTS_HEARTBEAT_INTERVAL = float(os.getenv("HAND_EVENTS_HEARTBEAT", "15"))
 
 class CreateHandRequest(BaseModel):
     player_stacks: List[int]
@@ -16,40 +52,67 @@ class AddActionRequest(BaseModel):
     action_type: str
     amount: Optional[int] = 0
 
+# Dealt cards are validated and normalized here, before they reach the
+# hand (and the binary codec, which only stores real cards).
+def _hole_cards(cards_by_position: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if cards_by_position is None:
+        return None
+    return {position: normalize_cards(cards, 2, 2) for position, cards in cards_by_position.items()}
+
+def _board_cards(board_cards: Optional[str]) -> Optional[str]:
+    return normalize_cards(board_cards, 0, 5) if board_cards is not None else None
+
 class DealCardsRequest(BaseModel):
     hand_id: str
     cards_by_position: Dict[str, str]
 
+    _validate_cards = field_validator("cards_by_position")(_hole_cards)
+
 class DealBoardRequest(BaseModel):
     hand_id: str
     board_cards: str
 
+    _validate_board = field_validator("board_cards")(_board_cards)
+
+class BatchStep(BaseModel):
+    type: str = Field("action", pattern="^(action|deal_cards|deal_board)$")
+    player_position: Optional[int] = None
+    action_type: Optional[str] = None
+    amount: Optional[int] = 0
+    cards_by_position: Optional[Dict[str, str]] = None
+    board_cards: Optional[str] = None
 
-def get_game_service():
-    """Dependency to get game service instance."""
-    return GameService()
+    _validate_cards = field_validator("cards_by_position")(_hole_cards)
+    _validate_board = field_validator("board_cards")(_board_cards)
 
-@router.on_event("startup")
-async def startup_event():
-    """Initialize database on startup."""
-    try:
-        init_database()
-    except Exception as e:
-        print(f"Database initialization error: {e}")
+class BatchRequest(BaseModel):
+    hand_id: str
+    steps: List[BatchStep] = Field(..., min_length=1, max_length=MAX_BATCH_STEPS)
+
+
+def get_game_service(request: Request) -> GameService:
+    """Dependency to get the app-scoped game service instance."""
+    return request.app.state.game_service
+
+def accepts_binary(request: Request) -> bool:
+    """Dependency: whether the client asked for HAND_MEDIA_TYPE responses."""
+    accept = request.headers.get("accept", "")
+    return any(part.split(";")[0].strip() == HAND_MEDIA_TYPE for part in accept.split(","))
 
 @router.post("/hands")
 async def create_hand(
     request: CreateHandRequest,
-    game_service: GameService = Depends(get_game_service)
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary)
 ):
     """Create a new poker hand."""
     try:
         hand = game_service.create_new_hand(request.player_stacks)
         
-        if not game_service.save_hand(hand):
+        if not await game_service.save_hand(hand):
             raise HTTPException(status_code=500, detail="Failed to save hand")
         
-        return _hand_to_response(hand)
+        return _hand_response(hand, binary)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -58,25 +121,73 @@ async def create_hand(
 @router.post("/hands/action")
 async def add_action(
     request: AddActionRequest,
-    game_service: GameService = Depends(get_game_service)
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary),
+    if_match: Optional[str] = Header(None)
 ):
-    """Add an action to a hand."""
+    """Add an action to a hand.
+
+    With ``If-Match`` the action only applies if the hand is still at the
+    version of that ETag (412 otherwise).
+    """
     try:
-        hand = game_service.get_hand_by_id(request.hand_id)
-        if not hand:
-            raise HTTPException(status_code=404, detail="Hand not found")
+        async with game_service.hand_lock(request.hand_id):
+            hand = await game_service.get_hand_by_id(request.hand_id)
+            if not hand:
+                raise HTTPException(status_code=404, detail="Hand not found")
+            _check_if_match(if_match, hand)
         
-        updated_hand = game_service.add_action(
-            hand, 
-            request.player_position, 
-            request.action_type, 
-            request.amount
-        )
+            updated_hand = game_service.add_action(
+                hand, 
+                request.player_position, 
+                request.action_type, 
+                request.amount
+            )
         
-        if not game_service.save_hand(updated_hand):
-            raise HTTPException(status_code=500, detail="Failed to save hand")
+            if not await game_service.save_hand(updated_hand):
+                raise HTTPException(status_code=500, detail="Failed to save hand")
         
-        return _hand_to_response(updated_hand)
+            return _hand_response(updated_hand, binary, game_service.cached_hand(updated_hand))
+    except HTTPException:
+        raise
+    except ConcurrentUpdateError:
+        raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/hands/batch")
+async def apply_batch(
+    request: BatchRequest,
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary),
+    if_match: Optional[str] = Header(None)
+):
+    """Apply an ordered list of actions and deal steps to a hand atomically.
+
+    The hand is loaded and saved once. If a step is illegal nothing is
+    applied and the 400 response names the step's ``index``.
+    """
+    try:
+        async with game_service.hand_lock(request.hand_id):
+            hand = await game_service.get_hand_by_id(request.hand_id)
+            if not hand:
+                raise HTTPException(status_code=404, detail="Hand not found")
+            _check_if_match(if_match, hand)
+            
+            updated_hand = game_service.apply_batch(hand, [step.model_dump() for step in request.steps])
+            
+            if not await game_service.save_hand(updated_hand):
+                raise HTTPException(status_code=500, detail="Failed to save hand")
+            
+            return _hand_response(updated_hand, binary, game_service.cached_hand(updated_hand))
+    except HTTPException:
+        raise
+    except ConcurrentUpdateError:
+        raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+    except BatchStepError as e:
+        raise HTTPException(status_code=400, detail={"index": e.index, "error": e.message})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -85,108 +196,435 @@ async def add_action(
 @router.post("/hands/deal-cards")
 async def deal_hole_cards(
     request: DealCardsRequest,
-    game_service: GameService = Depends(get_game_service)
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary),
+    if_match: Optional[str] = Header(None)
 ):
     """Deal hole cards to players."""
     try:
-        hand = game_service.get_hand_by_id(request.hand_id)
-        if not hand:
-            raise HTTPException(status_code=404, detail="Hand not found")
+        async with game_service.hand_lock(request.hand_id):
+            hand = await game_service.get_hand_by_id(request.hand_id)
+            if not hand:
+                raise HTTPException(status_code=404, detail="Hand not found")
+            _check_if_match(if_match, hand)
         
-        cards_by_position_int = {int(k): v for k, v in request.cards_by_position.items()}
+            cards_by_position_int = {int(k): v for k, v in request.cards_by_position.items()}
         
-        updated_hand = game_service.deal_hole_cards(hand, cards_by_position_int)
+            updated_hand = game_service.deal_hole_cards(hand, cards_by_position_int)
         
-        if not game_service.save_hand(updated_hand):
-            raise HTTPException(status_code=500, detail="Failed to save hand")
+            if not await game_service.save_hand(updated_hand):
+                raise HTTPException(status_code=500, detail="Failed to save hand")
         
-        return _hand_to_response(updated_hand)
+            return _hand_response(updated_hand, binary, game_service.cached_hand(updated_hand))
+    except HTTPException:
+        raise
+    except ConcurrentUpdateError:
+        raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/hands/deal-board")
 async def deal_board_cards(
     request: DealBoardRequest,
-    game_service: GameService = Depends(get_game_service)
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary),
+    if_match: Optional[str] = Header(None)
 ):
     """Deal board cards (flop, turn, river)."""
     try:
-        hand = game_service.get_hand_by_id(request.hand_id)
-        if not hand:
-            raise HTTPException(status_code=404, detail="Hand not found")
+        async with game_service.hand_lock(request.hand_id):
+            hand = await game_service.get_hand_by_id(request.hand_id)
+            if not hand:
+                raise HTTPException(status_code=404, detail="Hand not found")
+            _check_if_match(if_match, hand)
         
-        updated_hand = game_service.deal_board_cards(hand, request.board_cards)
+            updated_hand = game_service.deal_board_cards(hand, request.board_cards)
         
-        if not game_service.save_hand(updated_hand):
-            raise HTTPException(status_code=500, detail="Failed to save hand")
+            if not await game_service.save_hand(updated_hand):
+                raise HTTPException(status_code=500, detail="Failed to save hand")
         
-        return _hand_to_response(updated_hand)
+            return _hand_response(updated_hand, binary, game_service.cached_hand(updated_hand))
+    except HTTPException:
+        raise
+    except ConcurrentUpdateError:
+        raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/hands/export")
+async def export_hands(
+    format: str = Query("phh", pattern="^(phh|binary)$"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    game_service: GameService = Depends(get_game_service)
+):
+    """Stream hands newest first as a .phhs document or a binary hand stream."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = "hands.phhs" if format == "phh" else "hands.pkhs"
+    return StreamingResponse(
+        _stream_export(game_service, format, after, limit),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/hands/search")
+async def search_hands(
+    response: Response,
+    winner_position: Optional[int] = Query(None, ge=0),
+    min_pot: Optional[int] = Query(None, ge=0),
+    max_pot: Optional[int] = Query(None, ge=0),
+    street: Optional[str] = Query(None, pattern="^(preflop|flop|turn|river)$"),
+    pattern: Optional[str] = Query(None, pattern="^(limped|raised|single_raised|3bet|4bet)$"),
+    board_cards: Optional[str] = None,
+    hole_cards: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    game_service: GameService = Depends(get_game_service)
+):
+    """Search stored hands, newest first, in pages like GET /hands.
+
+    Filters combine: the winning seat, a pot size range, the street the hand
+    ended on, a preflop pattern (limped, raised, single_raised, 3bet, 4bet),
+    cards that are all on the board and hole cards one player held (two
+    cards, or one card anyone held). Only hands still in the database are
+    searched; hands moved to the archive segments are not matched.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        search = HandSearch(
+            winner_position=winner_position,
+            min_pot=min_pot,
+            max_pot=max_pot,
+            street=street,
+            pattern=pattern,
+            board_cards=board_cards,
+            hole_cards=hole_cards,
+        )
+        page_size = min(limit or 50, MAX_HISTORY_PAGE_SIZE)
+        hands = await game_service.search_hands(search, page_size, after)
+        if len(hands) == page_size:
+            response.headers["X-Next-Cursor"] = encode_cursor(hands[-1])
+        return [game_service.hand_display(hand) for hand in hands]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/hands/import")
+async def import_hands(
+    request: Request,
+    format: str = Query("phh", pattern="^(phh|binary)$"),
+    game_service: GameService = Depends(get_game_service)
+):
+    """Bulk-import a .phhs document or binary hand stream from the request body.
+
+    Hands are inserted with COPY in batches of IMPORT_BATCH_SIZE as the body
+    arrives; hands whose id already exists are skipped. Each hand is
+    validated before its batch is written, and the first invalid one stops
+    the import with a 400 naming its ``index`` in the document.
+    """
+    decoder = PHHSDecoder() if format == "phh" else HandStreamDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")() if format == "phh" else None
+    received = 0
+    imported = 0
+    batch: List[Hand] = []
+    try:
+        async for chunk in request.stream():
+            batch.extend(decoder.feed(text_decoder.decode(chunk) if text_decoder else chunk))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                received += len(batch)
+                imported += await game_service.import_hands(batch)
+                batch = []
+        if text_decoder:
+            batch.extend(decoder.feed(text_decoder.decode(b"", final=True)))
+        batch.extend(decoder.close())
+        received += len(batch)
+        imported += await game_service.import_hands(batch)
+        return {"received": received, "imported": imported, "skipped": received - imported}
+    except InvalidHandError as e:
+        raise HTTPException(status_code=400, detail={"index": e.index, "error": e.message, "imported": imported})
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{e} (after {imported} hands were imported)"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/hands/{hand_id}")
 async def get_hand(
+    hand_id: str,
+    game_service: GameService = Depends(get_game_service),
+    binary: bool = Depends(accepts_binary),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get a specific hand by ID.
+
+    A matching ``If-None-Match`` gets 304 Not Modified, answered from the
+    hand's version alone without loading the hand.
+    """
+    try:
+        if if_none_match is not None:
+            version = await game_service.get_hand_version(hand_id)
+            if version is not None and (
+                if_none_match.strip() == "*" or _etag(version, binary) in _etag_list(if_none_match)
+            ):
+                return Response(status_code=304, headers={"ETag": _etag(version, binary), "Vary": "Accept"})
+        
+        hand = await game_service.get_hand_by_id(hand_id)
+        if not hand:
+            raise HTTPException(status_code=404, detail="Hand not found")
+        
+        return _hand_response(hand, binary, game_service.cached_hand(hand))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.websocket("/hands/{hand_id}/ws")
+async def hand_updates_ws(websocket: WebSocket, hand_id: str):
+    """Live updates for a hand: a snapshot, then change events as they are saved.
+
+    Closes with code 4404 if the hand does not exist.
+    """
+    game_service: GameService = websocket.app.state.game_service
+    # Subscribe before loading the snapshot so no change falls in between.
+    subscription = game_service.events.subscribe(hand_id)
+    tasks = []
+    try:
+        hand = await game_service.get_hand_by_id(hand_id)
+        await websocket.accept()
+        if not hand:
+            await websocket.close(code=4404)
+            return
+        await websocket.send_text(_snapshot_event(hand))
+        
+        async def send_events():
+            while True:
+                await websocket.send_text(await subscription.get())
+        
+        async def wait_for_disconnect():
+            # Clients only listen; reading is how a disconnect is noticed.
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        
+        sender = asyncio.create_task(send_events())
+        tasks = [sender, asyncio.create_task(wait_for_disconnect())]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if sender.done() and not sender.cancelled() and sender.exception() is not None:
+            logger.warning("Stopped sending updates of hand %s: %r", hand_id, sender.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Retrieve every task's outcome so none is left unobserved.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscription.close()
+
+@router.get("/hands/{hand_id}/events")
+async def hand_updates_sse(
+    hand_id: str,
+    game_service: GameService = Depends(get_game_service)
+):
+    """Server-sent events fallback for ``/hands/{hand_id}/ws``, with the same messages."""
+    subscription = game_service.events.subscribe(hand_id)
+    try:
+        hand = await game_service.get_hand_by_id(hand_id)
+        if not hand:
+            raise HTTPException(status_code=404, detail="Hand not found")
+        snapshot = _snapshot_event(hand)
+    except HTTPException:
+        subscription.close()
+        raise
+    except Exception as e:
+        subscription.close()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    return StreamingResponse(
+        _stream_events(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/hands/{hand_id}/valid-actions")
+async def get_valid_actions(
+    hand_id: str,
+    player_position: int,
+    game_service: GameService = Depends(get_game_service)
+):
+    """Get valid actions, call amount and raise bounds for a player."""
+    try:
+        async with game_service.hand_lock(hand_id):
+            hand = await game_service.get_hand_by_id(hand_id)
+            if not hand:
+                raise HTTPException(status_code=404, detail="Hand not found")
+            
+            return game_service.get_action_options(hand, player_position)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/hands/{hand_id}/equity")
+async def get_hand_equity(
+    hand_id: str,
+    time_budget_ms: int = Query(1000, ge=0, le=30000),
+    max_samples: int = Query(200000, ge=1000, le=10000000),
+    seed: Optional[int] = None,
+    game_service: GameService = Depends(get_game_service)
+):
+    """Get each active player's showdown equity for the hand's current cards.
+
+    A ``time_budget_ms`` of 0 always draws ``max_samples``, so a seeded
+    request is reproducible.
+    """
+    try:
+        hand = await game_service.snapshot_hand(hand_id)
+        if not hand:
+            raise HTTPException(status_code=404, detail="Hand not found")
+        
+        return await game_service.calculate_equity(hand, time_budget_ms or None, max_samples, seed)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/hands/{hand_id}/preflop-ev")
+async def get_hand_preflop_ev(
     hand_id: str,
     game_service: GameService = Depends(get_game_service)
 ):
-    """Get a specific hand by ID."""
+    """Get each player's equity and chip EV if the hand is all in before the flop."""
     try:
-        hand = game_service.get_hand_by_id(hand_id)
+        hand = await game_service.snapshot_hand(hand_id)
         if not hand:
             raise HTTPException(status_code=404, detail="Hand not found")
         
-        return _hand_to_response(hand)
+        return await game_service.preflop_ev(hand)
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/hands")
 async def get_hand_history(
-    limit: int = 50,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     game_service: GameService = Depends(get_game_service)
 ):
-    """Get hand history for display (all hands, with status)."""
-    try:
-        hands = game_service.get_hand_history(limit)
-        formatted_hands = []
-        for hand in hands:
-            formatted = game_service.format_hand_for_display(hand)
-            formatted_hands.append(formatted)
-        return formatted_hands
+    """Get hand history for display (all hands, with status), newest first.
+
+    JSON responses are pages of at most MAX_HISTORY_PAGE_SIZE hands with the
+    cursor for the next page in ``X-Next-Cursor``; ``format=ndjson`` streams
+    every hand after the cursor (or ``limit`` of them) one object per line.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        if format == "ndjson":
+            return StreamingResponse(
+                _stream_history(game_service, after, limit),
+                media_type="application/x-ndjson"
+            )
+        
+        page_size = min(limit or 50, MAX_HISTORY_PAGE_SIZE)
+        hands = await game_service.get_hand_history(page_size, after)
+        if len(hands) == page_size:
+            response.headers["X-Next-Cursor"] = encode_cursor(hands[-1])
+        return [game_service.hand_display(hand) for hand in hands]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-def _hand_to_response(hand: Hand) -> Dict:
-    """Convert Hand model to JSON-serializable dictionary format."""
-    return {
-        "id": hand.id,
-        "players": [
-            {
-                "position": p.position,
-                "name": p.name,
-                "stack": p.stack,
-                "hole_cards": p.hole_cards,
-                "is_dealer": p.is_dealer,
-                "is_small_blind": p.is_small_blind,
-                "is_big_blind": p.is_big_blind,
-                "is_folded": p.is_folded,
-                "current_bet": p.current_bet,
-                "total_invested": p.total_invested
-            }
-            for p in hand.players
-        ],
-        "actions": [
-            {
-                "player_position": a.player_position,
-                "action_type": a.action_type,
-                "amount": a.amount,
-                "round": a.round
-            }
-            for a in hand.actions
-        ],
-        "board_cards": hand.board_cards,
-        "pot_size": hand.pot_size,
-        "current_round": hand.current_round,
-        "is_completed": hand.is_completed,
-        "winner_positions": hand.winner_positions,
-        "winnings": hand.winnings
-    }
+async def _stream_history(game_service: GameService, after, limit: Optional[int]):
+    """NDJSON lines of formatted hands, read through a server-side cursor."""
+    try:
+        async for hand in game_service.stream_hand_history(after, limit):
+            yield json.dumps(game_service.hand_display(hand)) + "\n"
+    except Exception:
+        # Headers are already sent, so the truncated stream is the error signal.
+        logger.exception("Error streaming hand history")
+
+async def _stream_events(subscription: HandSubscription, snapshot: str):
+    """SSE frames for a subscription; the subscription closes with the response."""
+    try:
+        yield f"data: {snapshot}\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(subscription.get(), EVENTS_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {data}\n\n"
+    finally:
+        subscription.close()
+
+async def _stream_export(game_service: GameService, format: str, after, limit: Optional[int]):
+    """Export chunks of roughly EXPORT_CHUNK_SIZE bytes, read through a server-side cursor."""
+    chunks = [STREAM_MAGIC] if format == "binary" else []
+    size = 0
+    index = 0
+    try:
+        async for hand in game_service.stream_hand_history(after, limit):
+            index += 1
+            chunk = frame_hand(hand) if format == "binary" else f"[{index}]\n{hand_to_phh(hand)}\n".encode()
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= EXPORT_CHUNK_SIZE:
+                yield b"".join(chunks)
+                chunks = []
+                size = 0
+    except Exception:
+        # Headers are already sent, so the truncated stream is the error signal.
+        logger.exception("Error exporting hands")
+        return
+    if chunks:
+        yield b"".join(chunks)
+
+def _etag(version: int, binary: bool) -> str:
+    """Strong ETag for one representation of a hand version."""
+    return f'"{version}.bin"' if binary else f'"{version}"'
+
+def _etag_list(header: str) -> List[str]:
+    """ETags listed in an If-Match/If-None-Match header, weak prefixes dropped."""
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+def _check_if_match(if_match: Optional[str], hand: Hand):
+    """412 unless ``If-Match`` is absent, ``*`` or names the hand's current version."""
+    if if_match is None or if_match.strip() == "*":
+        return
+    if not {_etag(hand.version, False), _etag(hand.version, True)} & set(_etag_list(if_match)):
+        raise HTTPException(status_code=412, detail="Hand has changed since the given ETag")
+
+def _snapshot_event(hand: Hand) -> str:
+    """First live-update message: the full hand at its current version."""
+    return (
+        f'{{"type":"snapshot","hand_id":{json.dumps(hand.id)},"version":{hand.version},'
+        f'"hand":{hand_to_json(hand)}}}'
+    )
+
+def _hand_response(hand: Hand, binary: bool, cached: Optional[CachedHand] = None):
+    """The hand as JSON, or in the compact binary encoding when requested.
+
+    ``cached`` supplies payloads already rendered for a completed hand.
+    """
+    headers = {"ETag": _etag(hand.version, binary), "Vary": "Accept"}
+    started = time.perf_counter()
+    if binary:
+        content = cached.binary if cached is not None else encode_hand(hand)
+        SERIALIZATION_DURATION.labels("binary").observe(time.perf_counter() - started)
+        return Response(content=content, media_type=HAND_MEDIA_TYPE, headers=headers)
+    content = cached.json if cached is not None else hand_to_json(hand)
+    SERIALIZATION_DURATION.labels("json").observe(time.perf_counter() - started)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from app.services.game_service import GameService
+from app.routes.hands import get_game_service
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_stats(
+    group_by: str = Query("player", pattern="^(player|seat)$"),
+    player_name: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    game_service: GameService = Depends(get_game_service)
+):
+    """Get VPIP, PFR, aggression factor and winnings per player or per seat.
+
+    Served from the rollups, which trail completed hands by at most
+    STATS_FLUSH_INTERVAL seconds.
+    """
+    try:
+        return await game_service.get_player_stats(group_by, player_name, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -0,0 +1,149 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional
+import json
+from app.services.game_service import BatchStepError
+from app.services.table_manager import TableManager
+from app.models.game import Hand
+from app.models.serialization import hand_to_json
+from app.models.table import Table
+from app.routes.hands import MAX_BATCH_STEPS, BatchStep
+
+router = APIRouter()
+
+class CreateTableRequest(BaseModel):
+    buy_in: int = 1000
+    player_names: Optional[List[str]] = None
+
+class TableStepsRequest(BaseModel):
+    steps: List[BatchStep] = Field(..., min_length=1, max_length=MAX_BATCH_STEPS)
+
+
+def get_table_manager(request: Request) -> TableManager:
+    """Dependency to get the app-scoped table manager instance."""
+    return request.app.state.table_manager
+
+def local_table(table_id: str, request: Request) -> str:
+    """Dependency: the table id, or a 307 to the shard that owns the table."""
+    shards = request.app.state.table_manager.shards
+    if not shards.is_local(table_id):
+        path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        raise HTTPException(
+            status_code=307,
+            detail=f"Table is served by shard {shards.owner(table_id)}",
+            headers={"Location": shards.url_for(table_id, path)}
+        )
+    return table_id
+
+@router.post("/tables")
+async def create_table(
+    request: CreateTableRequest,
+    table_manager: TableManager = Depends(get_table_manager)
+):
+    """Open a six-seat table and deal its first hand."""
+    try:
+        table, hand = await table_manager.create_table(request.buy_in, request.player_names)
+        return _table_response(table_manager, table, hand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/tables")
+async def list_tables(
+    limit: int = Query(100, ge=1, le=1000),
+    table_manager: TableManager = Depends(get_table_manager)
+):
+    """Open tables served by this shard."""
+    return [_table_dict(table_manager, table) for table in table_manager.tables()[:limit]]
+
+@router.get("/tables/{table_id}")
+async def get_table(
+    table_id: str = Depends(local_table),
+    table_manager: TableManager = Depends(get_table_manager)
+):
+    """Get a table and its hand in play."""
+    try:
+        async with table_manager.locked_table(table_id) as table:
+            if not table:
+                raise HTTPException(status_code=404, detail="Table not found")
+
+            hand = await table_manager.current_hand(table)
+            return _table_response(table_manager, table, hand)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/tables/{table_id}/steps")
+async def play_table_steps(
+    request: TableStepsRequest,
+    table_id: str = Depends(local_table),
+    table_manager: TableManager = Depends(get_table_manager)
+):
+    """Apply actions and deal steps to the table's hand in play, atomically.
+
+    When the steps complete the hand, the next hand is dealt straight away
+    and the completed one is returned alongside it as ``completed_hand``.
+    """
+    try:
+        async with table_manager.locked_table(table_id) as table:
+            if not table:
+                raise HTTPException(status_code=404, detail="Table not found")
+
+            hand, completed = await table_manager.play(table, [step.model_dump() for step in request.steps])
+            return _table_response(table_manager, table, hand, completed)
+    except HTTPException:
+        raise
+    except BatchStepError as e:
+        raise HTTPException(status_code=400, detail={"index": e.index, "error": e.message})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.delete("/tables/{table_id}")
+async def close_table(
+    table_id: str = Depends(local_table),
+    table_manager: TableManager = Depends(get_table_manager)
+):
+    """Close a table; no further hands are dealt at it."""
+    try:
+        async with table_manager.locked_table(table_id) as table:
+            if not table:
+                raise HTTPException(status_code=404, detail="Table not found")
+
+            if not await table_manager.close_table(table):
+                raise HTTPException(status_code=500, detail="Failed to save table")
+            return _table_dict(table_manager, table)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _table_dict(table_manager: TableManager, table: Table) -> Dict:
+    return {
+        "id": table.id,
+        "shard": table_manager.shards.owner(table.id),
+        "player_names": table.player_names,
+        "stacks": table.stacks,
+        "buy_in": table.buy_in,
+        "dealer_position": table.dealer_position,
+        "current_hand_id": table.current_hand_id,
+        "hands_played": table.hands_played,
+        "rebuys": table.rebuys,
+        "is_closed": table.is_closed,
+    }
+
+def _table_response(
+    table_manager: TableManager,
+    table: Table,
+    hand: Hand,
+    completed: Optional[Hand] = None
+) -> Response:
+    """The table with its hand in play (and a just-completed hand) as JSON."""
+    content = (
+        f'{{"table":{json.dumps(_table_dict(table_manager, table))},"hand":{hand_to_json(hand)},'
+        f'"completed_hand":{hand_to_json(completed) if completed is not None else "null"}}}'
+    )
+    return Response(content=content, media_type="application/json")
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from app.models.codec import encode_hand
+from app.models.game import Hand
+from app.models.serialization import hand_to_json
+
+# Estimated memory per entry (hand objects, display dict and both rendered
+# payloads), fitted on six-player hands: about 800 bytes per player plus
+# 150 per action. Estimating from counts keeps put() from rendering anything.
+_BYTES_PER_PLAYER = 800
+_BYTES_PER_ACTION = 150
+
+
+def estimate_size(hand: Hand) -> int:
+    """Approximate bytes a cache entry for ``hand`` occupies."""
+    return _BYTES_PER_PLAYER * len(hand.players) + _BYTES_PER_ACTION * len(hand.actions)
+
+
+@dataclass(slots=True)
+class CachedHand:
+    """A completed hand, its display dict and response payloads rendered on first use."""
+    hand: Hand
+    display: Dict
+    size: int
+    _json: Optional[bytes] = None
+    _binary: Optional[bytes] = None
+
+    @property
+    def json(self) -> bytes:
+        """The hand in the API's JSON response shape, rendered once."""
+        if self._json is None:
+            self._json = hand_to_json(self.hand).encode()
+        return self._json
+
+    @property
+    def binary(self) -> bytes:
+        """The hand in the compact binary encoding, rendered once."""
+        if self._binary is None:
+            self._binary = encode_hand(self.hand)
+        return self._binary
+
+
+class CompletedHandCache:
+    """Size-bounded LRU of completed hands and their rendered payloads.
+
+    Completed hands no longer change through the game, so once a completed
+    hand is persisted it can be served from memory for review traffic
+    (single-hand reads, conditional requests and history pages). Entries are
+    charged an estimated size and the least recently used are evicted once
+    the total exceeds ``max_bytes``; a ``max_bytes`` of 0 disables the cache.
+
+    The cache is per process and is not told about writes made by other
+    processes, so a completed hand changed elsewhere is served stale until
+    it is evicted.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedHand]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, hand_id: str) -> Optional[CachedHand]:
+        """Cached entry for a hand, marking it most recently used."""
+        entry = self._entries.get(hand_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        self._entries.move_to_end(hand_id)
+        return entry
+
+    def peek(self, hand_id: str) -> Optional[CachedHand]:
+        """Cached entry for a hand, without counting or reordering."""
+        return self._entries.get(hand_id)
+
+    def put(self, hand: Hand, display: Dict) -> Optional[CachedHand]:
+        """Cache a completed hand, replacing any older entry for it."""
+        if not hand.is_completed or self.max_bytes <= 0:
+            return None
+        self.discard(hand.id)
+        entry = CachedHand(hand, display, estimate_size(hand))
+        if entry.size > self.max_bytes:
+            return None
+        self._entries[hand.id] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats["evictions"] += 1
+        return entry
+
+    def discard(self, hand_id: str):
+        """Drop a hand's entry, e.g. before the hand is changed."""
+        entry = self._entries.pop(hand_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> Dict:
+        """Cache size and hit/miss/eviction counters."""
+        return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
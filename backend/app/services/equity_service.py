@@ -0,0 +1,207 @@
+import math
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.models.cards import parse_cards
+from app.models.game import Hand
+from app.services.hand_evaluator import get_evaluator
+
+# Runouts processed per evaluator call.
+BATCH_SIZE = 20_000
+
+# Samples per Monte Carlo part. Parts are seeded in order from one seed, so
+# the samples drawn do not depend on how many workers share the parts.
+SAMPLE_PART_SIZE = 10_000
+
+
+def _showdown_shares(evaluator, holes: np.ndarray, boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-player pot share over a batch of runouts.
+
+    ``holes`` is (N, P, 2) and ``boards`` is (N, 5). Returns the summed pot
+    share, the summed squared share (for the standard error) and a (2, P)
+    array of outright win and tie counts.
+    """
+    n, players = holes.shape[:2]
+    ranks = np.empty((n, players), dtype=np.uint16)
+    for p in range(players):
+        ranks[:, p] = evaluator.evaluate(np.concatenate([holes[:, p, :], boards], axis=1))
+    best = ranks.max(axis=1, keepdims=True)
+    winners = ranks == best
+    winner_counts = winners.sum(axis=1, keepdims=True)
+    share = winners / winner_counts
+    wins = (winners & (winner_counts == 1)).sum(axis=0)
+    ties = (winners & (winner_counts > 1)).sum(axis=0)
+    return share.sum(axis=0), (share ** 2).sum(axis=0), np.stack([wins, ties])
+
+
+def _enumerate_chunk(args) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Exact enumeration over a slice of the remaining-board combinations."""
+    holes, board, runouts = args
+    evaluator = get_evaluator()
+    players = len(holes)
+    totals = [np.zeros(players), np.zeros(players), np.zeros((2, players), dtype=np.int64)]
+    for offset in range(0, len(runouts), BATCH_SIZE):
+        batch = runouts[offset:offset + BATCH_SIZE]
+        boards = np.concatenate([np.broadcast_to(board, (len(batch), len(board))), batch], axis=1)
+        hole_batch = np.broadcast_to(holes, (len(batch),) + holes.shape)
+        for total, part in zip(totals, _showdown_shares(evaluator, hole_batch, boards)):
+            total += part
+    return totals[0], totals[1], totals[2], len(runouts)
+
+
+def _sample_chunk(args) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """One part of Monte Carlo runouts; parts after the first are skipped past the deadline."""
+    holes, unknown, board, deck, seed, quota, deadline, first = args
+    evaluator = get_evaluator()
+    rng = np.random.default_rng(seed)
+    deck = np.asarray(deck, dtype=np.int16)
+    missing = 5 - len(board)
+    draw = missing + 2 * len(unknown)
+    players = len(holes)
+    totals = [np.zeros(players), np.zeros(players), np.zeros((2, players), dtype=np.int64)]
+    done = 0
+    if not first and deadline is not None and time.time() >= deadline:
+        return totals[0], totals[1], totals[2], done
+    while done < quota:
+        size = min(BATCH_SIZE, quota - done)
+        picks = deck[np.argsort(rng.random((size, len(deck))), axis=1)[:, :draw]]
+        boards = np.concatenate([np.broadcast_to(board, (size, len(board))), picks[:, :missing]], axis=1)
+        hole_batch = np.array(np.broadcast_to(holes, (size,) + holes.shape))
+        for i, player_index in enumerate(unknown):
+            hole_batch[:, player_index, :] = picks[:, missing + 2 * i:missing + 2 * i + 2]
+        for total, part in zip(totals, _showdown_shares(evaluator, hole_batch, boards)):
+            total += part
+        done += size
+    return totals[0], totals[1], totals[2], done
+
+
+class EquityService:
+    """Showdown equity for the active players of a hand.
+
+    Remaining runouts are enumerated exactly when there are at most
+    ``exact_limit`` of them and every active player's hole cards are known;
+    otherwise runouts (and unknown hole cards) are sampled. Known hole cards
+    of folded players are dead and never dealt. Large jobs are split across a
+    process pool. Samples are drawn in parts of SAMPLE_PART_SIZE, each seeded
+    from a single ``SeedSequence``, so without a time budget a given seed and
+    sample count always reproduce the same result; with one, parts not
+    started by the deadline are skipped.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, exact_limit: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("EQUITY_WORKERS", str(os.cpu_count() or 1)))
+        self.exact_limit = exact_limit or int(os.getenv("EQUITY_EXACT_LIMIT", "200000"))
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _run(self, func, jobs: List) -> List:
+        if len(jobs) == 1 or self.max_workers <= 1:
+            return [func(job) for job in jobs]
+        return list(self._executor().map(func, jobs))
+
+    def calculate(
+        self,
+        hand: Hand,
+        time_budget_ms: Optional[int] = 1000,
+        max_samples: int = 200_000,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """Equity of each non-folded player given known hole and board cards.
+
+        ``time_budget_ms`` of None samples all ``max_samples``. The hand is
+        read off the event loop, so pass a copy (``GameService.snapshot_hand``).
+        """
+        started = time.time()
+        players = sorted(hand.players, key=lambda p: p.position)
+        active = [p for p in players if not p.is_folded]
+        board = parse_cards(hand.board_cards or "")[:5]
+
+        known_holes = {}
+        for player in players:
+            cards = parse_cards(player.hole_cards) if player.hole_cards and "?" not in player.hole_cards else []
+            if cards and len(cards) != 2:
+                raise ValueError(f"Player {player.position} must have exactly two hole cards")
+            if cards:
+                known_holes[player.position] = cards
+
+        dealt = board + [card for cards in known_holes.values() for card in cards]
+        # Folded players' known cards stay in ``dealt`` (dead) but not in the showdown.
+        known_holes = {p.position: known_holes[p.position] for p in active if p.position in known_holes}
+        if len(set(dealt)) != len(dealt):
+            raise ValueError("Duplicate cards between hole cards and board")
+
+        result = {
+            "hand_id": hand.id,
+            "board_cards": hand.board_cards,
+            "method": "exact",
+            "samples": 0,
+            "players": [],
+        }
+        if len(active) < 2:
+            result["players"] = [
+                {"position": p.position, "hole_cards": p.hole_cards, "equity": 1.0, "win": 1.0, "tie": 0.0, "stderr": 0.0}
+                for p in active
+            ]
+            result["elapsed_ms"] = round((time.time() - started) * 1000, 2)
+            return result
+
+        deck = [card for card in range(52) if card not in set(dealt)]
+        unknown = [i for i, p in enumerate(active) if p.position not in known_holes]
+        holes = np.array([known_holes.get(p.position, [0, 0]) for p in active], dtype=np.int16)
+        board_array = np.array(board, dtype=np.int16)
+        missing = 5 - len(board)
+
+        runouts = math.comb(len(deck), missing)
+        if not unknown and runouts <= self.exact_limit:
+            all_runouts = np.array(list(combinations(deck, missing)), dtype=np.int16).reshape(runouts, missing)
+            parts = max(1, min(self.max_workers, runouts // BATCH_SIZE))
+            jobs = [(holes, board_array, chunk) for chunk in np.array_split(all_runouts, parts)]
+            outputs = self._run(_enumerate_chunk, jobs)
+        else:
+            result["method"] = "monte_carlo"
+            if seed is None:
+                seed = zlib.crc32(hand.id.encode())
+            parts = math.ceil(max_samples / SAMPLE_PART_SIZE)
+            seeds = np.random.SeedSequence(seed).spawn(parts)
+            deadline = started + time_budget_ms / 1000 if time_budget_ms is not None else None
+            quotas = [min(SAMPLE_PART_SIZE, max_samples - i * SAMPLE_PART_SIZE) for i in range(parts)]
+            jobs = [
+                (holes, unknown, board_array, deck, seeds[i], quotas[i], deadline, i == 0)
+                for i in range(parts)
+            ]
+            outputs = self._run(_sample_chunk, jobs)
+            result["seed"] = seed
+
+        share = sum(o[0] for o in outputs)
+        share_sq = sum(o[1] for o in outputs)
+        counts = sum(o[2] for o in outputs)
+        samples = sum(o[3] for o in outputs)
+
+        for i, player in enumerate(active):
+            equity = share[i] / samples
+            variance = max(share_sq[i] / samples - equity ** 2, 0.0)
+            result["players"].append({
+                "position": player.position,
+                "hole_cards": player.hole_cards,
+                "equity": round(float(equity), 6),
+                "win": round(float(counts[0][i] / samples), 6),
+                "tie": round(float(counts[1][i] / samples), 6),
+                "stderr": 0.0 if result["method"] == "exact" else round(math.sqrt(variance / samples), 6),
+            })
+        result["samples"] = int(samples)
+        result["elapsed_ms"] = round((time.time() - started) * 1000, 2)
+        return result
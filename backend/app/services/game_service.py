@@ -1,149 +1,506 @@
-from typing import List, Dict, Optional
-from app.models.game import Hand, Player, GameAction
-from app.repositories.hand_repository import HandRepository
-from app.services.poker_engine import PokerEngine
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from app.models.game import Hand, Player, GameAction, ActionType, Round, apply_action, check_player_names
+from app.repositories.async_hand_repository import AsyncHandRepository
+from app.repositories.hand_repository import HandSearch
+from app.repositories.stats_repository import AsyncStatsRepository
+from app.services.poker_engine import PokerEngine, HandSession
+from app.services.live_hand_store import LiveHandStore
+from app.services.completed_hand_cache import CachedHand, CompletedHandCache
+from app.services.hand_events import HandEventBroker
+from app.services.hand_writer import HandWriter
+from app.services.equity_service import EquityService
+from app.services.preflop_equity import get_preflop_table
+from app.services.player_stats import StatsRecorder, stats_summary
+from app.services.settlement import settle_hand, showdown_cards_known
+from app.metrics import ENGINE_ERRORS
+from collections import OrderedDict
+import asyncio
+import copy
+import logging
+import os
 import uuid
 
+logger = logging.getLogger(__name__)
+
+BATCH_STEP_TYPES = ("action", "deal_cards", "deal_board")
+
+
+class BatchStepError(ValueError):
+    """Raised by ``GameService.apply_batch`` for the first step that cannot be applied."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"Step {index}: {message}")
+        self.index = index
+        self.message = message
+
+
+def _preflop_ev(hand: Hand) -> Dict:
+    return get_preflop_table().hand_ev(hand)
+
+
 class GameService:
     """Service for managing poker game logic and hand operations."""
     
     def __init__(self):
-        self.hand_repository = HandRepository()
+        self.hand_repository = AsyncHandRepository()
         self.poker_engine = PokerEngine()
+        self.hand_writer = HandWriter(
+            self.hand_repository,
+            max_batch=int(os.getenv("HAND_WRITE_BATCH_SIZE", "64")),
+            max_delay=float(os.getenv("HAND_WRITE_DELAY_MS", "0")) / 1000,
+        )
+        self.live_hands = LiveHandStore(
+            self.hand_repository,
+            flush_interval=float(os.getenv("LIVE_HANDS_FLUSH_INTERVAL", "1.0")),
+            idle_ttl=float(os.getenv("LIVE_HANDS_IDLE_TTL", "900")),
+            writer=self.hand_writer,
+            # Experimental; only safe when one process serves all of a hand's requests.
+            write_behind=os.getenv("LIVE_HANDS_WRITE_BEHIND", "0") == "1",
+            on_persisted=self._hand_persisted,
+            on_dropped=self._hand_dropped,
+        )
+        self.completed_hands = CompletedHandCache(
+            max_bytes=int(float(os.getenv("COMPLETED_HANDS_CACHE_MB", "64")) * 1024 * 1024)
+        )
+        self.events = HandEventBroker(max_queue=int(os.getenv("HAND_EVENTS_QUEUE_SIZE", "256")))
+        # Change events per hand, published once the change is persisted.
+        self._pending_events: Dict[str, List[Dict]] = {}
+        self.sessions: "OrderedDict[str, HandSession]" = OrderedDict()
+        self.max_sessions = int(os.getenv("ENGINE_SESSION_CACHE_SIZE", "10000"))
+        self.equity_service = EquityService()
+        self.stats_recorder = StatsRecorder(
+            AsyncStatsRepository(),
+            flush_interval=float(os.getenv("STATS_FLUSH_INTERVAL", "1.0")),
+        )
+    
+    def start(self):
+        """Start background persistence of live hands and stats rollups."""
+        self.hand_writer.start()
+        self.live_hands.start()
+        self.stats_recorder.start()
+    
+    async def stop(self):
+        """Flush live hands and stats, and stop background persistence."""
+        await self.live_hands.stop()
+        await self.hand_writer.stop()
+        await self.stats_recorder.stop()
+        self.equity_service.shutdown()
     
-    def create_new_hand(self, player_stacks: List[int]) -> Hand:
-        """Create a new hand with 6 players and initial setup."""
+    def hand_lock(self, hand_id: str):
+        """Lock to hold (``async with``) around a load-mutate-save cycle on one hand."""
+        return self.live_hands.lock(hand_id)
+    
+    def create_new_hand(
+        self,
+        player_stacks: List[int],
+        dealer_position: int = 0,
+        player_names: Optional[List[str]] = None
+    ) -> Hand:
+        """Create a new hand with 6 players, posting the blinds left of the dealer."""
         if len(player_stacks) != 6:
             raise ValueError("Must have exactly 6 players")
+        if not 0 <= dealer_position < 6:
+            raise ValueError("Dealer position must be between 0 and 5")
+        if player_names is not None:
+            if len(player_names) != 6:
+                raise ValueError("Must have exactly 6 player names")
+            check_player_names(player_names)
         
+        sb_position = (dealer_position + 1) % 6
+        bb_position = (dealer_position + 2) % 6
         players = []
         for i, stack in enumerate(player_stacks):
             player = Player(
                 position=i,
-                name=f"Player {i + 1}",
+                name=player_names[i] if player_names else f"Player {i + 1}",
                 stack=stack,
-                is_dealer=(i == 0),  # Position 0 is dealer
-                is_small_blind=(i == 1),  # Position 1 is small blind
-                is_big_blind=(i == 2)  # Position 2 is big blind
+                is_dealer=(i == dealer_position),
+                is_small_blind=(i == sb_position),
+                is_big_blind=(i == bb_position)
             )
             players.append(player)
         
-        players[1].current_bet = 20  # Small blind
-        players[1].total_invested = 20
-        players[1].stack -= 20
+        players[sb_position].current_bet = 20  # Small blind
+        players[sb_position].total_invested = 20
+        players[sb_position].stack -= 20
         
-        players[2].current_bet = 40  # Big blind
-        players[2].total_invested = 40
-        players[2].stack -= 40
+        players[bb_position].current_bet = 40  # Big blind
+        players[bb_position].total_invested = 40
+        players[bb_position].stack -= 40
         
         hand = Hand(
             id=str(uuid.uuid4()),
             players=players,
             actions=[],
             pot_size=60,  # SB + BB
-            current_round="preflop"
+            current_round=Round.PREFLOP
         )
         
         return hand
     
+    def get_session(self, hand: Hand) -> HandSession:
+        """Live engine session for the hand, rebuilt only if it no longer matches."""
+        session = self.sessions.get(hand.id)
+        if session is None or not session.matches(hand):
+            session = self.poker_engine.create_session(hand)
+            self.sessions[hand.id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(hand.id)
+        session.sync_board(hand)
+        return session
+    
+    def get_action_options(self, hand: Hand, player_position: int) -> Dict:
+        """Valid actions and bet sizing for a player, from the live session when possible."""
+        session = self.get_session(hand)
+        options = {
+            "player_position": player_position,
+            "valid_actions": self.poker_engine.get_valid_actions(hand, player_position, session),
+            "is_actor": session.is_actor(player_position),
+            "actor_position": session.actor_position(),
+            "call_amount": None,
+            "min_raise_to": None,
+            "max_raise_to": None,
+        }
+        if options["is_actor"]:
+            options["call_amount"] = session.call_amount()
+            options["min_raise_to"] = session.min_raise_to()
+            options["max_raise_to"] = session.max_raise_to()
+        return options
+    
     def add_action(self, hand: Hand, player_position: int, action_type: str, amount: int = 0) -> Hand:
         """Add an action to the hand and update game state."""
-        if not self.poker_engine.validate_action(hand, player_position, action_type, amount):
+        if hand.is_completed:
+            # It may be the cached copy; save_hand re-caches it once persisted.
+            self.completed_hands.discard(hand.id)
+        session = self.get_session(hand)
+        if not self.poker_engine.validate_action(hand, player_position, action_type, amount, session):
             raise ValueError(f"Invalid action: {action_type} for player {player_position}")
         
-        player = next(p for p in hand.players if p.position == player_position)
-        
         action = GameAction(
             player_position=player_position,
-            action_type=action_type,
+            action_type=ActionType(action_type),
             amount=amount,
             round=hand.current_round
         )
         
-        if action_type == "fold":
-            player.is_folded = True
-        elif action_type == "call":
-            max_bet = max(p.current_bet for p in hand.players if not p.is_folded)
-            call_amount = max_bet - player.current_bet
-            player.current_bet = max_bet
-            player.total_invested += call_amount
-            player.stack -= call_amount
-            hand.pot_size += call_amount
-        elif action_type == "bet":
-            player.current_bet = amount
-            player.total_invested += amount
-            player.stack -= amount
-            hand.pot_size += amount
-        elif action_type == "raise":
-            raise_amount = amount - player.current_bet
-            player.current_bet = amount
-            player.total_invested += raise_amount
-            player.stack -= raise_amount
-            hand.pot_size += raise_amount
-        elif action_type == "allin":
-            all_in_amount = player.stack
-            player.current_bet += all_in_amount
-            player.total_invested += all_in_amount
-            player.stack = 0
-            hand.pot_size += all_in_amount
-        
-        hand.actions.append(action)
-        
-        if self._is_betting_round_complete(hand):
+        apply_action(hand, action)
+        hand.version += 1
+        session.apply(hand, action)
+        if self.events.has_subscribers(hand.id):
+            player = next(p for p in hand.players if p.position == player_position)
+            self._emit(
+                hand, "action",
+                seq=len(hand.actions) - 1,
+                position=player_position,
+                action=action.action_type,
+                amount=amount,
+                round=action.round,
+                pot=hand.pot_size,
+                stack=player.stack,
+                bet=player.current_bet,
+            )
+        round_complete = self._is_betting_round_complete(hand, session)
+        # Deal known streets now so an all-in runout finishes the hand.
+        session.sync_board(hand)
+        
+        if session.is_finished():
+            hand = self.complete_hand(hand)
+        elif round_complete:
             hand = self._advance_to_next_round(hand)
         
         return hand
     
     def deal_hole_cards(self, hand: Hand, cards_by_position: Dict[int, str]) -> Hand:
         """Deal hole cards to players."""
+        if hand.is_completed:
+            self.completed_hands.discard(hand.id)
         for position, cards in cards_by_position.items():
             player = next(p for p in hand.players if p.position == position)
             player.hole_cards = cards
+        hand.version += 1
+        self._emit(hand, "hole_cards", cards=cards_by_position)
         return hand
     
     def deal_board_cards(self, hand: Hand, board_cards: str) -> Hand:
         """Deal board cards (flop, turn, river)."""
+        if hand.is_completed:
+            self.completed_hands.discard(hand.id)
         hand.board_cards = board_cards
+        hand.version += 1
+        self._emit(hand, "board", board_cards=board_cards)
+        session = self.sessions.get(hand.id)
+        if session is not None and session.matches(hand) and hand.actions and not hand.is_completed:
+            session.sync_board(hand)
+            if session.is_finished():
+                hand = self.complete_hand(hand)
         return hand
     
+    def apply_batch(self, hand: Hand, steps: List[Dict]) -> Hand:
+        """Apply deal and action steps in order, all or nothing.
+
+        Each step is a dict with ``type`` "action" (``player_position``,
+        ``action_type``, ``amount``), "deal_cards" (``cards_by_position``) or
+        "deal_board" (``board_cards``). Steps run on a copy of the hand, so if
+        one fails BatchStepError names it and the hand, its engine session
+        and its pending change events are left as they were. Save the
+        returned hand once to persist the whole batch.
+        """
+        session = self.sessions.get(hand.id)
+        session_snapshot = session.snapshot() if session is not None else None
+        pending_events = list(self._pending_events.get(hand.id, ()))
+        working = copy.deepcopy(hand)
+        try:
+            for index, step in enumerate(steps):
+                try:
+                    working = self._apply_step(working, step)
+                except (ValueError, KeyError, StopIteration) as e:
+                    message = str(e) if not isinstance(e, StopIteration) else "unknown player position"
+                    raise BatchStepError(index, message)
+        except Exception:
+            # Any failure, not only a rejected step, leaves everything as it was.
+            if session is not None:
+                session.restore(session_snapshot)
+                self.sessions[hand.id] = session
+            else:
+                self.sessions.pop(hand.id, None)
+            if pending_events:
+                self._pending_events[hand.id] = pending_events
+            else:
+                self._pending_events.pop(hand.id, None)
+            raise
+        return working
+    
+    def _apply_step(self, hand: Hand, step: Dict) -> Hand:
+        step_type = step.get("type", "action")
+        if step_type == "action":
+            if hand.is_completed:
+                raise ValueError("Hand is already completed")
+            if step.get("player_position") is None or not step.get("action_type"):
+                raise ValueError("Action steps need player_position and action_type")
+            return self.add_action(hand, step["player_position"], step["action_type"], step.get("amount") or 0)
+        if step_type == "deal_cards":
+            cards = step.get("cards_by_position")
+            if not cards:
+                raise ValueError("Deal steps need cards_by_position")
+            return self.deal_hole_cards(hand, {int(position): c for position, c in cards.items()})
+        if step_type == "deal_board":
+            if step.get("board_cards") is None:
+                raise ValueError("Board steps need board_cards")
+            return self.deal_board_cards(hand, step["board_cards"])
+        raise ValueError(f"Unknown step type: {step_type!r}")
+    
+    async def calculate_equity(
+        self,
+        hand: Hand,
+        time_budget_ms: Optional[int] = 1000,
+        max_samples: int = 200000,
+        seed: Optional[int] = None
+    ) -> Dict:
+        """Equity of each active player, computed off the event loop.
+
+        The hand is read in a worker thread; pass a ``snapshot_hand`` copy.
+        """
+        return await asyncio.to_thread(
+            self.equity_service.calculate, hand, time_budget_ms, max_samples, seed
+        )
+    
+    async def preflop_ev(self, hand: Hand) -> Dict:
+        """Equity and chip EV of each player if the hand goes all in preflop.
+
+        Heads-up pots are looked up in the precomputed preflop table, but
+        multiway pots run a short Monte Carlo (about 15 ms), so this runs off
+        the event loop; pass a ``snapshot_hand`` copy. Raises
+        FileNotFoundError until the table is built.
+        """
+        return await asyncio.to_thread(_preflop_ev, hand)
+    
     def complete_hand(self, hand: Hand) -> Hand:
-        """Complete the hand and calculate winnings."""
+        """Complete the hand and calculate winnings.
+
+        Winnings come from the live engine session when it is in step with
+        the hand, and are otherwise settled from the players' investments
+        and showdown cards without replaying the hand. Contested pots with
+        unknown showdown cards are split evenly among their contenders.
+        Raises ValueError, leaving the hand open, if it cannot be settled.
+        """
+        session = self.sessions.pop(hand.id, None)
+        winnings = None
+        if not showdown_cards_known(hand):
+            logger.info("Hand %s reached showdown with unknown cards; splitting contested pots evenly", hand.id)
+        else:
+            try:
+                winnings = session.settle(hand) if session is not None else None
+                if winnings is None:
+                    winnings = settle_hand(hand)
+            except Exception:
+                ENGINE_ERRORS.labels("settle_fallback").inc()
+                logger.exception("Error settling hand %s; splitting contested pots evenly", hand.id)
+        if winnings is None:
+            try:
+                winnings = settle_hand(hand, split_unknown=True)
+            except Exception as e:
+                ENGINE_ERRORS.labels("settle_failed").inc()
+                logger.exception("Error settling hand %s", hand.id)
+                raise ValueError(f"Cannot settle hand {hand.id}") from e
         hand.is_completed = True
+        hand.winnings = winnings
+        hand.winner_positions = [pos for pos, amount in winnings.items() if amount > 0]
         
-        try:
-            winnings = self.poker_engine.evaluate_hand(hand)
-            hand.winnings = winnings
-            
-            hand.winner_positions = [pos for pos, amount in winnings.items() if amount > 0]
-        except Exception as e:
-            print(f"Error evaluating hand: {e}")
-            active_players = [p for p in hand.players if not p.is_folded]
-            if active_players:
-                split_amount = hand.pot_size // len(active_players)
-                hand.winnings = {}
-                for player in hand.players:
-                    if not player.is_folded:
-                        hand.winnings[player.position] = split_amount - player.total_invested
-                        hand.winner_positions.append(player.position)
-                    else:
-                        hand.winnings[player.position] = -player.total_invested
-        
+        self._emit(hand, "complete", winnings=hand.winnings, winner_positions=hand.winner_positions)
         return hand
     
-    def save_hand(self, hand: Hand) -> bool:
-        """Save hand to database."""
-        return self.hand_repository.save_hand(hand)
+    async def save_hand(self, hand: Hand) -> bool:
+        """Save hand to the live store, which persists it (see ``LiveHandStore.put``).
+
+        Completed hands are cached for review and queued for the stats
+        rollups once they are persisted, and change events recorded since
+        the last write are published to the hand's subscribers only then
+        (see ``_hand_persisted``): if the write fails they wait for the
+        store's retry, and a conflict discards them with the stale hand.
+        """
+        return await self.live_hands.put(hand)
+    
+    async def _hand_persisted(self, hand: Hand):
+        if hand.is_completed:
+            self._cache_completed(hand)
+            await self.stats_recorder.record(hand)
+        events = self._pending_events.pop(hand.id, None)
+        if events:
+            self.events.publish(hand.id, events)
+    
+    def _hand_dropped(self, hand_id: str):
+        # The stale copy's changes were never stored, so neither are its events
+        # nor its engine session.
+        self._pending_events.pop(hand_id, None)
+        self.sessions.pop(hand_id, None)
+    
+    async def get_player_stats(
+        self,
+        group_by: str = "player",
+        player_name: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict]:
+        """VPIP, PFR, aggression and winnings per player or per seat, from the rollups."""
+        rows = await self.stats_recorder.repository.get_stats(group_by, player_name, limit)
+        return [stats_summary(row) for row in rows]
     
-    def get_hand_history(self, limit: int = 50) -> List[Hand]:
-        """Get all hands for history display (completed and in-progress)."""
-        return self.hand_repository.get_all_hands(limit)
+    async def get_hand_history(self, limit: int = 50, after: Optional[Tuple[datetime, str]] = None) -> List[Hand]:
+        """Get a page of hands for history display, newest first, after a cursor key.
+
+        Only the page's keys are read first; hands held in memory are served
+        from there and just the rest are fetched from the database.
+        """
+        return await self._hands_for_keys(await self.hand_repository.get_hand_keys_page(limit, after))
+    
+    async def search_hands(
+        self,
+        search: HandSearch,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None
+    ) -> List[Hand]:
+        """Get a page of stored hands matching ``search``, newest first, after a cursor key.
+
+        Matching runs on the indexed columns of the stored headers, so hands
+        in progress match as of their last header write (round change or
+        completion) and changes still waiting for a write-behind flush are
+        not searched yet. Archived hands are not searched.
+        """
+        return await self._hands_for_keys(await self.hand_repository.search_hand_keys(search, limit, after))
     
-    def get_hand_by_id(self, hand_id: str) -> Optional[Hand]:
-        """Get specific hand by ID."""
-        return self.hand_repository.get_hand_by_id(hand_id)
+    async def _hands_for_keys(self, keys: List[Tuple[str, datetime]]) -> List[Hand]:
+        """Hands for (id, created_at) keys in order, from memory where held, else the database."""
+        hands: Dict[str, Hand] = {}
+        missing = []
+        for hand_id, _ in keys:
+            hand = self.live_hands.peek(hand_id)
+            if hand is None:
+                entry = self.completed_hands.get(hand_id)
+                hand = entry.hand if entry is not None else None
+            if hand is None:
+                missing.append(hand_id)
+            else:
+                hands[hand_id] = hand
+        for hand in await self.hand_repository.get_hands_by_ids(missing):
+            live = self.live_hands.peek(hand.id)
+            if live is not None:
+                hand = live
+            elif hand.is_completed:
+                self._cache_completed(hand)
+            hands[hand.id] = hand
+        # A hand deleted between the two queries is simply left out.
+        return [hands[hand_id] for hand_id, _ in keys if hand_id in hands]
     
-    def _is_betting_round_complete(self, hand: Hand) -> bool:
+    async def stream_hand_history(
+        self,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Hand]:
+        """Iterate the hand history newest first without loading it all into memory."""
+        async for hand in self.hand_repository.stream_hands(after, limit):
+            yield self.live_hands.peek(hand.id) or hand
+    
+    async def import_hands(self, hands: List[Hand]) -> int:
+        """Bulk-insert hands whose ids do not exist yet; returns how many were inserted."""
+        return await self.hand_repository.bulk_insert_hands(hands)
+    
+    async def get_hand_by_id(self, hand_id: str) -> Optional[Hand]:
+        """Get specific hand by ID, preferring the live or cached in-memory copy."""
+        # Hands in the live store are in progress or not yet persisted, so
+        # the completed-hand cache is only consulted for the others.
+        if self.live_hands.peek(hand_id) is None:
+            entry = self.completed_hands.get(hand_id)
+            if entry is not None:
+                # A change to it must be checked against the cached version.
+                self.live_hands.record_loaded(entry.hand)
+                return entry.hand
+        hand = await self.live_hands.get(hand_id)
+        if hand is not None and hand.is_completed and self.live_hands.peek(hand_id) is None:
+            self._cache_completed(hand)
+        return hand
+    
+    async def snapshot_hand(self, hand_id: str) -> Optional[Hand]:
+        """Copy of a hand taken under its lock, safe to read off the event loop."""
+        async with self.hand_lock(hand_id):
+            hand = await self.get_hand_by_id(hand_id)
+            return copy.deepcopy(hand) if hand is not None else None
+    
+    def cached_hand(self, hand: Hand) -> Optional[CachedHand]:
+        """Cache entry holding this very hand object, with its rendered payloads."""
+        entry = self.completed_hands.peek(hand.id)
+        return entry if entry is not None and entry.hand is hand else None
+    
+    async def get_hand_version(self, hand_id: str) -> Optional[int]:
+        """Current version of a hand without loading it, or None if it does not exist."""
+        hand = self.live_hands.peek(hand_id)
+        if hand is not None:
+            return hand.version
+        entry = self.completed_hands.get(hand_id)
+        if entry is not None:
+            return entry.hand.version
+        return await self.hand_repository.get_hand_version(hand_id)
+    
+    def hand_display(self, hand: Hand) -> Dict:
+        """Display dict for a hand, reusing the cached rendering of completed hands."""
+        entry = self.cached_hand(hand)
+        return entry.display if entry is not None else self.format_hand_for_display(hand)
+    
+    def _emit(self, hand: Hand, event_type: str, **fields):
+        # Only watched hands record events, so unwatched play pays nothing.
+        if self.events.has_subscribers(hand.id):
+            self._pending_events.setdefault(hand.id, []).append(
+                dict(type=event_type, hand_id=hand.id, version=hand.version, **fields)
+            )
+    
+    def _cache_completed(self, hand: Hand) -> Optional[CachedHand]:
+        return self.completed_hands.put(hand, self.format_hand_for_display(hand))
+    
+    def _is_betting_round_complete(self, hand: Hand, session: Optional[HandSession] = None) -> bool:
         """Check if current betting round is complete."""
+        if session is not None and session.betting_round_complete() is not None:
+            return session.betting_round_complete()
+        
         active_players = [p for p in hand.players if not p.is_folded]
         
         if len(active_players) <= 1:
@@ -161,15 +518,16 @@ class GameService:
         for player in hand.players:
             player.current_bet = 0
         
-        if hand.current_round == "preflop":
-            hand.current_round = "flop"
-        elif hand.current_round == "flop":
-            hand.current_round = "turn"
-        elif hand.current_round == "turn":
-            hand.current_round = "river"
-        elif hand.current_round == "river":
-            hand = self.complete_hand(hand)
+        if hand.current_round == Round.PREFLOP:
+            hand.current_round = Round.FLOP
+        elif hand.current_round == Round.FLOP:
+            hand.current_round = Round.TURN
+        elif hand.current_round == Round.TURN:
+            hand.current_round = Round.RIVER
+        elif hand.current_round == Round.RIVER:
+            return self.complete_hand(hand)
         
+        self._emit(hand, "round", round=hand.current_round)
         return hand
     
     def format_hand_for_display(self, hand: Hand) -> Dict:
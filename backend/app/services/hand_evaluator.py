@@ -0,0 +1,230 @@
+import argparse
+import os
+import threading
+import time
+from itertools import combinations
+from typing import List, Optional, Sequence
+import numpy as np
+from app.models.cards import parse_cards, format_cards
+
+# Number of distinct 5-card hand strengths; ranks run from 0 (7-5-4-3-2
+# offsuit) to 7461 (royal flush), higher is better.
+DISTINCT_HAND_RANKS = 7462
+
+CATEGORY_NAMES = (
+    "High Card",
+    "One Pair",
+    "Two Pair",
+    "Three of a Kind",
+    "Straight",
+    "Flush",
+    "Full House",
+    "Four of a Kind",
+    "Straight Flush",
+)
+
+# First dense rank of each category, in CATEGORY_NAMES order.
+CATEGORY_OFFSETS = np.array([0, 1277, 4137, 4995, 5853, 5863, 7140, 7296, 7452], dtype=np.uint16)
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "hand_ranks_5.npy")
+
+# Binomial coefficients C(n, k) for the combinatorial (colex) index of a
+# sorted 5-card combination: sum of C(card_i, i + 1).
+_BINOMIAL = np.zeros((53, 6), dtype=np.int64)
+for _n in range(53):
+    _BINOMIAL[_n, 0] = 1
+    for _k in range(1, min(_n, 5) + 1):
+        _BINOMIAL[_n, _k] = _BINOMIAL[_n - 1, _k - 1] + (_BINOMIAL[_n - 1, _k] if _k <= _n - 1 else 0)
+TABLE_SIZE = int(_BINOMIAL[52, 5])
+
+_SUBSETS_BY_SIZE = {n: np.array(list(combinations(range(n), 5)), dtype=np.intp) for n in (5, 6, 7)}
+
+
+def _colex_index(sorted_cards: np.ndarray) -> np.ndarray:
+    """Combinatorial index of ascending 5-card rows."""
+    index = _BINOMIAL[sorted_cards[:, 0], 1]
+    for k in range(1, 5):
+        index = index + _BINOMIAL[sorted_cards[:, k], k + 1]
+    return index
+
+
+def _straight_high_by_mask() -> np.ndarray:
+    """Map a 13-bit rank mask to 1 + the straight's high rank, or 0."""
+    table = np.zeros(1 << 13, dtype=np.int8)
+    for high in range(4, 13):
+        table[0b11111 << (high - 4)] = high + 1
+    table[0b1000000001111] = 4  # wheel: A-2-3-4-5 plays as 5-high
+    return table
+
+
+def _score_five_card_hands(cards: np.ndarray) -> np.ndarray:
+    """Totally ordered (not dense) strength scores for (N, 5) card codes."""
+    ranks = cards // 4
+    suits = cards % 4
+    is_flush = (suits == suits[:, :1]).all(axis=1)
+
+    counts = np.zeros((len(cards), 13), dtype=np.int8)
+    rows = np.arange(len(cards))
+    for k in range(5):
+        counts[rows, ranks[:, k]] += 1
+    per_card_count = counts[rows[:, None], ranks]
+
+    mask = np.zeros(len(cards), dtype=np.int64)
+    for k in range(5):
+        mask |= 1 << ranks[:, k].astype(np.int64)
+    straight_high = _straight_high_by_mask()[mask].astype(np.int64) - 1
+    is_straight = straight_high >= 0
+
+    max_count = counts.max(axis=1)
+    distinct = (counts > 0).sum(axis=1)
+
+    category = np.zeros(len(cards), dtype=np.int64)
+    category[(max_count == 2) & (distinct == 4)] = 1
+    category[(max_count == 2) & (distinct == 3)] = 2
+    category[(max_count == 3) & (distinct == 3)] = 3
+    category[is_straight & ~is_flush] = 4
+    category[is_flush & ~is_straight] = 5
+    category[(max_count == 3) & (distinct == 2)] = 6
+    category[max_count == 4] = 7
+    category[is_straight & is_flush] = 8
+
+    # Kickers: ranks ordered by (group size, rank), both descending.
+    order = np.argsort(-(per_card_count.astype(np.int64) * 16 + ranks), axis=1, kind="stable")
+    ordered = np.take_along_axis(ranks, order, axis=1).astype(np.int64)
+    kickers = np.zeros(len(cards), dtype=np.int64)
+    for k in range(5):
+        kickers = kickers * 13 + ordered[:, k]
+    kickers = np.where(is_straight, straight_high, kickers)
+
+    return category * 13 ** 5 + kickers
+
+
+def build_rank_table(chunk_size: int = 400_000) -> np.ndarray:
+    """Dense strength rank of every 5-card hand, indexed by colex index."""
+    combos = np.fromiter(
+        (card for combo in combinations(range(52), 5) for card in combo),
+        dtype=np.int16,
+        count=TABLE_SIZE * 5,
+    ).reshape(TABLE_SIZE, 5)
+
+    scores = np.empty(TABLE_SIZE, dtype=np.int64)
+    for start in range(0, TABLE_SIZE, chunk_size):
+        scores[start:start + chunk_size] = _score_five_card_hands(combos[start:start + chunk_size])
+
+    _, dense = np.unique(scores, return_inverse=True)
+    table = np.empty(TABLE_SIZE, dtype=np.uint16)
+    table[_colex_index(combos.astype(np.intp))] = dense.reshape(-1).astype(np.uint16)
+    return table
+
+
+class HandEvaluator:
+    """Vectorized 5- to 7-card hand evaluator backed by a 5-card rank table.
+
+    Cards are integer codes (``app.models.cards``). A 6- or 7-card hand is
+    ranked as the best of its 5-card subsets, each looked up by colex index
+    in a 2,598,960-entry ``uint16`` table that is memory-mapped from disk
+    (and built on first use if the file is missing).
+    """
+
+    def __init__(self, table_path: Optional[str] = None, chunk_size: int = 262_144):
+        self.table_path = table_path or os.getenv("HAND_RANK_TABLE_PATH", DEFAULT_TABLE_PATH)
+        self.chunk_size = chunk_size
+        self.table = self._load_table()
+
+    def _load_table(self) -> np.ndarray:
+        if not os.path.exists(self.table_path):
+            os.makedirs(os.path.dirname(self.table_path), exist_ok=True)
+            tmp_path = f"{self.table_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, build_rank_table())
+            os.replace(tmp_path, self.table_path)
+        table = np.load(self.table_path, mmap_mode="r")
+        if table.shape != (TABLE_SIZE,) or table.dtype != np.uint16:
+            raise ValueError(f"Corrupt hand rank table at {self.table_path}")
+        return table
+
+    def evaluate(self, cards: np.ndarray) -> np.ndarray:
+        """Rank an (N, 5..7) array of card codes; returns N uint16 ranks."""
+        cards = np.asarray(cards)
+        if cards.ndim != 2 or cards.shape[1] not in _SUBSETS_BY_SIZE:
+            raise ValueError("Expected an (N, 5), (N, 6) or (N, 7) array of card codes")
+
+        subsets = _SUBSETS_BY_SIZE[cards.shape[1]]
+        result = np.empty(len(cards), dtype=np.uint16)
+        for start in range(0, len(cards), self.chunk_size):
+            chunk = np.sort(cards[start:start + self.chunk_size].astype(np.intp), axis=1)
+            best = np.zeros(len(chunk), dtype=np.uint16)
+            for subset in subsets:
+                np.maximum(best, self.table[_colex_index(chunk[:, subset])], out=best)
+            result[start:start + len(chunk)] = best
+        return result
+
+    def evaluate_strings(self, hands: Sequence[str]) -> np.ndarray:
+        """Rank card strings of equal length, e.g. 'AhKsQdJc9h8s7c'."""
+        return self.evaluate(np.array([parse_cards(hand) for hand in hands], dtype=np.int16))
+
+    @staticmethod
+    def category(ranks: np.ndarray) -> np.ndarray:
+        """Category index (see CATEGORY_NAMES) for each rank."""
+        return np.searchsorted(CATEGORY_OFFSETS, np.asarray(ranks), side="right") - 1
+
+    def cross_check(self, samples: int = 2000, seed: int = 0) -> List[str]:
+        """Compare random 7-card showdowns against pokerkit; returns mismatches."""
+        from pokerkit import StandardHighHand
+
+        rng = np.random.default_rng(seed)
+        deals = np.argsort(rng.random((samples, 52)), axis=1)[:, :9]
+        first = np.concatenate([deals[:, :2], deals[:, 4:]], axis=1)
+        second = deals[:, 2:]
+        ours = np.sign(self.evaluate(first).astype(np.int32) - self.evaluate(second).astype(np.int32))
+
+        mismatches = []
+        for i in range(samples):
+            board = format_cards(deals[i, 4:])
+            a = StandardHighHand.from_game(format_cards(deals[i, :2]), board)
+            b = StandardHighHand.from_game(format_cards(deals[i, 2:4]), board)
+            theirs = (a > b) - (a < b)
+            if theirs != ours[i]:
+                mismatches.append(f"{format_cards(deals[i, :4])} on {board}: ours {ours[i]}, pokerkit {theirs}")
+        return mismatches
+
+
+_evaluator: Optional[HandEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_evaluator() -> HandEvaluator:
+    """Process-wide evaluator, loading (or building) the rank table once."""
+    global _evaluator
+    with _evaluator_lock:
+        if _evaluator is None:
+            _evaluator = HandEvaluator()
+        return _evaluator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and verify the hand rank table.")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the table even if it exists")
+    parser.add_argument("--cross-check", type=int, default=0, metavar="N", help="compare N showdowns with pokerkit")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N", help="time N random 7-card evaluations")
+    args = parser.parse_args()
+
+    path = os.getenv("HAND_RANK_TABLE_PATH", DEFAULT_TABLE_PATH)
+    if args.rebuild and os.path.exists(path):
+        os.remove(path)
+    started = time.perf_counter()
+    evaluator = HandEvaluator(path)
+    print(f"Rank table ready at {path} in {time.perf_counter() - started:.2f}s")
+
+    if args.cross_check:
+        mismatches = evaluator.cross_check(args.cross_check)
+        print(f"Cross-check: {len(mismatches)} mismatches in {args.cross_check} showdowns")
+        for line in mismatches[:20]:
+            print(f"  {line}")
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        cards = np.argsort(rng.random((args.benchmark, 52)), axis=1)[:, :7].astype(np.uint8)
+        started = time.perf_counter()
+        evaluator.evaluate(cards)
+        elapsed = time.perf_counter() - started
+        print(f"Evaluated {args.benchmark} hands in {elapsed:.2f}s ({args.benchmark / elapsed:,.0f} hands/s)")
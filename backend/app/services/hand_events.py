@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Dict, List, Set
+
+
+def encode_event(event: Dict) -> str:
+    """Compact JSON for one event, as sent to subscribers."""
+    return json.dumps(event, separators=(",", ":"))
+
+
+class HandSubscription:
+    """One subscriber's bounded queue of encoded events for a hand.
+
+    A subscriber that falls ``max_queue`` events behind is not allowed to
+    hold up the publisher or grow without bound: its backlog is dropped and
+    replaced by a single ``resync`` event telling it to reload the hand.
+    """
+
+    def __init__(self, broker: "HandEventBroker", hand_id: str, max_queue: int):
+        self.broker = broker
+        self.hand_id = hand_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(max_queue)
+        self.dropped = 0
+
+    def offer(self, data: str) -> bool:
+        """Queue an event without waiting; False if the backlog was replaced by a resync."""
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event({"type": "resync", "hand_id": self.hand_id}))
+            return False
+
+    async def get(self) -> str:
+        """Next encoded event, waiting until one is published."""
+        return await self.queue.get()
+
+    def close(self):
+        """Stop receiving events."""
+        self.broker.unsubscribe(self)
+
+
+class HandEventBroker:
+    """In-process fan-out of hand change events to per-hand subscribers.
+
+    Each event is encoded to JSON once and offered to every subscriber of
+    its hand without awaiting, so publishing costs one queue put per
+    subscriber regardless of how slowly they read. Like the live hand
+    store, the broker is per process: subscribers must reach the worker
+    that serves the hand's writes.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[HandSubscription]] = {}
+        self._stats = {"published": 0, "delivered": 0, "resyncs": 0}
+
+    def subscribe(self, hand_id: str) -> HandSubscription:
+        """Start receiving the events published for a hand."""
+        subscription = HandSubscription(self, hand_id, self.max_queue)
+        self._subscribers.setdefault(hand_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: HandSubscription):
+        subscribers = self._subscribers.get(subscription.hand_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.hand_id]
+
+    def has_subscribers(self, hand_id: str) -> bool:
+        """Whether anyone is listening, so events for unwatched hands can be skipped."""
+        return hand_id in self._subscribers
+
+    def publish(self, hand_id: str, events: List[Dict]):
+        """Send events to every current subscriber of the hand."""
+        subscribers = self._subscribers.get(hand_id)
+        if not subscribers:
+            return
+        for event in events:
+            data = encode_event(event)
+            self._stats["published"] += 1
+            for subscription in subscribers:
+                if subscription.offer(data):
+                    self._stats["delivered"] += 1
+                else:
+                    self._stats["resyncs"] += 1
+
+    def stats(self) -> Dict:
+        """Subscriber counts and delivery counters."""
+        return dict(
+            self._stats,
+            hands=len(self._subscribers),
+            subscribers=sum(len(s) for s in self._subscribers.values()),
+        )
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from app.models.game import Hand
+from app.repositories.base import ConcurrentUpdateError
+from app.repositories.hand_repository import HandSave, hand_save
+
+logger = logging.getLogger(__name__)
+
+# A queued save, the future its caller awaits and when it was queued.
+_Pending = Tuple[HandSave, asyncio.Future, float]
+
+
+class HandWriter:
+    """Group commit for hand saves.
+
+    ``save_hand`` takes the same arguments as ``AsyncHandRepository.save_hand``
+    and gives the same result, but the save is queued and written by one
+    background task together with the saves of other requests: up to
+    ``max_batch`` hands per transaction, as one multi-row statement each for
+    headers, versions and actions, and one commit. Saves arriving while a
+    batch is written go into the next one, so under load the commit (and its
+    WAL flush) is shared instead of paid per request. A ``max_delay`` above 0
+    also holds a batch until it is full or its oldest save has waited that
+    many seconds, trading latency for larger batches.
+
+    Each caller awaits its own save: True once its batch committed,
+    ConcurrentUpdateError if its ``expected_version`` no longer matched (the
+    rest of the batch is still written), False if the write failed. A batch
+    that fails as a whole is retried one save at a time, so a bad hand only
+    fails its own caller. The hand is serialized when ``save_hand`` is called,
+    so callers may change it while the save is queued. Two saves of one hand
+    are never in the same batch and are written in the order they came.
+
+    Before ``start`` and after ``stop``, and with a ``max_batch`` of 1, saves
+    are written directly. If the background task dies, the saves it held get
+    False and it is started again (unless stopping).
+    """
+
+    def __init__(self, repository, max_batch: int = 64, max_delay: float = 0.0):
+        self.repository = repository
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Deque[_Pending] = deque()
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+        # The batch being written, failed with the queue if the task dies.
+        self._writing: List[_Pending] = []
+        self._stats = {
+            "saves": 0, "batches": 0, "batched_saves": 0, "batch_errors": 0,
+            "conflicts": 0, "failures": 0, "writer_restarts": 0,
+        }
+
+    async def save_hand(
+        self,
+        hand: Hand,
+        from_seq: int = 0,
+        write_header: bool = True,
+        expected_version: Optional[int] = None
+    ) -> bool:
+        """Save a hand with the next batch and wait for its commit.
+
+        Raises ConcurrentUpdateError if ``expected_version`` is given and the
+        stored hand is at another version.
+        """
+        self._stats["saves"] += 1
+        if self._task is None or self.max_batch <= 1:
+            return await self.repository.save_hand(hand, from_seq, write_header, expected_version)
+        try:
+            await self.repository.ensure_partitions([hand])
+        except Exception:
+            logger.exception("Error creating the partition of hand %s", hand.id)
+            self._stats["failures"] += 1
+            return False
+
+        save = hand_save(hand, from_seq, write_header, self.repository.binary, expected_version)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((save, future, time.monotonic()))
+        self._wakeup.set()
+        if len(self._queue) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    def _take_batch(self) -> List[_Pending]:
+        """Up to ``max_batch`` queued saves of distinct hands, oldest first."""
+        batch: List[_Pending] = []
+        hand_ids: Set[str] = set()
+        later: Deque[_Pending] = deque()
+        while self._queue and len(batch) < self.max_batch:
+            pending = self._queue.popleft()
+            # A later save of a hand already in the batch waits for the next one.
+            if pending[0].id in hand_ids:
+                later.append(pending)
+            else:
+                hand_ids.add(pending[0].id)
+                batch.append(pending)
+        later.extend(self._queue)
+        self._queue = later
+        return batch
+
+    async def _write(self, batch: List[_Pending]):
+        try:
+            written = await self.repository.save_hands([save for save, _, _ in batch])
+        except Exception:
+            if len(batch) == 1:
+                logger.exception("Error saving hand %s", batch[0][0].id)
+                self._stats["failures"] += 1
+                self._resolve(batch[0][1], False)
+            else:
+                logger.exception("Error writing a batch of %d hands; retrying them one by one", len(batch))
+                self._stats["batch_errors"] += 1
+                for pending in batch:
+                    await self._write([pending])
+            return
+
+        self._stats["batches"] += 1
+        self._stats["batched_saves"] += len(batch)
+        for (save, future, _), ok in zip(batch, written):
+            if ok:
+                self._resolve(future, True)
+            else:
+                self._stats["conflicts"] += 1
+                self._resolve(future, ConcurrentUpdateError(f"Hand {save.id} is no longer at version {save.expected_version}"))
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result):
+        # The caller may have been cancelled; the save is written regardless.
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._queue[0][2] + self.max_delay - time.monotonic()
+            if delay > 0 and len(self._queue) < self.max_batch and not self._closing:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._writing = self._take_batch()
+            await self._write(self._writing)
+            self._writing = []
+
+    def _writer_done(self, task: asyncio.Task):
+        if task is not self._task:
+            return
+        if task.cancelled():
+            logger.error("Hand writer was cancelled")
+        elif task.exception() is not None:
+            logger.error("Hand writer failed", exc_info=task.exception())
+        else:
+            return
+        # Nothing else resolves these futures; fail them rather than leave their callers waiting.
+        lost = self._writing + list(self._queue)
+        self._writing = []
+        self._queue.clear()
+        for _, future, _ in lost:
+            if not future.done():
+                self._stats["failures"] += 1
+                self._resolve(future, False)
+        self._task = None
+        if not self._closing:
+            self._stats["writer_restarts"] += 1
+            self.start()
+
+    def start(self):
+        """Start the background writer."""
+        if self.max_batch > 1 and self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._writer_done)
+
+    async def stop(self):
+        """Write every queued save, then stop the background writer."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        self._full.set()
+        task = self._task
+        try:
+            await task
+        except BaseException:
+            # Logged, and its saves failed, by _writer_done.
+            if not task.done():
+                raise
+        self._task = None
+
+    def stats(self) -> Dict:
+        """Queue size, batch and conflict counters."""
+        batches = self._stats["batches"]
+        return dict(
+            self._stats,
+            queued_saves=len(self._queue),
+            mean_batch_size=round(self._stats["batched_saves"] / batches, 2) if batches else 0.0,
+        )
@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable
+
+
+class _Entry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLocks:
+    """One asyncio lock per key, kept only while it is held or awaited.
+
+    Each entry counts the tasks holding or waiting for its lock and is
+    removed when the last one leaves, so the map never outgrows the keys in
+    use and an entry is never dropped from under a waiter (``Lock.locked()``
+    alone is False between a release and the next waiter resuming).
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, _Entry] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        """Hold the lock of ``key`` for the duration of the block."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._entries[key]
+
+    def in_use(self, key: Hashable) -> bool:
+        """Whether any task holds or waits for the lock of ``key``."""
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set
+from app.models.game import Hand
+from app.repositories.base import ConcurrentUpdateError
+from app.repositories.hand_repository import hand_header_signature
+from app.services.keyed_locks import KeyedLocks
+
+logger = logging.getLogger(__name__)
+
+
+class LiveHandStore:
+    """In-process store of in-progress hands over compare-and-swap writes.
+
+    The store holds the current copy of the hands it serves: actions mutate
+    the in-memory ``Hand`` and ``put`` persists it, appending only the
+    actions logged since the previous write and rewriting the header row
+    only when the round, cards or completion state changed. Completed hands
+    leave the store once persisted.
+
+    Writes are compare-and-swap on the hand version last persisted or
+    loaded (by ``get``, or ``record_loaded`` for hands loaded elsewhere);
+    only a new hand's first write is an unchecked insert. If another writer
+    (another worker or instance) changed the stored hand in between, the
+    save raises ConcurrentUpdateError and the stale copy is dropped, so the
+    next request reloads the stored state.
+    ``put`` returns only after that checked write, so a change is never
+    acknowledged and later lost to a conflict. A write that fails keeps the
+    hand dirty for the background task, run every ``flush_interval``
+    seconds, to retry; the task also drops hands idle for ``idle_ttl``.
+
+    With ``write_behind`` (and a ``flush_interval`` above 0), changes to
+    hands in progress are instead only marked dirty and persisted by the
+    next flush, trading up to ``flush_interval`` seconds of actions on a
+    crash for fewer writes. Those changes are acknowledged before any
+    version check, so write-behind is only safe when every request for a
+    hand reaches this one process; a conflicting flush drops them.
+
+    ``on_persisted(hand)``, a coroutine function, is awaited under the hand
+    lock after each successful write, and ``on_dropped(hand_id)`` is called
+    when a conflict drops a stale hand.
+    """
+
+    def __init__(
+        self,
+        repository,
+        flush_interval: float = 1.0,
+        idle_ttl: float = 900.0,
+        writer=None,
+        write_behind: bool = False,
+        on_persisted=None,
+        on_dropped=None
+    ):
+        self.repository = repository
+        # Saves go through ``writer`` (a HandWriter) when given.
+        self.writer = writer if writer is not None else repository
+        self.flush_interval = flush_interval
+        self.idle_ttl = idle_ttl
+        self.write_behind = write_behind
+        self.on_persisted = on_persisted
+        self.on_dropped = on_dropped
+        self._hands: Dict[str, Hand] = {}
+        self._locks = KeyedLocks()
+        self._last_access: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._persisted_actions: Dict[str, int] = {}
+        self._persisted_versions: Dict[str, int] = {}
+        self._header_signatures: Dict[str, tuple] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {"hits": 0, "loads": 0, "flushes": 0, "flush_errors": 0, "evictions": 0, "conflicts": 0}
+
+    def lock(self, hand_id: str):
+        """Per-hand lock serializing read-modify-write cycles (``async with``)."""
+        return self._locks.hold(hand_id)
+
+    async def get(self, hand_id: str) -> Optional[Hand]:
+        """Get a hand from memory, loading in-progress hands from the database."""
+        hand = self._hands.get(hand_id)
+        if hand is not None:
+            self._stats["hits"] += 1
+            self._last_access[hand_id] = time.monotonic()
+            return hand
+
+        hand = await self.repository.get_hand_by_id(hand_id)
+        self._stats["loads"] += 1
+        if hand is not None and hand_id not in self._hands:
+            # Completed hands are not held, but a change to one is still
+            # checked against the version loaded here.
+            self.record_loaded(hand)
+            if not hand.is_completed:
+                self._hands[hand_id] = hand
+        return self._hands.get(hand_id, hand)
+
+    def record_loaded(self, hand: Hand):
+        """Record the stored version of a hand loaded outside the store (a cached completed hand).
+
+        Its next ``put`` is then checked against that version.
+        """
+        if hand.id in self._hands:
+            return
+        # Idle eviction drops the record if the hand is never saved.
+        self._last_access[hand.id] = time.monotonic()
+        self._persisted_actions[hand.id] = len(hand.actions)
+        self._persisted_versions[hand.id] = hand.version
+
+    def peek(self, hand_id: str) -> Optional[Hand]:
+        """Get a hand only if it is held in memory."""
+        return self._hands.get(hand_id)
+
+    async def put(self, hand: Hand) -> bool:
+        """Record a changed hand and persist it (or, with write-behind, mark it dirty).
+
+        Must be called with ``lock(hand.id)`` held unless the hand is new.
+        Returns False if the write failed (it is retried by the next flush)
+        and raises ConcurrentUpdateError if the stored hand was changed by
+        another writer.
+        """
+        is_new = hand.id not in self._hands
+        if is_new and hand.version != 0 and hand.id not in self._persisted_versions:
+            # Without the version it was loaded at the write would be a blind upsert.
+            raise RuntimeError(f"Hand {hand.id} was not loaded through the store; its stored version is unknown")
+        self._hands[hand.id] = hand
+        self._last_access[hand.id] = time.monotonic()
+        self._dirty.add(hand.id)
+
+        if self.write_behind and self.flush_interval > 0 and not (is_new or hand.is_completed):
+            return True
+        return await self._flush_one(hand.id)
+
+    async def flush(self) -> int:
+        """Persist every dirty hand; returns the number of failed writes."""
+        # Hands are flushed concurrently so the writer can commit them together.
+        flushed = await asyncio.gather(*(self._flush_locked(hand_id) for hand_id in list(self._dirty)))
+        return flushed.count(False)
+
+    async def _flush_locked(self, hand_id: str) -> bool:
+        # Callers of put() already hold the hand lock; the background
+        # flush takes it so writes for one hand never interleave.
+        async with self.lock(hand_id):
+            try:
+                return hand_id not in self._dirty or await self._flush_one(hand_id)
+            except ConcurrentUpdateError:
+                logger.warning("Dropped stale live hand %s: changed by another writer", hand_id)
+                return False
+
+    async def _flush_one(self, hand_id: str) -> bool:
+        hand = self._hands.get(hand_id)
+        if hand is None:
+            self._dirty.discard(hand_id)
+            return True
+
+        self._dirty.discard(hand_id)
+        from_seq = self._persisted_actions.get(hand_id, 0)
+        signature = hand_header_signature(hand)
+        write_header = signature != self._header_signatures.get(hand_id)
+        action_count = len(hand.actions)
+        version = hand.version
+        try:
+            saved = await self.writer.save_hand(
+                hand,
+                from_seq=from_seq,
+                write_header=write_header,
+                expected_version=self._persisted_versions.get(hand_id)
+            )
+        except ConcurrentUpdateError:
+            self._stats["conflicts"] += 1
+            self._forget(hand_id)
+            if self.on_dropped is not None:
+                self.on_dropped(hand_id)
+            raise
+        if not saved:
+            self._dirty.add(hand_id)
+            self._stats["flush_errors"] += 1
+            return False
+
+        self._stats["flushes"] += 1
+        self._persisted_actions[hand_id] = action_count
+        self._persisted_versions[hand_id] = version
+        self._header_signatures[hand_id] = signature
+        if hand.is_completed and hand_id not in self._dirty:
+            self._forget(hand_id)
+        if self.on_persisted is not None:
+            await self.on_persisted(hand)
+        return True
+
+    def _forget(self, hand_id: str):
+        self._hands.pop(hand_id, None)
+        self._last_access.pop(hand_id, None)
+        self._persisted_actions.pop(hand_id, None)
+        self._persisted_versions.pop(hand_id, None)
+        self._header_signatures.pop(hand_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        for hand_id, last_access in list(self._last_access.items()):
+            # A hand whose lock is held or awaited is about to be used.
+            if last_access < cutoff and hand_id not in self._dirty and not self._locks.in_use(hand_id):
+                self._forget(hand_id)
+                self._stats["evictions"] += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self._evict_idle()
+            except Exception as e:
+                logger.exception("Error flushing live hands")
+
+    def start(self):
+        """Start the background task retrying failed writes and dropping idle hands."""
+        if self.flush_interval > 0 and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush everything still dirty."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        """Store size and hit/flush counters."""
+        return dict(self._stats, live_hands=len(self._hands), dirty_hands=len(self._dirty))
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional
+from app.models.game import Hand
+from app.models.phh import BIG_BLIND, bet_targets
+
+logger = logging.getLogger(__name__)
+
+# Hands waiting to be rolled up beyond this are dropped (oldest first); the
+# backfill picks them up again as they are missing from stats_processed_hands.
+MAX_PENDING_HANDS = 100_000
+
+
+class SeatStats(NamedTuple):
+    """One player's counters for one completed hand."""
+    hand_id: str
+    player_name: str
+    position: int
+    vpip: int
+    pfr: int
+    postflop_aggressive: int
+    postflop_calls: int
+    showdown: int
+    showdown_won: int
+    won: int
+    net_winnings: int
+
+
+def hand_stat_rows(hand: Hand) -> List[SeatStats]:
+    """Per-seat counters of a completed hand.
+
+    VPIP counts hands where the player put chips in preflop beyond the
+    blinds, PFR those where they bet or raised preflop (an all-in counts as
+    a raise when it exceeds the bet to call). Postflop bets and raises over
+    postflop calls give the aggression factor. Every non-folded player of a
+    hand that ends with two or more of them went to showdown.
+    """
+    ordered = sorted(hand.players, key=lambda p: p.position)
+    counters = {p.position: [0, 0, 0, 0] for p in ordered}  # vpip, pfr, aggressive, calls
+    for action, target, max_bet in bet_targets(hand):
+        seat = counters[action.player_position]
+        aggressive = target > max_bet
+        if action.round == "preflop":
+            seat[0] = 1
+            seat[1] |= aggressive
+        elif aggressive:
+            seat[2] += 1
+        else:
+            seat[3] += 1
+
+    showdown = sum(1 for p in ordered if not p.is_folded) > 1
+    rows = []
+    for p in ordered:
+        net = (hand.winnings or {}).get(p.position, 0)
+        at_showdown = int(showdown and not p.is_folded)
+        vpip, pfr, aggressive, calls = counters[p.position]
+        rows.append(SeatStats(
+            hand.id, p.name, p.position, vpip, int(pfr), aggressive, calls,
+            at_showdown, int(at_showdown and net > 0), int(net > 0), net,
+        ))
+    return rows
+
+
+def stats_summary(row: Dict) -> Dict:
+    """A rollup row with its rates: VPIP, PFR, aggression factor, showdown rates, bb/100."""
+    hands = row["hands"]
+    summary = dict(row)
+    summary.update(
+        vpip=round(row["vpip_hands"] / hands, 4) if hands else None,
+        pfr=round(row["pfr_hands"] / hands, 4) if hands else None,
+        aggression_factor=(
+            round(row["postflop_aggressive"] / row["postflop_calls"], 2) if row["postflop_calls"] else None
+        ),
+        went_to_showdown=round(row["showdowns"] / hands, 4) if hands else None,
+        won_at_showdown=round(row["showdowns_won"] / row["showdowns"], 4) if row["showdowns"] else None,
+        bb_per_100=round(row["net_winnings"] / BIG_BLIND / hands * 100, 2) if hands else None,
+    )
+    return summary
+
+
+class StatsRecorder:
+    """Rolls completed hands up into the per-player, per-seat stats tables.
+
+    Completed hands are queued as their counters and written by a background
+    task every ``flush_interval`` seconds, one multi-row upsert per flush, so
+    finishing a hand never waits on the rollup. Each hand id is claimed in
+    stats_processed_hands in the same statement, which makes recording a
+    hand twice (or racing the backfill) harmless. A ``flush_interval`` of 0
+    writes every hand as it completes.
+    """
+
+    def __init__(self, repository, flush_interval: float = 1.0, max_pending: int = MAX_PENDING_HANDS):
+        self.repository = repository
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, List[SeatStats]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {"recorded": 0, "flushes": 0, "flush_errors": 0, "dropped": 0}
+
+    async def record(self, hand: Hand):
+        """Queue a completed hand for the rollups."""
+        self._pending[hand.id] = hand_stat_rows(hand)
+        while len(self._pending) > self.max_pending:
+            del self._pending[next(iter(self._pending))]
+            self._stats["dropped"] += 1
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Write every queued hand; on failure they stay queued for the next flush."""
+        if not self._pending:
+            return True
+        batch = self._pending
+        self._pending = {}
+        try:
+            await self.repository.record_hands([row for rows in batch.values() for row in rows])
+        except Exception:
+            logger.exception("Error recording stats for %d hands", len(batch))
+            self._stats["flush_errors"] += 1
+            self._pending = {**batch, **self._pending}
+            return False
+        self._stats["flushes"] += 1
+        self._stats["recorded"] += len(batch)
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start the background flush task."""
+        if self.flush_interval > 0 and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write what is still queued."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> Dict:
+        """Queue size and flush counters."""
+        return dict(self._stats, pending_hands=len(self._pending))
@@ -1,28 +1,220 @@
-from typing import List, Dict, Tuple
+import copy
+import logging
+import time
+from typing import List, Dict, Tuple, Optional
 from pokerkit import Automation, NoLimitTexasHoldem
+from app.metrics import ENGINE_ERRORS, HAND_EVALUATION_DURATION
 from app.models.game import Hand, Player, GameAction
 
+logger = logging.getLogger(__name__)
+
+
+def deal_pending_board(state, board_cards: str, dealt: int) -> int:
+    """Deal known board cards for every street the state is waiting on.
+
+    ``dealt`` is how many characters of ``board_cards`` are already on the
+    board; returns the new count. pokerkit, not the table's round label,
+    decides when a street starts, so both stay consistent even when the
+    table advances rounds early.
+    """
+    while state.can_burn_card() or state.can_deal_board():
+        chunk = 6 if dealt == 0 else 2
+        if len(board_cards) < dealt + chunk:
+            break
+        if state.can_burn_card():
+            state.burn_card('??')
+        state.deal_board(board_cards[dealt:dealt + chunk])
+        dealt += chunk
+    return dealt
+
+
+def engine_order(hand: Hand) -> List[Player]:
+    """Players in pokerkit seat order: small blind first, dealer last."""
+    ordered = sorted(hand.players, key=lambda p: p.position)
+    sb_index = next((i for i, p in enumerate(ordered) if p.is_small_blind), 0)
+    return ordered[sb_index:] + ordered[:sb_index]
+
+
+class HandSession:
+    """Live pokerkit state for one hand, advanced one action at a time.
+
+    The session mirrors the hand's action list; ``applied`` counts how many
+    actions it has consumed. If pokerkit rejects an action (for instance an
+    out-of-turn action the free-form table allowed), the session is marked
+    out of sync and callers fall back to ``PokerEngine``'s stateless paths.
+    """
+
+    def __init__(self, hand: Hand, state, order: List[Player]):
+        self.hand_id = hand.id
+        self.state = state
+        self.index_by_position = {p.position: i for i, p in enumerate(order)}
+        self.starting_stacks = [p.stack + p.total_invested for p in order]
+        self.hole_cards = tuple(p.hole_cards for p in order)
+        self.applied = 0
+        self.board_dealt = 0
+        self.in_sync = True
+        self.error: Optional[str] = None
+
+    def matches(self, hand: Hand) -> bool:
+        """Whether the session reflects exactly the hand's dealt cards and actions."""
+        return (
+            self.applied == len(hand.actions)
+            and self.hole_cards == tuple(p.hole_cards for p in engine_order(hand))
+        )
+
+    def sync_board(self, hand: Hand):
+        """Deal any known board cards the live state is waiting for."""
+        if not self.in_sync:
+            return
+        try:
+            self.board_dealt = deal_pending_board(self.state, hand.board_cards, self.board_dealt)
+        except Exception as e:
+            self._desync(f"board: {e}")
+
+    def apply(self, hand: Hand, action: GameAction):
+        """Apply the next action of the hand to the live state."""
+        self.applied += 1
+        if not self.in_sync:
+            return
+        try:
+            self.board_dealt = deal_pending_board(self.state, hand.board_cards, self.board_dealt)
+            if self.state.actor_index != self.index_by_position[action.player_position]:
+                raise ValueError(f"player {action.player_position} acted out of turn")
+            if action.action_type == "fold":
+                self.state.fold()
+            elif action.action_type in ("check", "call"):
+                self.state.check_or_call()
+            elif action.action_type in ("bet", "raise"):
+                self.state.complete_bet_or_raise_to(action.amount)
+            elif action.action_type == "allin":
+                if self.state.can_complete_bet_or_raise_to():
+                    self.state.complete_bet_or_raise_to(
+                        self.state.max_completion_betting_or_raising_to_amount
+                    )
+                else:
+                    self.state.check_or_call()
+        except Exception as e:
+            self._desync(f"{action}: {e}")
+
+    def _desync(self, error: str):
+        self.in_sync = False
+        self.error = error
+        ENGINE_ERRORS.labels("replay").inc()
+        logger.debug("Session for hand %s out of sync: %s", self.hand_id, error)
+
+    def is_actor(self, player_position: int) -> bool:
+        """Whether the live state is waiting on this player."""
+        return self.in_sync and self.state.actor_index == self.index_by_position.get(player_position)
+
+    def actor_position(self) -> Optional[int]:
+        """Table position of the player the live state is waiting on."""
+        if not self.in_sync or self.state.actor_index is None:
+            return None
+        return next(
+            position for position, index in self.index_by_position.items()
+            if index == self.state.actor_index
+        )
+
+    def betting_round_complete(self) -> Optional[bool]:
+        """Whether betting on the current street is closed; None when out of sync."""
+        if not self.in_sync:
+            return None
+        return self.state.actor_index is None
+
+    def is_finished(self) -> bool:
+        """Whether the live state has reached the end of the hand."""
+        return self.in_sync and not self.state.status
+
+    def call_amount(self) -> int:
+        """Chips the current actor needs to call."""
+        return self.state.checking_or_calling_amount or 0
+
+    def min_raise_to(self) -> Optional[int]:
+        """Smallest legal bet/raise-to amount for the current actor."""
+        return self.state.min_completion_betting_or_raising_to_amount
+
+    def max_raise_to(self) -> Optional[int]:
+        """Largest legal bet/raise-to amount (all-in) for the current actor."""
+        return self.state.max_completion_betting_or_raising_to_amount
+
+    def is_valid(self, action_type: str, amount: int = 0) -> bool:
+        """Legality of an action for the current actor, read from the live state."""
+        can_check_or_call = self.state.can_check_or_call()
+        to_call = self.call_amount() if can_check_or_call else 0
+        facing_bet = max(self.state.bets, default=0) > 0
+        if action_type == "fold":
+            return True
+        if action_type == "check":
+            return can_check_or_call and to_call == 0
+        if action_type == "call":
+            return can_check_or_call and to_call > 0
+        if action_type == "bet":
+            return not facing_bet and self.state.can_complete_bet_or_raise_to(amount)
+        if action_type == "raise":
+            return facing_bet and self.state.can_complete_bet_or_raise_to(amount)
+        if action_type == "allin":
+            return self.state.stacks[self.state.actor_index] > 0
+        return False
+
+    def valid_actions(self) -> List[str]:
+        """Valid actions for the current actor."""
+        valid_actions = ["fold"]
+        if self.is_valid("check"):
+            valid_actions.append("check")
+        if self.is_valid("call"):
+            valid_actions.append("call")
+        min_raise = self.min_raise_to()
+        if min_raise is not None:
+            if self.is_valid("bet", min_raise):
+                valid_actions.append("bet")
+            if self.is_valid("raise", min_raise):
+                valid_actions.append("raise")
+        if self.is_valid("allin"):
+            valid_actions.append("allin")
+        return valid_actions
+
+    def snapshot(self) -> "HandSession":
+        """Independent copy of the session that can later be restored."""
+        return copy.deepcopy(self)
+
+    def restore(self, snapshot: "HandSession"):
+        """Reset this session to a previously taken snapshot."""
+        self.__dict__.update(copy.deepcopy(snapshot).__dict__)
+
+    def settle(self, hand: Hand) -> Optional[Dict[int, int]]:
+        """Winnings by position read from the finished state, or None if unavailable.
+
+        None as well for a showdown with a contender whose hole cards are not
+        known, which pokerkit awards to nobody, and whenever the winnings do
+        not sum to zero; the caller then settles the hand itself.
+        """
+        if not self.in_sync or self.applied != len(hand.actions):
+            return None
+        contenders = [p for p in hand.players if not p.is_folded]
+        if len(contenders) > 1 and any(not p.hole_cards for p in contenders):
+            return None
+        try:
+            self.board_dealt = deal_pending_board(self.state, hand.board_cards, self.board_dealt)
+        except Exception as e:
+            self._desync(f"board: {e}")
+            return None
+        if self.state.status:
+            return None
+        winnings = {
+            position: self.state.stacks[index] - self.starting_stacks[index]
+            for position, index in self.index_by_position.items()
+        }
+        return winnings if sum(winnings.values()) == 0 else None
+
+
 class PokerEngine:
     """Poker engine using pokerkit for hand evaluation and game logic."""
-    
+
     def __init__(self):
         pass
-    
-    def evaluate_hand(self, hand: Hand) -> Dict[int, int]:
-        """
-        Evaluate a completed hand and return winnings for each player.
-        Returns dict mapping player position to amount won/lost.
-        """
-        if not hand.is_completed:
-            raise ValueError("Hand must be completed to evaluate")
-        
-        starting_stacks = []
-        player_positions = []
-        
-        for player in sorted(hand.players, key=lambda p: p.position):
-            starting_stacks.append(player.stack + player.total_invested)
-            player_positions.append(player.position)
-        
+
+    def _create_state(self, hand: Hand, order: List[Player]):
+        """Create a pokerkit state for the hand with hole cards dealt."""
         state = NoLimitTexasHoldem.create_state(
             automations=(
                 Automation.ANTE_POSTING,
@@ -32,34 +224,63 @@ class PokerEngine:
                 Automation.HAND_KILLING,
                 Automation.CHIPS_PUSHING,
                 Automation.CHIPS_PULLING,
+                Automation.RUNOUT_COUNT_SELECTION,
             ),
-            uniform_antes=False,
-            antes=0,
-            blinds_or_straddles=(20, 40),  # SB=20, BB=40
+            ante_trimming_status=False,
+            raw_antes=0,
+            raw_blinds_or_straddles=(20, 40),  # SB=20, BB=40
             min_bet=40,
-            starting_stacks=tuple(starting_stacks),
-            number_of_players=len(hand.players)
+            raw_starting_stacks=tuple(p.stack + p.total_invested for p in order),
+            player_count=len(hand.players)
         )
-        
-        for player in sorted(hand.players, key=lambda p: p.position):
+
+        for player in order:
             if player.hole_cards and not player.is_folded:
                 state.deal_hole(player.hole_cards)
             else:
                 state.deal_hole('????')  # Unknown/folded cards
-        
-        current_round = "preflop"
+
+        return state
+
+    def create_session(self, hand: Hand) -> HandSession:
+        """Create a live session for the hand, replaying any actions already taken."""
+        order = engine_order(hand)
+        try:
+            state = self._create_state(hand, order)
+        except Exception as e:
+            session = HandSession(hand, None, order)
+            session._desync(f"setup: {e}")
+            return session
+        session = HandSession(hand, state, order)
+        for action in hand.actions:
+            session.apply(hand, action)
+        return session
+
+    def evaluate_hand(self, hand: Hand) -> Dict[int, int]:
+        """
+        Evaluate a completed hand and return winnings for each player.
+        Returns dict mapping player position to amount won/lost.
+        """
+        if not hand.is_completed:
+            raise ValueError("Hand must be completed to evaluate")
+
+        started = time.perf_counter()
+        try:
+            return self._evaluate_hand(hand)
+        finally:
+            HAND_EVALUATION_DURATION.observe(time.perf_counter() - started)
+
+    def _evaluate_hand(self, hand: Hand) -> Dict[int, int]:
+        order = engine_order(hand)
+        state = self._create_state(hand, order)
+
+        board_dealt = 0
         for action in hand.actions:
-            if action.round != current_round:
-                if action.round == "flop" and len(hand.board_cards) >= 6:
-                    state.burn_card()
-                    state.deal_board(hand.board_cards[:6])  # First 3 cards
-                elif action.round == "turn" and len(hand.board_cards) >= 8:
-                    state.burn_card()
-                    state.deal_board(hand.board_cards[6:8])  # 4th card
-                elif action.round == "river" and len(hand.board_cards) >= 10:
-                    state.burn_card()
-                    state.deal_board(hand.board_cards[8:10])  # 5th card
-                current_round = action.round
+            try:
+                board_dealt = deal_pending_board(state, hand.board_cards, board_dealt)
+            except Exception as e:
+                ENGINE_ERRORS.labels("evaluate").inc()
+                logger.warning("Hand %s: error dealing board for %s: %s", hand.id, action, e)
             
             try:
                 if action.action_type == "fold":
@@ -73,30 +294,50 @@ class PokerEngine:
                 elif action.action_type == "raise":
                     state.complete_bet_or_raise_to(action.amount)
                 elif action.action_type == "allin":
-                    player = next(p for p in hand.players if p.position == action.player_position)
-                    state.complete_bet_or_raise_to(player.stack + player.total_invested)
+                    if state.can_complete_bet_or_raise_to():
+                        state.complete_bet_or_raise_to(state.max_completion_betting_or_raising_to_amount)
+                    else:
+                        state.check_or_call()
             except Exception as e:
-                print(f"Error executing action {action}: {e}")
+                ENGINE_ERRORS.labels("evaluate").inc()
+                logger.warning("Hand %s: error executing action %s: %s", hand.id, action, e)
                 continue
-        
+
+        try:
+            deal_pending_board(state, hand.board_cards, board_dealt)
+        except Exception as e:
+            ENGINE_ERRORS.labels("evaluate").inc()
+            logger.warning("Hand %s: error dealing remaining board: %s", hand.id, e)
+
         final_stacks = state.stacks
         winnings = {}
-        
-        for i, player in enumerate(sorted(hand.players, key=lambda p: p.position)):
+
+        for i, player in enumerate(order):
             original_stack = player.stack + player.total_invested
             final_stack = final_stacks[i] if i < len(final_stacks) else 0
             winnings[player.position] = final_stack - original_stack
-        
+
         return winnings
-    
-    def validate_action(self, hand: Hand, player_position: int, action_type: str, amount: int = 0) -> bool:
+
+    def validate_action(
+        self,
+        hand: Hand,
+        player_position: int,
+        action_type: str,
+        amount: int = 0,
+        session: Optional[HandSession] = None
+    ) -> bool:
         """
         Validate if an action is legal in the current game state.
+        Answered from the live session when it is waiting on this player.
         """
         player = next((p for p in hand.players if p.position == player_position), None)
         if not player or player.is_folded:
             return False
-        
+
+        if session is not None and session.is_actor(player_position):
+            return session.is_valid(action_type, amount)
+
         if action_type == "fold":
             return True
         elif action_type == "check":
@@ -111,13 +352,22 @@ class PokerEngine:
             return amount > max_bet and amount >= max_bet + 40
         elif action_type == "allin":
             return player.stack > 0
-        
+
         return False
-    
-    def get_valid_actions(self, hand: Hand, player_position: int) -> List[str]:
+
+    def get_valid_actions(
+        self,
+        hand: Hand,
+        player_position: int,
+        session: Optional[HandSession] = None
+    ) -> List[str]:
         """Get list of valid actions for a player in current state."""
+        player = next((p for p in hand.players if p.position == player_position), None)
+        if player and not player.is_folded and session is not None and session.is_actor(player_position):
+            return session.valid_actions()
+
         valid_actions = []
-        
+
         if self.validate_action(hand, player_position, "fold"):
             valid_actions.append("fold")
         if self.validate_action(hand, player_position, "check"):
@@ -130,5 +380,5 @@ class PokerEngine:
             valid_actions.append("raise")
         if self.validate_action(hand, player_position, "allin"):
             valid_actions.append("allin")
-        
+
         return valid_actions
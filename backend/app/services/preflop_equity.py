@@ -0,0 +1,310 @@
+"""Precomputed preflop all-in equities for the 169 starting-hand classes.
+
+Two hole cards fall into one of 169 classes: 13 pairs, 78 suited and 78
+offsuit rank combinations, laid out on the usual 13x13 grid (pairs on the
+diagonal, suited hands above it, offsuit below, aces first). The table is a
+``(169, 169 + MAX_OPPONENTS, 3)`` float32 array memory-mapped from
+``PREFLOP_EQUITY_TABLE_PATH``; for a class row:
+
+* column ``c < 169`` is the heads-up all-in against class ``c``, averaged
+  over every non-conflicting suit combination of the two classes;
+* column ``169 + k - 1`` is the all-in against ``k`` random hands.
+
+and the last axis holds the equity (expected pot share), the outright win
+and the split probabilities. The table takes minutes to sample, so it is
+built offline rather than on first use::
+
+    python -m app.services.preflop_equity --samples 20000
+
+after which a heads-up lookup is a dictionary hit plus an array read::
+
+    table = get_preflop_table()
+    table.heads_up("AhKh", "QdQc")            # (equity, win, tie)
+    table.hand_ev(hand)                        # chip EV of a preflop all-in
+"""
+import argparse
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.models.cards import CARD_STRINGS, RANKS, parse_cards
+from app.models.game import Hand
+from app.services.equity_service import _sample_chunk, _showdown_shares
+from app.services.hand_evaluator import get_evaluator
+
+CLASS_COUNT = 169
+
+# Most opponents a six-seat hand can have.
+MAX_OPPONENTS = 5
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "preflop_equity.npy")
+
+TABLE_SHAPE = (CLASS_COUNT, CLASS_COUNT + MAX_OPPONENTS, 3)
+
+
+def _class_of_codes(first: int, second: int) -> int:
+    high, low = sorted((12 - first // 4, 12 - second // 4))
+    if high == low:
+        return high * 13 + high
+    if first % 4 == second % 4:
+        return high * 13 + low
+    return low * 13 + high
+
+
+# Class of every ordered pair of distinct card codes, by first * 52 + second.
+CLASS_BY_CODES = np.full(52 * 52, -1, dtype=np.int16)
+_CLASS_BY_HOLE: Dict[str, int] = {}
+_COMBOS: List[List[Tuple[int, int]]] = [[] for _ in range(CLASS_COUNT)]
+for _first in range(52):
+    for _second in range(52):
+        if _first != _second:
+            _class = _class_of_codes(_first, _second)
+            CLASS_BY_CODES[_first * 52 + _second] = _class
+            _CLASS_BY_HOLE[CARD_STRINGS[_first] + CARD_STRINGS[_second]] = _class
+            if _first < _second:
+                _COMBOS[_class].append((_first, _second))
+
+CLASS_NAMES = []
+for _row in range(13):
+    for _col in range(13):
+        _high, _low = RANKS[12 - min(_row, _col)], RANKS[12 - max(_row, _col)]
+        CLASS_NAMES.append(_high + _low + ("" if _row == _col else "s" if _row < _col else "o"))
+
+
+def hand_class(hole_cards: str) -> int:
+    """Class index (0-168) of a two-card string such as 'AhKs'."""
+    index = _CLASS_BY_HOLE.get(hole_cards)
+    if index is not None:
+        return index
+    cards = parse_cards(hole_cards)
+    if len(cards) != 2 or cards[0] == cards[1]:
+        raise ValueError(f"Expected two distinct hole cards, got {hole_cards!r}")
+    return int(CLASS_BY_CODES[cards[0] * 52 + cards[1]])
+
+
+def class_combos(index: int) -> List[Tuple[int, int]]:
+    """Card-code pairs of every suit combination in a class (6, 4 or 12)."""
+    return list(_COMBOS[index])
+
+
+def _deal_rest(rng: np.random.Generator, used: np.ndarray, count: int) -> np.ndarray:
+    """``count`` random cards per row of ``used`` (N, k), avoiding those cards."""
+    keys = rng.random((len(used), 52))
+    np.put_along_axis(keys, used.astype(np.intp), 2.0, axis=1)
+    return np.argsort(keys, axis=1)[:, :count].astype(np.int16)
+
+
+def _sample_row(args) -> np.ndarray:
+    """One class's row: heads-up against every later class, then the field buckets."""
+    index, samples, seed = args
+    evaluator = get_evaluator()
+    rng = np.random.default_rng(seed)
+    row = np.zeros(TABLE_SHAPE[1:], dtype=np.float32)
+    combos = np.array(_COMBOS[index], dtype=np.int16)
+
+    for other in range(index, CLASS_COUNT):
+        # Every non-conflicting pair of suit combinations, dealt equally often.
+        pairs = np.array([
+            a + b for a in _COMBOS[index] for b in _COMBOS[other] if not set(a) & set(b)
+        ], dtype=np.int16)
+        holes = pairs[np.arange(samples) % len(pairs)]
+        boards = _deal_rest(rng, holes, 5)
+        share, _, counts = _showdown_shares(evaluator, holes.reshape(samples, 2, 2), boards)
+        row[other] = share[0] / samples, counts[0, 0] / samples, counts[1, 0] / samples
+
+    for opponents in range(1, MAX_OPPONENTS + 1):
+        hero = combos[np.arange(samples) % len(combos)]
+        rest = _deal_rest(rng, hero, 2 * opponents + 5)
+        holes = np.concatenate([hero, rest[:, :2 * opponents]], axis=1).reshape(samples, opponents + 1, 2)
+        share, _, counts = _showdown_shares(evaluator, holes, rest[:, 2 * opponents:])
+        row[CLASS_COUNT + opponents - 1] = share[0] / samples, counts[0, 0] / samples, counts[1, 0] / samples
+    return row
+
+
+def build_table(samples: int = 20_000, seed: int = 0, workers: int = 1) -> np.ndarray:
+    """Sample the full table; ``samples`` runouts per matchup and per field size.
+
+    Rows are sampled independently from seeds spawned off ``seed``, so the
+    result does not depend on ``workers``. Only the upper triangle of the
+    heads-up matrix is sampled; the rest follows from the first.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(CLASS_COUNT)
+    jobs = [(index, samples, seeds[index]) for index in range(CLASS_COUNT)]
+    if workers <= 1:
+        rows = [_sample_row(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(_sample_row, jobs))
+
+    table = np.stack(rows)
+    upper = np.triu_indices(CLASS_COUNT, 1)
+    equity, win, tie = (table[:, :CLASS_COUNT, i][upper] for i in range(3))
+    heads_up = table[:, :CLASS_COUNT]
+    heads_up[upper[1], upper[0]] = np.stack([1 - equity, 1 - win - tie, tie], axis=1)
+    # A class against itself is a coin flip, whatever the sample says.
+    diagonal = np.arange(CLASS_COUNT)
+    ties = heads_up[diagonal, diagonal, 2]
+    heads_up[diagonal, diagonal] = np.stack([np.full(CLASS_COUNT, 0.5), (1 - ties) / 2, ties], axis=1)
+    return table.astype(np.float32)
+
+
+def side_pots(hand: Hand) -> List[Tuple[int, List[int]]]:
+    """The hand's pots as (amount, contender positions), main pot first.
+
+    Investments are cut at every level as in ``settlement.pot_payouts``;
+    chips above what any contender put in join the pot below them.
+    """
+    invested = {p.position: p.total_invested for p in hand.players}
+    contenders = {p.position for p in hand.players if not p.is_folded}
+    pots: List[Tuple[int, List[int]]] = []
+    previous = 0
+    for level in sorted({amount for amount in invested.values() if amount > 0}):
+        amount = (level - previous) * sum(1 for value in invested.values() if value >= level)
+        eligible = sorted(position for position in contenders if invested[position] >= level)
+        if pots and (not eligible or eligible == pots[-1][1]):
+            pots[-1] = (pots[-1][0] + amount, pots[-1][1])
+        else:
+            pots.append((amount, eligible))
+        previous = level
+    return pots
+
+
+class PreflopEquityTable:
+    """Lookups in the precomputed preflop equity table (see module docs)."""
+
+    def __init__(self, table_path: Optional[str] = None):
+        self.table_path = table_path or os.getenv("PREFLOP_EQUITY_TABLE_PATH", DEFAULT_TABLE_PATH)
+        if not os.path.exists(self.table_path):
+            raise FileNotFoundError(
+                f"No preflop equity table at {self.table_path}; "
+                "build it with: python -m app.services.preflop_equity"
+            )
+        self.table = np.load(self.table_path, mmap_mode="r")
+        if self.table.shape != TABLE_SHAPE or self.table.dtype != np.float32:
+            raise ValueError(f"Corrupt preflop equity table at {self.table_path}")
+
+    def heads_up(self, hole_cards: str, other_hole_cards: str) -> Tuple[float, float, float]:
+        """(equity, win, tie) of ``hole_cards`` all in against ``other_hole_cards``."""
+        equity, win, tie = self.table[hand_class(hole_cards), hand_class(other_hole_cards)]
+        return float(equity), float(win), float(tie)
+
+    def versus_field(self, hole_cards: str, opponents: int) -> Tuple[float, float, float]:
+        """(equity, win, tie) of ``hole_cards`` all in against ``opponents`` random hands."""
+        if not 1 <= opponents <= MAX_OPPONENTS:
+            raise ValueError(f"Opponents must be between 1 and {MAX_OPPONENTS}")
+        equity, win, tie = self.table[hand_class(hole_cards), CLASS_COUNT + opponents - 1]
+        return float(equity), float(win), float(tie)
+
+    def pot_equities(self, holes: Dict[int, str], samples: int = 5_000, seed: int = 0) -> Dict[int, float]:
+        """Share of a pot expected by each of its contenders, by position.
+
+        Two contenders read the heads-up matrix. Pairwise and field
+        equities do not combine into a usable estimate for three or more
+        hands, so those pots are sampled on the actual cards instead.
+        """
+        positions = list(holes)
+        if len(positions) == 1:
+            return {positions[0]: 1.0}
+        if len(positions) == 2:
+            first, second = positions
+            equity = float(self.table[hand_class(holes[first]), hand_class(holes[second]), 0])
+            return {first: equity, second: 1.0 - equity}
+        cards = np.array([parse_cards(holes[position]) for position in positions], dtype=np.int16)
+        deck = [card for card in range(52) if card not in set(cards.ravel().tolist())]
+        share, _, _, done = _sample_chunk((cards, [], np.zeros(0, dtype=np.int16), deck, seed, samples, None, True))
+        return {position: float(share[i] / done) for i, position in enumerate(positions)}
+
+    def hand_ev(self, hand: Hand) -> Dict:
+        """Equity and chip EV of every player if the hand is all in before the flop.
+
+        Equity is each contender's share of a showdown between all of them.
+        Each pot is shared by ``pot_equities`` (sampling is seeded from the
+        hand id); a player's EV is the chips they expect to collect less what
+        they put in, so EVs sum to zero. Raises ValueError if board cards are
+        out or a contender's hole cards are not known.
+        """
+        started = time.perf_counter()
+        if hand.board_cards:
+            raise ValueError("Preflop EV needs a hand with no board cards")
+        classes = {}
+        holes = {}
+        dealt = set()
+        for player in hand.players:
+            if player.is_folded:
+                continue
+            if not player.hole_cards or "?" in player.hole_cards:
+                raise ValueError(f"Player {player.position} has no known hole cards")
+            classes[player.position] = hand_class(player.hole_cards)
+            holes[player.position] = player.hole_cards
+            dealt.update(player.hole_cards[i:i + 2].lower() for i in (0, 2))
+        if len(dealt) != 2 * len(classes):
+            raise ValueError("Duplicate cards between hole cards")
+
+        seed = zlib.crc32(hand.id.encode())
+        equities = None
+        expected = {position: 0.0 for position in classes}
+        for amount, eligible in side_pots(hand):
+            shares = self.pot_equities({position: holes[position] for position in eligible}, seed=seed)
+            for position, share in shares.items():
+                expected[position] += share * amount
+            if len(eligible) == len(classes):
+                equities = shares
+        if equities is None:
+            # No pot is contested by everyone yet, e.g. before the blinds are called.
+            equities = self.pot_equities(holes, seed=seed) if holes else {}
+
+        players = []
+        for player in sorted(hand.players, key=lambda p: p.position):
+            index = classes.get(player.position)
+            players.append({
+                "position": player.position,
+                "hole_cards": player.hole_cards,
+                "hand_class": CLASS_NAMES[index] if index is not None else None,
+                "equity": round(equities.get(player.position, 0.0), 6),
+                "ev": round(expected.get(player.position, 0.0) - player.total_invested, 2),
+            })
+        return {
+            "hand_id": hand.id,
+            "method": "preflop_multiway" if len(classes) > 2 else "preflop_heads_up",
+            "pot": sum(p.total_invested for p in hand.players),
+            "players": players,
+            "elapsed_us": round((time.perf_counter() - started) * 1e6, 1),
+        }
+
+
+_table: Optional[PreflopEquityTable] = None
+_table_lock = threading.Lock()
+
+
+def get_preflop_table() -> PreflopEquityTable:
+    """Process-wide table; raises FileNotFoundError until it has been built."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = PreflopEquityTable()
+        return _table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the preflop all-in equity table.")
+    parser.add_argument("--samples", type=int, default=20_000, help="runouts per matchup and per field size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--show", nargs=2, metavar="HOLE_CARDS", help="print a heads-up lookup, e.g. AhKh QdQc")
+    args = parser.parse_args()
+
+    path = os.getenv("PREFLOP_EQUITY_TABLE_PATH", DEFAULT_TABLE_PATH)
+    if args.show:
+        equity, win, tie = PreflopEquityTable(path).heads_up(*args.show)
+        print(f"{args.show[0]} vs {args.show[1]}: equity {equity:.4f}, win {win:.4f}, tie {tie:.4f}")
+    else:
+        started = time.perf_counter()
+        table = build_table(args.samples, args.seed, args.workers)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, table)
+        os.replace(tmp_path, path)
+        print(f"Preflop equity table written to {path} in {time.perf_counter() - started:.1f}s")
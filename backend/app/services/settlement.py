@@ -0,0 +1,185 @@
+"""Pot and side-pot settlement of completed hands.
+
+Chips each player put in (``total_invested``) are cut into pots at every
+distinct investment level: a slice is paid for by every player who reached
+it and can be won by the non-folded ones among them. Consecutive slices
+with the same contenders form one pot, as in pokerkit (which first mucks
+the hands that win nothing), so odd chips are counted per pot. A pot goes
+to its contenders with the best showdown rank, split evenly; the odd chips
+go to the first winner left of the button. Chips nobody else matched come
+back as a pot with a single contender.
+
+All hands of a batch are settled together: every contender's seven cards go
+through one ``HandEvaluator.evaluate`` call and the pots of all hands are
+built and paid out with array operations, so settling stored hands costs
+about as much as ranking their showdowns::
+
+    winnings = settle_hand(hand)                  # {position: net chips}
+    results = settle_hands(hands)                 # one per hand, None if unsettleable
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from app.models.cards import parse_cards
+from app.models.game import Hand
+from app.services.hand_evaluator import HandEvaluator, get_evaluator
+from app.services.poker_engine import PokerEngine, engine_order
+
+
+def _showdown_cards(hole_cards: Optional[str], board: List[int]) -> Optional[List[int]]:
+    """Seven card codes for a contender, or None if they are not all known."""
+    if not hole_cards or len(board) != 5:
+        return None
+    try:
+        hole = parse_cards(hole_cards)
+    except ValueError:
+        return None
+    return hole + board if len(hole) == 2 else None
+
+
+def showdown_cards_known(hand: Hand) -> bool:
+    """Whether every contender's hole cards and the full board are known.
+
+    True when fewer than two players are left, as nothing is contested.
+    """
+    contenders = [player for player in hand.players if not player.is_folded]
+    if len(contenders) < 2:
+        return True
+    try:
+        board = parse_cards(hand.board_cards)
+    except ValueError:
+        return False
+    return all(_showdown_cards(player.hole_cards, board) is not None for player in contenders)
+
+
+def pot_payouts(
+    invested: np.ndarray,
+    active: np.ndarray,
+    ranks: np.ndarray
+) -> np.ndarray:
+    """Chips each seat collects, for (hands, seats) arrays in engine seat order.
+
+    ``invested`` holds each seat's total investment, ``active`` whether the
+    seat is still in the hand and ``ranks`` its showdown rank (higher wins;
+    equal ranks split). Seats are ordered from the small blind, so the first
+    seat of a tie is the first left of the button. Unused seats have
+    ``invested`` 0 and ``active`` False.
+    """
+    hands, seats = invested.shape
+    levels = np.sort(invested, axis=1)
+    deltas = np.diff(levels, axis=1, prepend=0)
+    # reaches[h, k, s]: seat s put in at least investment level k.
+    reaches = invested[:, None, :] >= levels[:, :, None]
+    amounts = deltas * reaches.sum(axis=2)
+    contenders = reaches & active[:, None, :]
+
+    # As pokerkit kills hands that win nothing before forming the pots, only
+    # players who win some slice tell one pot from the next.
+    best = np.where(contenders, ranks[:, None, :], -1).max(axis=2)
+    wins = contenders & (ranks[:, None, :] == best[:, :, None]) & (amounts > 0)[:, :, None]
+    contenders &= wins.any(axis=1)[:, None, :]
+
+    # Slices with the same contenders (or none left) join the previous pot.
+    masks = (contenders * (np.int64(1) << np.arange(seats, dtype=np.int64))).sum(axis=2)
+    starts = np.ones((hands, seats), dtype=bool)
+    starts[:, 1:] = (masks[:, 1:] != masks[:, :-1]) & (masks[:, 1:] != 0)
+    pot_ids = np.cumsum(starts, axis=1) - 1 + np.arange(hands)[:, None] * seats
+    pot_amounts = np.zeros(hands * seats, dtype=np.int64)
+    np.add.at(pot_amounts, pot_ids.ravel(), amounts.ravel())
+
+    best = np.where(contenders, ranks[:, None, :], -1).max(axis=2)
+    winners = (contenders & (ranks[:, None, :] == best[:, :, None]))[starts]
+    pot_hands = np.nonzero(starts)[0]
+    totals = pot_amounts[pot_ids[starts]]
+    counts = np.maximum(winners.sum(axis=1), 1)
+    shares, odd_chips = np.divmod(totals, counts)
+
+    payouts = np.zeros((hands, seats), dtype=np.int64)
+    np.add.at(payouts, pot_hands, winners * shares[:, None])
+    np.add.at(payouts, (pot_hands, winners.argmax(axis=1)), odd_chips * winners.any(axis=1))
+    return payouts
+
+
+def settle_hands(
+    hands: Sequence[Hand],
+    evaluator: Optional[HandEvaluator] = None,
+    split_unknown: bool = False
+) -> List[Optional[Dict[int, int]]]:
+    """Net winnings by position for each completed hand, settled as one batch.
+
+    A hand where two or more players contest a pot without all their hole
+    cards and the full board known gets None, unless ``split_unknown`` is
+    set: then every contender of such a hand ranks the same, so each of its
+    pots is split evenly among the players eligible for it.
+    """
+    if not hands:
+        return []
+    seats = max(len(hand.players) for hand in hands)
+    invested = np.zeros((len(hands), seats), dtype=np.int64)
+    active = np.zeros((len(hands), seats), dtype=bool)
+    known = np.ones((len(hands), seats), dtype=bool)
+    orders = []
+    showdown_rows = []
+    showdown_seats = []
+    for i, hand in enumerate(hands):
+        order = engine_order(hand)
+        orders.append(order)
+        try:
+            board = parse_cards(hand.board_cards)
+        except ValueError:
+            board = []
+        contenders = [player for player in order if not player.is_folded]
+        for j, player in enumerate(order):
+            # Hands stored before calls were capped at the stack may show
+            # more invested than the player started with.
+            invested[i, j] = min(player.total_invested, player.stack + player.total_invested)
+            active[i, j] = not player.is_folded
+            if player.is_folded or len(contenders) < 2:
+                continue
+            cards = _showdown_cards(player.hole_cards, board)
+            if cards is None:
+                known[i, j] = False
+            else:
+                showdown_rows.append(cards)
+                showdown_seats.append(i * seats + j)
+
+    ranks = np.zeros((len(hands), seats), dtype=np.int32)
+    if showdown_rows:
+        evaluator = evaluator or get_evaluator()
+        ranks.flat[showdown_seats] = evaluator.evaluate(np.array(showdown_rows, dtype=np.int16))
+    unsettled = (active & ~known).any(axis=1)
+    if split_unknown:
+        ranks[unsettled] = 0
+
+    net = pot_payouts(invested, active, ranks) - invested
+    results: List[Optional[Dict[int, int]]] = []
+    for i, order in enumerate(orders):
+        if unsettled[i] and not split_unknown:
+            results.append(None)
+        else:
+            results.append({player.position: int(net[i, j]) for j, player in enumerate(order)})
+    return results
+
+
+def settle_hand(hand: Hand, evaluator: Optional[HandEvaluator] = None, split_unknown: bool = False) -> Dict[int, int]:
+    """Net winnings by position for one completed hand.
+
+    Raises ValueError if a contested pot has unknown cards and
+    ``split_unknown`` is not set (see ``settle_hands``).
+    """
+    winnings = settle_hands([hand], evaluator, split_unknown)[0]
+    if winnings is None:
+        raise ValueError(f"Cannot settle hand {hand.id}: a contested pot has unknown cards")
+    return winnings
+
+
+def cross_check(hands: Sequence[Hand], engine: Optional[PokerEngine] = None) -> List[str]:
+    """Compare batch settlement with ``PokerEngine.evaluate_hand``; returns mismatches."""
+    engine = engine or PokerEngine()
+    mismatches = []
+    for hand, ours in zip(hands, settle_hands(hands)):
+        if ours is None:
+            continue
+        theirs = engine.evaluate_hand(hand)
+        if ours != theirs:
+            mismatches.append(f"{hand.id}: ours {ours}, pokerkit {theirs}")
+    return mismatches
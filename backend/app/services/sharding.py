@@ -0,0 +1,69 @@
+import hashlib
+import os
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional
+
+# Points per shard on the ring; more even out the share of keys each owns.
+DEFAULT_VNODES = 160
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to shard ids.
+
+    Each shard is placed at ``vnodes`` points on the ring and a key belongs
+    to the first point at or after its hash, so adding or removing a shard
+    only moves the keys of that shard (about 1/N of them).
+    """
+
+    def __init__(self, shard_ids: Iterable[str], vnodes: int = DEFAULT_VNODES):
+        points = sorted((_hash(f"{shard_id}#{i}"), shard_id) for shard_id in shard_ids for i in range(vnodes))
+        if not points:
+            raise ValueError("A hash ring needs at least one shard")
+        self._points = [point for point, _ in points]
+        self._shard_ids = [shard_id for _, shard_id in points]
+
+    def shard_for(self, key: str) -> str:
+        """Id of the shard owning ``key``."""
+        index = bisect_right(self._points, _hash(key))
+        return self._shard_ids[index % len(self._points)]
+
+
+class ShardMap:
+    """Which worker shard owns a key, and where that shard can be reached.
+
+    Configured with ``SHARDS``, a comma-separated list of ``id=base_url``
+    entries naming every shard, and ``SHARD_ID``, the entry of this process.
+    Without ``SHARDS`` the process is the only shard and owns every key.
+    """
+
+    def __init__(self, shards: Optional[Dict[str, str]] = None, local_id: Optional[str] = None):
+        self.shards = dict(shards or {})
+        if self.shards and local_id not in self.shards:
+            raise ValueError(f"SHARD_ID {local_id!r} is not one of SHARDS {sorted(self.shards)}")
+        self.local_id = local_id if self.shards else None
+        self._ring = HashRing(self.shards) if self.shards else None
+
+    @classmethod
+    def from_env(cls) -> "ShardMap":
+        shards = {}
+        for entry in os.getenv("SHARDS", "").split(","):
+            if entry.strip():
+                shard_id, _, base_url = entry.partition("=")
+                shards[shard_id.strip()] = base_url.strip().rstrip("/")
+        return cls(shards, os.getenv("SHARD_ID"))
+
+    def owner(self, key: str) -> Optional[str]:
+        """Id of the shard owning ``key``; None when unsharded."""
+        return self._ring.shard_for(key) if self._ring is not None else None
+
+    def is_local(self, key: str) -> bool:
+        """Whether this process owns ``key``."""
+        return self._ring is None or self._ring.shard_for(key) == self.local_id
+
+    def url_for(self, key: str, path: str) -> str:
+        """Absolute URL of ``path`` on the shard owning ``key``."""
+        return self.shards[self.owner(key)] + path
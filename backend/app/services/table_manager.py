@@ -0,0 +1,164 @@
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.models.game import Hand, check_player_names
+from app.models.table import SEATS, Table
+from app.repositories.table_repository import AsyncTableRepository
+from app.services.keyed_locks import KeyedLocks
+from app.services.sharding import ShardMap
+
+logger = logging.getLogger(__name__)
+
+# A seat with less than the big blind left is topped back up to the buy-in.
+MIN_STACK = 40
+
+
+def final_stacks(hand: Hand) -> List[int]:
+    """Each seat's chips after a completed hand: starting stack plus net winnings."""
+    return [
+        p.stack + p.total_invested + hand.winnings.get(p.position, 0)
+        for p in sorted(hand.players, key=lambda p: p.position)
+    ]
+
+
+class TableManager:
+    """The tables owned by this worker's shard, each dealing one hand after another.
+
+    When a table's hand completes, the next hand is created straight away
+    from the final stacks with the dealer button moved one seat on, so the
+    blinds rotate with it. Tables are held in memory for as long as they are
+    open and their hands live in the game service's live store, so a table
+    costs a small object plus its hand in play; the table row is only
+    written when a hand starts or the table closes.
+
+    Tables are assigned to shards by consistent hashing of their id (see
+    ShardMap), and every request for a table must reach the shard that owns
+    it so the in-memory state stays authoritative. Ids of new tables are
+    drawn until one hashes to this shard, so a table is always created where
+    it will be served.
+
+    Callers use a table only inside ``locked_table(table_id)``.
+    """
+
+    def __init__(self, game_service, shards: Optional[ShardMap] = None, repository=None):
+        self.game_service = game_service
+        self.shards = shards or ShardMap()
+        self.repository = repository or AsyncTableRepository()
+        self._tables: Dict[str, Table] = {}
+        self._locks = KeyedLocks()
+        self._stats = {"hands_started": 0, "loads": 0, "rebuys": 0}
+
+    @asynccontextmanager
+    async def locked_table(self, table_id: str) -> AsyncIterator[Optional[Table]]:
+        """Hold the lock of an open table, serializing its requests.
+
+        Yields None, without taking a lock, if there is no such open table,
+        and also if the table was closed while waiting for the lock.
+        """
+        table = await self.get_table(table_id)
+        if table is None:
+            yield None
+            return
+        async with self._locks.hold(table_id):
+            yield table if not table.is_closed else None
+
+    def tables(self) -> List[Table]:
+        """Open tables held by this shard."""
+        return list(self._tables.values())
+
+    async def create_table(self, buy_in: int, player_names: Optional[List[str]] = None) -> Tuple[Table, Hand]:
+        """Open a table with every seat at ``buy_in`` and deal its first hand."""
+        if buy_in < MIN_STACK:
+            raise ValueError(f"Buy-in must be at least {MIN_STACK}")
+        if player_names is not None:
+            if len(player_names) != SEATS:
+                raise ValueError(f"Must have exactly {SEATS} player names")
+            check_player_names(player_names)
+
+        table_id = str(uuid.uuid4())
+        while not self.shards.is_local(table_id):
+            table_id = str(uuid.uuid4())
+        table = Table(
+            id=table_id,
+            player_names=list(player_names or [f"Player {i + 1}" for i in range(SEATS)]),
+            stacks=[buy_in] * SEATS,
+            buy_in=buy_in,
+        )
+        async with self._locks.hold(table.id):
+            hand = await self._start_hand(table)
+            self._tables[table.id] = table
+        return table, hand
+
+    async def get_table(self, table_id: str) -> Optional[Table]:
+        """Get an open table, loading it from the database if it is not held yet."""
+        table = self._tables.get(table_id)
+        if table is not None:
+            return table
+
+        table = await self.repository.get_table_by_id(table_id)
+        self._stats["loads"] += 1
+        if table is None or table.is_closed:
+            return None
+        return self._tables.setdefault(table_id, table)
+
+    async def current_hand(self, table: Table) -> Hand:
+        """The table's hand in play, dealing the next one if it has completed."""
+        hand = None
+        if table.current_hand_id is not None:
+            hand = await self.game_service.get_hand_by_id(table.current_hand_id)
+        if hand is None or hand.is_completed:
+            # E.g. the process stopped between completing a hand and saving the table.
+            hand = await self.next_hand(table, hand)
+        return hand
+
+    async def play(self, table: Table, steps: List[Dict]) -> Tuple[Hand, Optional[Hand]]:
+        """Apply batch steps to the table's hand in play.
+
+        Returns the hand now in play and, if the steps completed the hand,
+        the completed hand; raises BatchStepError as ``apply_batch`` does.
+        """
+        hand = await self.current_hand(table)
+        async with self.game_service.hand_lock(hand.id):
+            hand = await self.game_service.get_hand_by_id(hand.id)
+            hand = self.game_service.apply_batch(hand, steps)
+            if not await self.game_service.save_hand(hand):
+                raise RuntimeError("Failed to save hand")
+        if not hand.is_completed:
+            return hand, None
+        return await self.next_hand(table, hand), hand
+
+    async def next_hand(self, table: Table, completed: Optional[Hand] = None) -> Hand:
+        """Deal the table's next hand, settling ``completed`` into the stacks first."""
+        if completed is not None:
+            table.stacks = final_stacks(completed)
+            table.dealer_position = (table.dealer_position + 1) % SEATS
+            table.hands_played += 1
+        return await self._start_hand(table)
+
+    async def close_table(self, table: Table) -> bool:
+        """Close a table; its hand in play is left as it is."""
+        table.is_closed = True
+        self._tables.pop(table.id, None)
+        return await self.repository.save_table(table)
+
+    async def _start_hand(self, table: Table) -> Hand:
+        for seat, stack in enumerate(table.stacks):
+            if stack < MIN_STACK:
+                table.stacks[seat] = table.buy_in
+                table.rebuys[seat] += 1
+                self._stats["rebuys"] += 1
+
+        hand = self.game_service.create_new_hand(table.stacks, table.dealer_position, table.player_names)
+        if not await self.game_service.save_hand(hand):
+            raise RuntimeError("Failed to save hand")
+        table.current_hand_id = hand.id
+        self._stats["hands_started"] += 1
+        # The in-memory table stays authoritative; the row catches up on the next save.
+        if not await self.repository.save_table(table):
+            logger.warning("Table %s was not persisted at hand %s", table.id, hand.id)
+        return hand
+
+    def stats(self) -> Dict:
+        """Table count and hand/rebuy counters."""
+        return dict(self._stats, tables=len(self._tables), shard=self.shards.local_id or "")
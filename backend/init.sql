@@ -1,6 +1,9 @@
 
+-- Partitioned by month of created_at (app.database.partitions): one
+-- hands_yYYYYmMM table per UTC month, created before hands of that month
+-- are written. Months older than the archive cutoff move to segment files.
 CREATE TABLE IF NOT EXISTS hands (
-    id VARCHAR(36) PRIMARY KEY,
+    id VARCHAR(36) NOT NULL,
     players_data JSONB NOT NULL,
     actions_data JSONB NOT NULL DEFAULT '[]',
     board_cards VARCHAR(20) DEFAULT '',
@@ -9,12 +12,111 @@ CREATE TABLE IF NOT EXISTS hands (
     is_completed BOOLEAN NOT NULL DEFAULT FALSE,
     winner_positions JSONB DEFAULT '[]',
     winnings JSONB DEFAULT '{}',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    actions_count INTEGER NOT NULL DEFAULT 0,
+    -- Binary-encoded header (app.models.codec) when stored with
+    -- HAND_STORAGE_FORMAT=binary; players_data is then left empty.
+    hand_data BYTEA,
+    -- Bumped by every change; saves compare-and-swap on it.
+    version INTEGER NOT NULL DEFAULT 0,
+    -- Hand search columns (app.repositories.hand_repository.hand_search_columns):
+    -- preflop bets and raises, board card codes and each known holding as
+    -- low * 52 + high card code. NULL until `python -m app.cli.hands reindex`
+    -- for hands stored before they existed.
+    preflop_raises SMALLINT,
+    board_codes SMALLINT[],
+    hole_combos INTEGER[],
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+DO $$
+DECLARE
+    month DATE := date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC');
+BEGIN
+    FOR i IN 0..1 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF hands FOR VALUES FROM (%L) TO (%L)',
+            to_char(month, '"hands_y"YYYY"m"MM'), month::text || ' 00:00:00+00',
+            (month + INTERVAL '1 month')::date::text || ' 00:00:00+00'
+        );
+        month := month + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+-- Segment files of archived hands (app.repositories.hand_archive).
+CREATE TABLE IF NOT EXISTS hand_segments (
+    id SERIAL PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    hand_count INTEGER NOT NULL,
+    min_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    max_created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Append-only action log; hands.actions_count marks how many of these
+-- actions are already reflected in the hands.players_data header.
+CREATE TABLE IF NOT EXISTS hand_actions (
+    hand_id VARCHAR(36) NOT NULL,
+    seq INTEGER NOT NULL,
+    position SMALLINT NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    amount INTEGER NOT NULL DEFAULT 0,
+    round VARCHAR(20) NOT NULL,
+    PRIMARY KEY (hand_id, seq)
+);
+
+-- Six-seat tables dealing hands back to back (app.services.table_manager).
+-- stacks are the seats' chips at the start of current_hand_id.
+CREATE TABLE IF NOT EXISTS poker_tables (
+    id VARCHAR(36) PRIMARY KEY,
+    player_names JSONB NOT NULL,
+    stacks JSONB NOT NULL,
+    buy_in INTEGER NOT NULL,
+    dealer_position SMALLINT NOT NULL DEFAULT 0,
+    current_hand_id VARCHAR(36),
+    hands_played INTEGER NOT NULL DEFAULT 0,
+    rebuys JSONB NOT NULL DEFAULT '[]',
+    is_closed BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-player, per-seat counters rolled up as hands complete
+-- (app.services.player_stats); per-player and per-seat stats sum over them.
+CREATE TABLE IF NOT EXISTS player_stats (
+    player_name TEXT NOT NULL,
+    position SMALLINT NOT NULL,
+    hands INTEGER NOT NULL DEFAULT 0,
+    vpip_hands INTEGER NOT NULL DEFAULT 0,
+    pfr_hands INTEGER NOT NULL DEFAULT 0,
+    postflop_aggressive INTEGER NOT NULL DEFAULT 0,
+    postflop_calls INTEGER NOT NULL DEFAULT 0,
+    showdowns INTEGER NOT NULL DEFAULT 0,
+    showdowns_won INTEGER NOT NULL DEFAULT 0,
+    hands_won INTEGER NOT NULL DEFAULT 0,
+    net_winnings BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (player_name, position)
+);
+
+-- Hands already counted in player_stats, so rolling a hand up is idempotent.
+CREATE TABLE IF NOT EXISTS stats_processed_hands (
+    hand_id VARCHAR(36) PRIMARY KEY,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX IF NOT EXISTS idx_hands_created_at ON hands(created_at DESC);
+-- Keyset pagination of the history: ORDER BY created_at DESC, id DESC.
+CREATE INDEX IF NOT EXISTS idx_hands_created_at_id ON hands(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_hands_completed ON hands(is_completed);
 CREATE INDEX IF NOT EXISTS idx_hands_id ON hands(id);
+-- GET /hands/search filters.
+CREATE INDEX IF NOT EXISTS idx_hands_winner_positions ON hands USING GIN (winner_positions jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_hands_board_codes ON hands USING GIN (board_codes);
+CREATE INDEX IF NOT EXISTS idx_hands_hole_combos ON hands USING GIN (hole_combos);
+CREATE INDEX IF NOT EXISTS idx_hands_pot_size ON hands(pot_size);
+CREATE INDEX IF NOT EXISTS idx_hands_round_created_at ON hands(current_round, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_hands_preflop_raises_created_at ON hands(preflop_raises, created_at DESC, id DESC);
 
 INSERT INTO hands (
     id, 
@@ -25,8 +127,11 @@ INSERT INTO hands (
     current_round, 
     is_completed, 
     winner_positions, 
-    winnings
-) VALUES (
+    winnings,
+    preflop_raises,
+    board_codes,
+    hole_combos
+) SELECT
     'sample-hand-uuid-123',
     '[
         {"position": 0, "name": "Player 1", "stack": 960, "hole_cards": "AhKs", "is_dealer": true, "is_small_blind": false, "is_big_blind": false, "is_folded": false, "current_bet": 0, "total_invested": 40},
@@ -49,5 +154,10 @@ INSERT INTO hands (
     'river',
     true,
     '[0]',
-    '{"0": 60, "1": -20, "2": -40, "3": 0, "4": 0, "5": 0}'
-) ON CONFLICT (id) DO NOTHING;
+    '{"0": 60, "1": -20, "2": -40, "3": 0, "4": 0, "5": 0}',
+    -- Search columns as hand_search_columns computes them, so the sample
+    -- hand is found by the hand search.
+    0,
+    '{50,47,41,36,30}',
+    '{56,586,904,1434,1913,2494}'
+WHERE NOT EXISTS (SELECT 1 FROM hands WHERE id = 'sample-hand-uuid-123');
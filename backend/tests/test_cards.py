@@ -0,0 +1,13 @@
+import pytest
+from app.models.cards import normalize_cards
+
+
+def test_normalize_cards_canonical_form():
+    assert normalize_cards("ahKD2C") == "AhKd2c"
+    assert normalize_cards("", 0, 5) == ""
+
+
+@pytest.mark.parametrize("cards", ["Ah Kd", "AhAh", "1c", "Ah", "AhKdQc"])
+def test_normalize_cards_rejects_bad_hole_cards(cards):
+    with pytest.raises(ValueError):
+        normalize_cards(cards, 2, 2)
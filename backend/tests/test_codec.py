@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+import pytest
+from app.models.codec import HandStreamDecoder, decode_hand, encode_hand, encode_stream
+from app.models.game import GameAction, Hand, MAX_PLAYER_NAME_LENGTH, Player, Round, check_player_names
+from app.models.serialization import hand_to_json
+
+
+def completed_hand() -> Hand:
+    players = [Player(position, f"Player {position + 1}", 1000) for position in range(6)]
+    players[0].is_dealer = True
+    players[1].name, players[1].is_small_blind, players[1].current_bet = "Anna", True, 20
+    players[2].name, players[2].is_big_blind, players[2].hole_cards = "Björn ♠", True, "AhKd"
+    for player in players[3:] + players[:2]:
+        player.is_folded = True
+    return Hand(
+        id="8d0f5b0e-8f2e-4e8a-9a57-3f8e4b6f0c11",
+        players=players,
+        actions=[GameAction(position, "fold", 0, Round.PREFLOP) for position in (3, 4, 5, 0, 1)],
+        board_cards="",
+        pot_size=60,
+        is_completed=True,
+        winner_positions=[2],
+        winnings={1: -20, 2: 20},
+        created_at=datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        version=6,
+    )
+
+
+def test_round_trip_keeps_names_empty_board_and_winnings():
+    hand = completed_hand()
+    decoded = decode_hand(encode_hand(hand))
+    # The version is stored beside the encoding (hands.version, segment
+    # columns), not in it.
+    assert decoded.version == 0
+    assert hand_to_json(decoded) == hand_to_json(hand)
+    assert [p.name for p in decoded.players][:3] == ["Player 1", "Anna", "Björn ♠"]
+    assert decoded.board_cards == "" and decoded.winnings == {1: -20, 2: 20}
+
+
+def test_round_trip_of_a_hand_in_progress_with_a_naive_time_and_text_id():
+    hand = completed_hand()
+    hand.id, hand.is_completed, hand.winner_positions, hand.winnings = "imported-7", False, [], {}
+    hand.board_cards, hand.current_round = "2c7hTs", Round.FLOP
+    hand.created_at = hand.created_at.replace(tzinfo=None)
+    assert hand_to_json(decode_hand(encode_hand(hand))) == hand_to_json(hand)
+
+
+def test_stream_round_trip_in_small_chunks():
+    hands = [completed_hand(), completed_hand()]
+    hands[1].id = "other"
+    data = b"".join(encode_stream(hands))
+    decoder = HandStreamDecoder()
+    decoded = [hand for i in range(0, len(data), 7) for hand in decoder.feed(data[i:i + 7])]
+    assert decoder.close() == []
+    assert [h.id for h in decoded] == [h.id for h in hands]
+
+
+def test_unknown_codec_version_is_rejected():
+    data = bytearray(encode_hand(completed_hand()))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        decode_hand(bytes(data))
+
+
+def test_long_names_are_rejected_before_encoding():
+    check_player_names(["x" * MAX_PLAYER_NAME_LENGTH])
+    with pytest.raises(ValueError):
+        check_player_names(["x" * (MAX_PLAYER_NAME_LENGTH + 1)])
+    hand = completed_hand()
+    hand.players[1].name = "€" * 100
+    with pytest.raises(ValueError):
+        encode_hand(hand)
@@ -0,0 +1,82 @@
+from app.models.codec import decode_hand
+from app.models.serialization import hand_to_json
+from app.services.completed_hand_cache import CompletedHandCache, estimate_size
+from app.services.game_service import GameService
+
+
+def completed_hands(count: int):
+    service = GameService()
+    hands = []
+    for _ in range(count):
+        hand = service.create_new_hand([1000] * 6)
+        for position in (3, 4, 5, 0, 1):
+            hand = service.add_action(hand, position, "fold")
+        hands.append(hand)
+    return hands
+
+
+def test_least_recently_used_hands_are_evicted_first():
+    hands = completed_hands(4)
+    size = estimate_size(hands[0])
+    cache = CompletedHandCache(max_bytes=3 * size)
+    for hand in hands[:3]:
+        cache.put(hand, {})
+    cache.get(hands[0].id)  # hands[1] is now the least recently used
+
+    cache.put(hands[3], {})
+    assert cache.peek(hands[1].id) is None
+    assert [cache.peek(hand.id) is not None for hand in (hands[0], hands[2], hands[3])] == [True] * 3
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 3 * size and stats["evictions"] == 1
+
+
+def test_discard_frees_the_entry_and_its_bytes():
+    hands = completed_hands(2)
+    cache = CompletedHandCache(max_bytes=10 * estimate_size(hands[0]))
+    for hand in hands:
+        cache.put(hand, {})
+    cache.discard(hands[0].id)
+    cache.discard(hands[0].id)
+    cache.discard("never-cached")
+    assert cache.peek(hands[0].id) is None
+    assert cache.stats()["bytes"] == estimate_size(hands[1])
+    assert cache.get(hands[0].id) is None and cache.stats()["misses"] == 1
+
+
+def test_put_replaces_an_older_entry_without_double_counting():
+    hand = completed_hands(1)[0]
+    cache = CompletedHandCache(max_bytes=10 * estimate_size(hand))
+    cache.put(hand, {"line1": "old"})
+    cache.put(hand, {"line1": "new"})
+    assert cache.get(hand.id).display == {"line1": "new"}
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == estimate_size(hand)
+
+
+def test_only_completed_hands_that_fit_are_cached():
+    hand = completed_hands(1)[0]
+    in_progress = GameService().create_new_hand([1000] * 6)
+    cache = CompletedHandCache(max_bytes=10 * estimate_size(hand))
+    assert cache.put(in_progress, {}) is None
+    assert CompletedHandCache(max_bytes=0).put(hand, {}) is None
+    assert CompletedHandCache(max_bytes=estimate_size(hand) - 1).put(hand, {}) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_payloads_are_rendered_once():
+    hand = completed_hands(1)[0]
+    entry = CompletedHandCache(max_bytes=10 * estimate_size(hand)).put(hand, {})
+    assert entry.json == hand_to_json(hand).encode()
+    assert entry.json is entry.json
+    assert decode_hand(entry.binary).id == hand.id
+    assert entry.binary is entry.binary
+
+
+def test_changing_a_completed_hand_discards_its_entry():
+    service = GameService()
+    hand = service.create_new_hand([1000] * 6)
+    for position in (3, 4, 5, 0, 1):
+        hand = service.add_action(hand, position, "fold")
+    service.completed_hands.put(hand, service.format_hand_for_display(hand))
+    assert service.completed_hands.peek(hand.id) is not None
+    service.deal_hole_cards(hand, {2: "AhKd"})
+    assert service.completed_hands.peek(hand.id) is None
@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.repositories.hand_archive import HandArchive, merge_newest_first
+from app.repositories.hand_repository import decode_cursor, encode_cursor, hand_keys_query, row_key
+from app.routes import hands
+from app.services.game_service import GameService
+
+SAME_TIME = datetime(2024, 5, 1, 9, 30, 0, 250000, tzinfo=timezone.utc)
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def hand_at(created_at: datetime, hand_id: str):
+    hand = GameService().create_new_hand([1000] * 6)
+    hand.id, hand.created_at = hand_id, created_at
+    return hand
+
+
+@pytest.mark.parametrize("created_at, hand_id", [
+    (SAME_TIME, "8d0f5b0e-8f2e-4e8a-9a57-3f8e4b6f0c11"),
+    (SAME_TIME.replace(tzinfo=None), "imported-7"),
+    (datetime(2024, 5, 1, 11, 30, tzinfo=timezone(timedelta(hours=2))), "ü/+=?"),
+])
+def test_cursor_round_trips(created_at, hand_id):
+    cursor = encode_cursor(hand_at(created_at, hand_id))
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, hand_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage!",
+    "é",
+    raw_cursor("not a list")[:-3],
+    raw_cursor(["2024-05-01T09:30:00"]),
+    raw_cursor(["2024-05-01T09:30:00", "a", "b"]),
+    raw_cursor(["yesterday", "a"]),
+    raw_cursor([20240501, "a"]),
+    raw_cursor(["2024-05-01T09:30:00", 7]),
+    raw_cursor(["2024-05-01T09:30:00", "a\x00b"]),
+    raw_cursor(["9999-12-31T23:00:00-05:00", "a"]),
+])
+def test_invalid_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("path", [
+    "/api/hands",
+    "/api/hands?format=ndjson",
+    "/api/hands/search?min_pot=10",
+    "/api/hands/export",
+])
+def test_invalid_cursor_is_a_bad_request(path):
+    app = FastAPI()
+    app.include_router(hands.router, prefix="/api")
+    app.state.game_service = GameService()
+    separator = "&" if "?" in path else "?"
+    tampered = encode_cursor(hand_at(SAME_TIME, "a"))[:-2]
+    for cursor in ("garbage!", tampered):
+        response = TestClient(app).get(f"{path}{separator}cursor={cursor}")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_hands_with_the_same_time_page_by_id(tmp_path):
+    # Hot hands stand in for the database rows, which the keys query
+    # filters with the same row comparison as Python tuples.
+    query, params = hand_keys_query((SAME_TIME, "m"), 2)
+    assert "(created_at, id) < (%s, %s)" in query and params == (SAME_TIME, "m", 2)
+
+    cold = [hand_at(SAME_TIME, hand_id) for hand_id in ("f", "d", "b")]
+    archive = HandArchive(str(tmp_path))
+    path = archive.new_segment_path(SAME_TIME.date())
+    archive.load_catalog([dict(archive.write(path, cold), path=path)])
+    hot = [(hand_id, SAME_TIME) for hand_id in ("g", "e", "c", "a")]
+    hot.append(("z", SAME_TIME - timedelta(microseconds=1)))
+
+    seen, after = [], None
+    while True:
+        hot_page = [key for key in hot if after is None or row_key(key) < after][:2]
+        page = list(merge_newest_first(hot_page, archive.keys_page(after, 2), row_key, 2))
+        seen.extend(hand_id for hand_id, _ in page)
+        if len(page) < 2:
+            break
+        after = decode_cursor(encode_cursor(hand_at(page[-1][1], page[-1][0])))
+    assert seen == ["g", "f", "e", "d", "c", "b", "a", "z"]
@@ -0,0 +1,34 @@
+from app.services.equity_service import EquityService
+from app.services.game_service import GameService
+
+
+def heads_up_turn(hole_cards, board):
+    """A hand with every player but 0 and 1 folded and ``board`` dealt."""
+    service = GameService()
+    hand = service.deal_hole_cards(service.create_new_hand([1000] * 6), hole_cards)
+    for player in hand.players:
+        player.is_folded = player.position not in (0, 1)
+    hand.board_cards = board
+    return hand
+
+
+def test_folded_hole_cards_are_dead():
+    # Player 1 needs one of the last two kings, and player 3 folded both.
+    hand = heads_up_turn({0: "AhAs", 1: "KdKc", 3: "KhKs"}, "2c7d9hQs")
+    equity = EquityService(max_workers=1).calculate(hand)
+    assert equity["method"] == "exact"
+    assert equity["samples"] == 52 - 4 - 6
+    assert [p["equity"] for p in equity["players"]] == [1.0, 0.0]
+
+
+def test_seeded_samples_do_not_depend_on_workers():
+    hand = heads_up_turn({0: "AhAs", 3: "KhKs"}, "2c7d9h")
+    one, four = EquityService(max_workers=1), EquityService(max_workers=4)
+    try:
+        first = one.calculate(hand, None, 40_000, seed=7)
+        second = four.calculate(hand, None, 40_000, seed=7)
+    finally:
+        four.shutdown()
+    assert first["method"] == "monte_carlo"
+    assert first["samples"] == second["samples"] == 40_000
+    assert first["players"] == second["players"]
@@ -0,0 +1,28 @@
+import pytest
+from app.services.game_service import BatchStepError, GameService
+
+
+def test_apply_batch_restores_state_on_unexpected_errors():
+    service = GameService()
+    hand = service.create_new_hand([1000] * 6)
+    subscription = service.events.subscribe(hand.id)
+    hand = service.add_action(hand, 3, "fold")
+    pending = list(service._pending_events[hand.id])
+    apply_step = service._apply_step
+
+    def failing_step(working, step):
+        if step.get("action_type") == "boom":
+            raise RuntimeError("boom")
+        return apply_step(working, step)
+
+    service._apply_step = failing_step
+    steps = [{"type": "action", "player_position": 4, "action_type": "fold"}, {"action_type": "boom"}]
+    with pytest.raises(RuntimeError):
+        service.apply_batch(hand, steps)
+    assert service._pending_events[hand.id] == pending
+    assert [a.player_position for a in hand.actions] == [3]
+
+    with pytest.raises(BatchStepError):
+        service.apply_batch(hand, [{"type": "action", "player_position": 9, "action_type": "fold"}])
+    assert service._pending_events[hand.id] == pending
+    subscription.close()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+from app.repositories.hand_archive import HandArchive, merge_newest_first
+from app.repositories.hand_repository import hand_key
+from app.services.game_service import GameService
+
+
+def archived(tmp_path, hands):
+    archive = HandArchive(str(tmp_path))
+    path = archive.new_segment_path(hands[0].created_at.date())
+    segment = archive.write(path, hands)
+    archive.load_catalog([dict(segment, path=path)])
+    return archive
+
+
+def test_archived_hands_keep_their_version(tmp_path):
+    service = GameService()
+    started = datetime(2024, 1, 31, 12)
+    hands = []
+    for i in range(3):
+        hand = service.create_new_hand([1000] * 6)
+        hand.created_at = started - timedelta(minutes=i)
+        hand.version = 10 + i
+        hands.append(hand)
+    archive = archived(tmp_path, hands)
+
+    assert archive.get(hands[1].id).version == 11
+    assert [hand.version for hand in archive.hands_page(None, 10)] == [10, 11, 12]
+    assert archive.get("not-archived") is None
+
+
+def test_hands_archived_without_time_zone_merge_with_aware_hands(tmp_path):
+    service = GameService()
+    started = datetime(2024, 1, 31, 12)
+    cold = []
+    for i in range(2):
+        hand = service.create_new_hand([1000] * 6)
+        hand.created_at = started - timedelta(minutes=2 * i)
+        cold.append(hand)
+    archive = archived(tmp_path, cold)
+    hot = service.create_new_hand([1000] * 6)
+    hot.created_at = (started - timedelta(minutes=1)).replace(tzinfo=timezone.utc)
+
+    archived_hands = archive.hands_page(None, 10)
+    assert all(hand.created_at.tzinfo is not None for hand in archived_hands)
+    assert archive.keys_page(None, 10)[0] == (cold[0].id, started.replace(tzinfo=timezone.utc))
+    merged = merge_newest_first([hot], archived_hands, hand_key)
+    assert [hand.id for hand in merged] == [cold[0].id, hot.id, cold[1].id]
@@ -0,0 +1,55 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from pokerkit import StandardHighHand
+from app.services.hand_evaluator import CATEGORY_NAMES, HandEvaluator, get_evaluator
+
+# Seven-card hands as hole cards + board, weakest first; each beats the one before.
+LADDER = [
+    ("7c5d", "4h3s2c9dJh"),   # jack high
+    ("2d2h", "7c9sJdQhKc"),   # pair of twos
+    ("AcAd", "KhKs2c3d7h"),   # aces up
+    ("5c5d", "5h9sJdQhKc"),   # trip fives
+    ("Ac2d", "3h4s5cJdKh"),   # wheel: A-2-3-4-5 plays as five high
+    ("6c2d", "3h4s5cJdKh"),   # six-high straight beats the wheel
+    ("AcKd", "QhJsTc2d3h"),   # broadway
+    ("2h7h", "9hJhKh2c3d"),   # king-high flush
+    ("AhKh", "2c3d9hJhQh"),   # ace-high flush beats king-high
+    ("9c9d", "9hKsKc2d3h"),   # nines full
+    ("3c3d", "3h3sKc2d7h"),   # quad threes
+    ("Ah2h", "3h4h5hKcKd"),   # steel wheel
+    ("9h8h", "7h6h5h2c3d"),   # nine-high straight flush
+    ("AhKh", "QhJhTh2c3d"),   # royal flush
+]
+
+
+@pytest.fixture(scope="module")
+def evaluator() -> HandEvaluator:
+    return get_evaluator()
+
+
+def test_random_showdowns_match_pokerkit(evaluator):
+    assert evaluator.cross_check(samples=3000, seed=7) == []
+
+
+def test_ladder_matches_pokerkit_and_categories(evaluator):
+    ranks = evaluator.evaluate_strings([hole + board for hole, board in LADDER])
+    assert list(ranks) == sorted(ranks) and len(set(ranks.tolist())) == len(LADDER)
+
+    theirs = [StandardHighHand.from_game(hole, board) for hole, board in LADDER]
+    assert all(a < b for a, b in zip(theirs, theirs[1:]))
+
+    categories = [CATEGORY_NAMES[c] for c in evaluator.category(ranks)]
+    assert categories[4] == categories[5] == categories[6] == "Straight"
+    assert categories[7] == categories[8] == "Flush"
+    assert categories[-3:] == ["Straight Flush"] * 3
+
+
+def test_seven_cards_rank_as_their_best_five(evaluator):
+    rng = np.random.default_rng(3)
+    deals = np.argsort(rng.random((200, 52)), axis=1)[:, :7]
+    seven = evaluator.evaluate(deals)
+    fives = np.array([[row[list(subset)] for subset in combinations(range(7), 5)] for row in deals])
+    best = evaluator.evaluate(fives.reshape(-1, 5)).reshape(len(deals), -1).max(axis=1)
+    assert np.array_equal(seven, best)
+    assert np.all(evaluator.evaluate(deals[:, :6]) <= seven)
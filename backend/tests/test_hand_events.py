@@ -0,0 +1,60 @@
+import asyncio
+import json
+from app.services.hand_events import HandEventBroker
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(json.loads(subscription.queue.get_nowait()))
+    return events
+
+
+def test_events_fan_out_to_every_subscriber_of_the_hand():
+    async def run():
+        broker = HandEventBroker()
+        first, second = broker.subscribe("h1"), broker.subscribe("h1")
+        other = broker.subscribe("h2")
+        broker.publish("h1", [{"type": "action", "seq": 0}, {"type": "action", "seq": 1}])
+        assert json.loads(await first.get()) == {"type": "action", "seq": 0}
+        assert drain(first) == [{"type": "action", "seq": 1}]
+        assert [event["seq"] for event in drain(second)] == [0, 1]
+        assert drain(other) == []
+        stats = broker.stats()
+        assert (stats["published"], stats["delivered"]) == (2, 4)
+        assert (stats["hands"], stats["subscribers"]) == (2, 3)
+
+    asyncio.run(run())
+
+
+def test_unsubscribed_subscribers_stop_receiving_events():
+    async def run():
+        broker = HandEventBroker()
+        kept, closed = broker.subscribe("h1"), broker.subscribe("h1")
+        closed.close()
+        broker.publish("h1", [{"type": "board"}])
+        assert len(drain(kept)) == 1 and drain(closed) == []
+        kept.close()
+        kept.close()
+        assert not broker.has_subscribers("h1")
+        assert broker.stats()["hands"] == 0
+        # Nothing is encoded for hands nobody watches.
+        broker.publish("h1", [{"type": "board"}])
+        assert broker.stats()["published"] == 1
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_gets_a_resync_instead_of_a_backlog():
+    async def run():
+        broker = HandEventBroker(max_queue=2)
+        slow, fast = broker.subscribe("h1"), broker.subscribe("h1")
+        broker.publish("h1", [{"type": "action", "seq": 0}, {"type": "action", "seq": 1}])
+        drain(fast)
+        broker.publish("h1", [{"type": "action", "seq": 2}])
+        assert drain(slow) == [{"type": "resync", "hand_id": "h1"}]
+        assert slow.dropped == 3
+        assert drain(fast) == [{"type": "action", "seq": 2}]
+        assert broker.stats()["resyncs"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timezone
+import pytest
+from app.models.cards import parse_cards
+from app.repositories.hand_repository import HandSearch, hand_search_columns, hand_search_query, hole_combo
+from app.services.game_service import GameService
+
+AFTER = (datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc), "cursor-hand")
+
+
+def conditions(query: str):
+    where = next(line for line in query.splitlines() if line.startswith("WHERE "))
+    return where[len("WHERE "):].split(" AND ")
+
+
+def test_no_filters_lists_every_hand():
+    query, params = hand_search_query(HandSearch(), None, 50)
+    assert "WHERE" not in query
+    assert "ORDER BY created_at DESC, id DESC" in query
+    assert params == (50,)
+
+
+@pytest.mark.parametrize("search, expected_conditions, expected_params", [
+    (HandSearch(winner_position=3), ["winner_positions @> %s::jsonb"], [json.dumps([3])]),
+    (HandSearch(winner_position=0), ["winner_positions @> %s::jsonb"], [json.dumps([0])]),
+    (HandSearch(min_pot=0), ["pot_size >= %s"], [0]),
+    (HandSearch(max_pot=400), ["pot_size <= %s"], [400]),
+    (HandSearch(street="turn"), ["current_round = %s"], ["turn"]),
+    (HandSearch(pattern="limped"), ["preflop_raises >= %s", "preflop_raises <= %s"], [0, 0]),
+    (HandSearch(pattern="raised"), ["preflop_raises >= %s"], [1]),
+    (HandSearch(pattern="single_raised"), ["preflop_raises >= %s", "preflop_raises <= %s"], [1, 1]),
+    (HandSearch(pattern="3bet"), ["preflop_raises >= %s"], [2]),
+    (HandSearch(pattern="4bet"), ["preflop_raises >= %s"], [3]),
+    (HandSearch(board_cards="Ah9h"), ["board_codes @> %s::smallint[]"], [parse_cards("Ah9h")]),
+    (HandSearch(hole_cards="KsAh"), ["hole_combos @> %s::int[]"], [[hole_combo(*parse_cards("AhKs"))]]),
+])
+def test_each_filter(search, expected_conditions, expected_params):
+    query, params = hand_search_query(search, None, 20)
+    assert conditions(query) == expected_conditions
+    assert params == tuple(expected_params) + (20,)
+
+
+def test_single_hole_card_matches_any_holding_with_it():
+    query, params = hand_search_query(HandSearch(hole_cards="Ah"), None, 20)
+    assert conditions(query) == ["hole_combos && %s::int[]"]
+    ace = parse_cards("Ah")[0]
+    assert sorted(params[0]) == sorted(hole_combo(ace, other) for other in range(52) if other != ace)
+    assert len(params[0]) == 51
+
+
+def test_filters_combine_with_the_cursor_last():
+    search = HandSearch(
+        winner_position=1, min_pot=100, max_pot=500, street="river",
+        pattern="single_raised", board_cards="2c", hole_cards="QdJc",
+    )
+    query, params = hand_search_query(search, AFTER, 10)
+    assert conditions(query) == [
+        "winner_positions @> %s::jsonb",
+        "pot_size >= %s",
+        "pot_size <= %s",
+        "current_round = %s",
+        "preflop_raises >= %s",
+        "preflop_raises <= %s",
+        "board_codes @> %s::smallint[]",
+        "hole_combos @> %s::int[]",
+        "(created_at, id) < (%s, %s)",
+    ]
+    assert params == (
+        "[1]", 100, 500, "river", 1, 1, parse_cards("2c"),
+        [hole_combo(*parse_cards("QdJc"))], AFTER[0], AFTER[1], 10,
+    )
+    assert query.count("%s") == len(params)
+
+
+def test_cursor_alone():
+    query, params = hand_search_query(HandSearch(), AFTER, 10)
+    assert conditions(query) == ["(created_at, id) < (%s, %s)"]
+    assert params == AFTER + (10,)
+
+
+@pytest.mark.parametrize("search", [
+    HandSearch(street="showdown"),
+    HandSearch(pattern="5bet"),
+    HandSearch(board_cards="AhKhQhJhTh9h"),
+    HandSearch(board_cards="Xx"),
+    HandSearch(hole_cards="AhAh"),
+    HandSearch(hole_cards="AhKhQh"),
+    HandSearch(hole_cards="A"),
+])
+def test_invalid_filters_are_rejected(search):
+    with pytest.raises(ValueError):
+        hand_search_query(search, None, 10)
+
+
+def test_search_parameters_match_the_stored_columns():
+    service = GameService()
+    hand = service.create_new_hand([1000] * 6)
+    service.deal_hole_cards(hand, {0: "AhKs", 3: "7c6d"})
+    raises, board, combos = hand_search_columns(hand)
+    assert raises == 0 and board == []
+    _, params = hand_search_query(HandSearch(hole_cards="KsAh"), None, 1)
+    assert set(params[0]) <= set(combos)
+    _, params = hand_search_query(HandSearch(hole_cards="6d"), None, 1)
+    assert set(params[0]) & set(combos)
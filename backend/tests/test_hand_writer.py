@@ -0,0 +1,69 @@
+import asyncio
+from app.services.game_service import GameService
+from app.services.hand_writer import HandWriter
+
+
+class WriterCrash(BaseException):
+    """Escapes the writer's ``except Exception`` and ends its task."""
+
+
+class BatchRepository:
+    """Records the saves of each batch; ``crash`` kills the writer task on the next one."""
+
+    binary = False
+
+    def __init__(self):
+        self.batches = []
+        self.crash = False
+        self.release = asyncio.Event()
+
+    async def ensure_partitions(self, hands):
+        pass
+
+    async def save_hands(self, saves):
+        await self.release.wait()
+        if self.crash:
+            self.crash = False
+            raise WriterCrash()
+        self.batches.append([save.id for save in saves])
+        return [True] * len(saves)
+
+
+def test_dead_writer_fails_its_saves_and_restarts():
+    async def run():
+        repository = BatchRepository()
+        writer = HandWriter(repository, max_batch=4)
+        writer.start()
+        hands = [GameService().create_new_hand([1000] * 6) for _ in range(3)]
+
+        repository.crash = True
+        in_flight = asyncio.create_task(writer.save_hand(hands[0]))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(writer.save_hand(hands[1]))
+        await asyncio.sleep(0)
+        repository.release.set()
+        assert await asyncio.wait_for(asyncio.gather(in_flight, queued), 1) == [False, False]
+
+        assert await asyncio.wait_for(writer.save_hand(hands[2]), 1) is True
+        assert repository.batches == [[hands[2].id]]
+        stats = writer.stats()
+        assert stats["writer_restarts"] == 1 and stats["failures"] == 2 and stats["queued_saves"] == 0
+        await writer.stop()
+
+    asyncio.run(run())
+
+
+def test_stop_after_the_writer_was_cancelled():
+    async def run():
+        repository = BatchRepository()
+        writer = HandWriter(repository, max_batch=4)
+        writer.start()
+        save = asyncio.create_task(writer.save_hand(GameService().create_new_hand([1000] * 6)))
+        await asyncio.sleep(0)
+        writer._closing = True
+        writer._task.cancel()
+        assert await asyncio.wait_for(save, 1) is False
+        await writer.stop()
+        assert writer._task is None
+
+    asyncio.run(run())
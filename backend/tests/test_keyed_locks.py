@@ -0,0 +1,46 @@
+import asyncio
+from app.services.keyed_locks import KeyedLocks
+
+
+def test_one_holder_at_a_time_while_waiters_queue():
+    async def run():
+        locks = KeyedLocks()
+        holders = []
+        overlaps = []
+
+        async def worker(i):
+            async with locks.hold("h1"):
+                holders.append(i)
+                if len(holders) > 1:
+                    overlaps.append(list(holders))
+                await asyncio.sleep(0)
+                holders.remove(i)
+
+        await asyncio.gather(*(worker(i) for i in range(20)))
+        return overlaps, len(locks)
+
+    overlaps, remaining = asyncio.run(run())
+    assert overlaps == []
+    assert remaining == 0
+
+
+def test_entry_lives_while_held_or_awaited():
+    async def run():
+        locks = KeyedLocks()
+        seen = []
+        async with locks.hold("h1"):
+            waiter = asyncio.create_task(_hold_briefly(locks, "h1"))
+            await asyncio.sleep(0)
+            seen.append(locks.in_use("h1"))
+        # Released, but the waiter has not resumed yet.
+        seen.append(locks.in_use("h1"))
+        await waiter
+        seen.append(locks.in_use("h1"))
+        return seen
+
+    assert asyncio.run(run()) == [True, True, False]
+
+
+async def _hold_briefly(locks, key):
+    async with locks.hold(key):
+        await asyncio.sleep(0)
@@ -0,0 +1,134 @@
+import asyncio
+import copy
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.repositories.base import ConcurrentUpdateError
+from app.routes import hands
+from app.services.game_service import GameService
+
+
+class SharedRepository:
+    """In-memory stand-in for the hands table, with its compare-and-swap on version."""
+
+    def __init__(self):
+        self.hands = {}
+        self.failing = False
+
+    async def get_hand_by_id(self, hand_id):
+        hand = self.hands.get(hand_id)
+        return copy.deepcopy(hand) if hand is not None else None
+
+    async def save_hand(self, hand, from_seq=0, write_header=True, expected_version=None):
+        if self.failing:
+            return False
+        stored = self.hands.get(hand.id)
+        if expected_version is not None and (stored is None or stored.version != expected_version):
+            raise ConcurrentUpdateError(f"Hand {hand.id} is no longer at version {expected_version}")
+        self.hands[hand.id] = copy.deepcopy(hand)
+        return True
+
+
+def game_service(repository):
+    service = GameService()
+    service.hand_repository = service.hand_writer.repository = repository
+    service.live_hands.repository = service.live_hands.writer = repository
+    return service
+
+
+def instance(repository):
+    """One API instance with its own game service, over the shared repository."""
+    service = game_service(repository)
+    app = FastAPI()
+    app.include_router(hands.router, prefix="/api")
+    app.state.game_service = service
+    return TestClient(app)
+
+
+def test_stale_instance_gets_conflict_instead_of_losing_an_acked_action():
+    repository = SharedRepository()
+    first, second = instance(repository), instance(repository)
+    hand_id = first.post("/api/hands", json={"player_stacks": [1000] * 6}).json()["id"]
+    assert second.get(f"/api/hands/{hand_id}").status_code == 200
+
+    fold = first.post("/api/hands/action", json={"hand_id": hand_id, "player_position": 3, "action_type": "fold"})
+    assert fold.status_code == 200
+    call = second.post("/api/hands/action", json={"hand_id": hand_id, "player_position": 3, "action_type": "call"})
+    assert call.status_code == 409
+
+    stored = repository.hands[hand_id]
+    assert [(a.player_position, a.action_type) for a in stored.actions] == [(3, "fold")]
+    # The stale copy was dropped, so the next request reloads the stored hand.
+    assert len(second.get(f"/api/hands/{hand_id}").json()["actions"]) == 1
+
+
+def test_events_wait_for_a_failed_write_to_be_retried():
+    async def run():
+        repository = SharedRepository()
+        service = game_service(repository)
+        hand = service.create_new_hand([1000] * 6)
+        assert await service.save_hand(hand)
+        subscription = service.events.subscribe(hand.id)
+
+        repository.failing = True
+        async with service.hand_lock(hand.id):
+            assert not await service.save_hand(service.add_action(hand, 3, "fold"))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.get(), 0.05)
+
+        repository.failing = False
+        assert await service.live_hands.flush() == 0
+        assert '"action":"fold"' in await asyncio.wait_for(subscription.get(), 1)
+
+    asyncio.run(run())
+
+
+def test_stale_cached_completed_hand_gets_conflict():
+    repository = SharedRepository()
+    first, second = instance(repository), instance(repository)
+    hand_id = first.post("/api/hands", json={"player_stacks": [1000] * 6}).json()["id"]
+    for position in (3, 4, 5, 0, 1):
+        response = first.post("/api/hands/action", json={"hand_id": hand_id, "player_position": position, "action_type": "fold"})
+        assert response.status_code == 200
+    assert response.json()["is_completed"]
+    # Both instances now serve the completed hand from their caches.
+    assert first.get(f"/api/hands/{hand_id}").status_code == 200
+    assert second.get(f"/api/hands/{hand_id}").status_code == 200
+
+    reveal = second.post("/api/hands/deal-cards", json={"hand_id": hand_id, "cards_by_position": {"2": "AhAd"}})
+    assert reveal.status_code == 200
+    stale = first.post("/api/hands/deal-cards", json={"hand_id": hand_id, "cards_by_position": {"2": "KhKd"}})
+    assert stale.status_code == 409
+
+    assert repository.hands[hand_id].players[2].hole_cards == "AhAd"
+    assert first.get(f"/api/hands/{hand_id}").json()["players"][2]["hole_cards"] == "AhAd"
+
+
+def test_write_behind_flush_keeps_the_final_version():
+    async def run():
+        repository = SharedRepository()
+        service = game_service(repository)
+        service.live_hands.write_behind = True
+        hand = service.create_new_hand([1000] * 6)
+        assert await service.save_hand(hand)
+
+        async with service.hand_lock(hand.id):
+            for position in (3, 4, 5):
+                hand = service.add_action(hand, position, "fold")
+                assert await service.save_hand(hand)
+        # Acknowledged but only buffered.
+        assert repository.hands[hand.id].version == 0
+        assert service.live_hands.stats()["dirty_hands"] == 1
+
+        assert await service.live_hands.flush() == 0
+        stored = repository.hands[hand.id]
+        assert stored.version == hand.version == 3
+        assert [a.player_position for a in stored.actions] == [3, 4, 5]
+
+        # The next change is checked against the flushed version.
+        async with service.hand_lock(hand.id):
+            assert await service.save_hand(service.add_action(hand, 0, "fold"))
+        assert await service.live_hands.flush() == 0
+        assert repository.hands[hand.id].version == 4
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.metrics import (
+    HTTP_REQUEST_DB_QUERIES, HTTP_REQUESTS, Counter, Histogram, MetricsMiddleware, Registry, count_query,
+    render_stats,
+)
+
+
+def test_counter_exposition():
+    registry = Registry()
+    plain = Counter("test_plain_total", "A counter without labels.", registry=registry)
+    labelled = Counter("test_errors_total", "Errors by kind.", ("kind",), registry=registry)
+    plain.inc()
+    plain.inc(2)
+    labelled.labels('say "hi"\\\n').inc()
+
+    assert registry.render().splitlines() == [
+        "# HELP test_plain_total A counter without labels.",
+        "# TYPE test_plain_total counter",
+        "test_plain_total 3",
+        "# HELP test_errors_total Errors by kind.",
+        "# TYPE test_errors_total counter",
+        'test_errors_total{kind="say \\"hi\\"\\\\\\n"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative_and_upper_inclusive():
+    registry = Registry()
+    histogram = Histogram("test_seconds", "Durations.", ("route",), buckets=(0.5, 0.1), registry=registry)
+    for value in (0.05, 0.1, 0.3, 7.0):
+        histogram.labels("/a").observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="0.5"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 7.45',
+        'test_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_wrong_label_count_is_rejected():
+    histogram = Histogram("test_labels_seconds", "Durations.", ("method", "route"), registry=Registry())
+    with pytest.raises(ValueError):
+        histogram.labels("GET")
+
+
+def test_collectors_are_appended_and_a_broken_one_is_skipped():
+    registry = Registry()
+    Counter("test_total", "Count.", registry=registry).inc()
+
+    def broken():
+        raise RuntimeError("collector failed")
+
+    registry.add_collector(broken)
+    registry.add_collector(lambda: render_stats("test_cache", {"hits": 2, "ratio": 0.5, "name": "lru"}))
+    assert registry.render().endswith(
+        "test_total 1\n"
+        "# TYPE test_cache_hits gauge\ntest_cache_hits 2\n"
+        "# TYPE test_cache_ratio gauge\ntest_cache_ratio 0.5\n"
+    )
+    assert render_stats("test_cache", None) == "" and render_stats("test_cache", {"name": "lru"}) == ""
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: str):
+        count_query()
+        count_query()
+        return {"id": thing_id}
+
+    client = TestClient(MetricsMiddleware(app))
+    requests = HTTP_REQUESTS.labels("GET", "/things/{thing_id}", 200)
+    before = requests.value
+    queries = HTTP_REQUEST_DB_QUERIES.labels("GET", "/things/{thing_id}")
+    two_queries = queries.counts[queries.bounds.index(2)]
+
+    assert client.get("/things/a").status_code == 200
+    assert client.get("/things/b").status_code == 200
+    assert client.get("/nowhere").status_code == 404
+    assert requests.value == before + 2
+    assert queries.counts[queries.bounds.index(2)] == two_queries + 2
+    assert HTTP_REQUESTS.labels("GET", "unmatched", 404).value >= 1
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.models.codec import HandStreamDecoder, encode_stream
+from app.models.game import InvalidHandError
+from app.models.phh import PHHSDecoder, hands_to_phhs
+from app.routes import hands
+from app.services.game_service import GameService
+
+
+def folded_hands(count: int):
+    service = GameService()
+    result = []
+    for _ in range(count):
+        hand = service.create_new_hand([1000] * 6)
+        service.deal_hole_cards(hand, {2: "AhKd"})
+        for position in (3, 4, 5, 0, 1):
+            hand = service.add_action(hand, position, "fold")
+        result.append(hand)
+    return result
+
+
+def decode(document: str):
+    decoder = PHHSDecoder()
+    return decoder.feed(document) + decoder.close()
+
+
+def test_valid_document_round_trips():
+    exported = folded_hands(2)
+    imported = decode(hands_to_phhs(exported))
+    assert [hand.id for hand in imported] == [hand.id for hand in exported]
+    assert imported[0].players[2].hole_cards == "AhKd"
+
+
+@pytest.mark.parametrize("bad, expected", [
+    ('"d dh p2 AhKd"', '"d dh p2 AhAh"'),
+    ('"d dh p2 AhKd"', '"d dh p2 AhXx"'),
+    ('_board_cards = ""', '_board_cards = "AhKd2c"'),
+    ("[1000, 1000, 1000, 1000, 1000, 1000]", "[1000, 1000, 1000, 1000, 1000]"),
+])
+def test_invalid_hand_is_rejected_with_its_index(bad, expected):
+    document = hands_to_phhs(folded_hands(3)).split("[2]\n")
+    document[1] = document[1].replace(bad, expected, 1)
+    with pytest.raises(InvalidHandError) as raised:
+        decode("[2]\n".join(document))
+    assert raised.value.index == 1
+
+
+def test_binary_stream_hands_are_validated():
+    stream = folded_hands(2)
+    stream[1].board_cards = "AhKd"  # AhKd is also p2's holding
+    decoder = HandStreamDecoder()
+    with pytest.raises(InvalidHandError) as raised:
+        decoder.feed(b"".join(encode_stream(stream)))
+    assert raised.value.index == 1
+
+
+class ImportRepository:
+    def __init__(self):
+        self.hands = []
+
+    async def bulk_insert_hands(self, batch):
+        self.hands.extend(batch)
+        return len(batch)
+
+
+def test_import_endpoint_names_the_bad_hand():
+    service = GameService()
+    service.hand_repository = ImportRepository()
+    app = FastAPI()
+    app.include_router(hands.router, prefix="/api")
+    app.state.game_service = service
+    sections = hands_to_phhs(folded_hands(3)).split("[3]\n")
+    document = sections[0] + "[3]\n" + sections[1].replace('"d dh p2 AhKd"', '"d dh p2 KdKd"')
+    response = TestClient(app).post("/api/hands/import?format=phh", content=document)
+    assert response.status_code == 400
+    assert response.json()["detail"]["index"] == 2
+    # The bad hand was in the first batch, so nothing was written.
+    assert service.hand_repository.hands == []
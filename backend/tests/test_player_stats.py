@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from app.repositories.stats_repository import STAT_COLUMNS, record_hands_params
+from app.services.game_service import GameService
+from app.services.player_stats import SeatStats, StatsRecorder, hand_stat_rows, stats_summary
+
+
+def play(service: GameService, streets):
+    hand = service.create_new_hand([1000] * 6)
+    service.deal_hole_cards(hand, {0: "2c7d", 1: "3c8d", 2: "QhQd", 3: "AhKh", 4: "4c9d", 5: "JsTs"})
+    for board, actions in streets:
+        if board:
+            service.deal_board_cards(hand, board)
+        for position, action_type, amount in actions:
+            hand = service.add_action(hand, position, action_type, amount)
+    assert hand.is_completed
+    return hand
+
+
+def raised_to_showdown(service: GameService):
+    # Seat 3 opens, 5 and the big blind call; 3 bets the flop, 5 raises and
+    # 3 calls, then both check down.
+    return play(service, [
+        ("", [(3, "raise", 120), (4, "fold", 0), (5, "call", 0), (0, "fold", 0), (1, "fold", 0), (2, "call", 0)]),
+        ("2s5d9h", [(2, "check", 0), (3, "bet", 200), (5, "raise", 600), (2, "fold", 0), (3, "call", 0)]),
+        ("2s5d9hKc", [(3, "check", 0), (5, "check", 0)]),
+        ("2s5d9hKc3h", [(3, "check", 0), (5, "check", 0)]),
+    ])
+
+
+def folded_to_the_big_blind(service: GameService):
+    return play(service, [("", [(position, "fold", 0) for position in (3, 4, 5, 0, 1)])])
+
+
+def counters(rows):
+    return {row.position: tuple(row)[3:] for row in rows}
+
+
+def test_seat_counters_of_a_hand_to_showdown():
+    hand = raised_to_showdown(GameService())
+    rows = hand_stat_rows(hand)
+    assert [row.player_name for row in rows] == [f"Player {i}" for i in range(1, 7)]
+    assert all(row.hand_id == hand.id for row in rows)
+    # vpip, pfr, postflop_aggressive, postflop_calls, showdown, showdown_won, won, net
+    assert counters(rows) == {
+        0: (0, 0, 0, 0, 0, 0, 0, 0),
+        1: (0, 0, 0, 0, 0, 0, 0, -20),
+        2: (1, 0, 0, 0, 0, 0, 0, -120),
+        3: (1, 1, 1, 1, 1, 1, 1, 860),
+        4: (0, 0, 0, 0, 0, 0, 0, 0),
+        5: (1, 0, 1, 0, 1, 0, 0, -720),
+    }
+    assert sum(row.net_winnings for row in rows) == 0
+
+
+def test_blinds_alone_are_not_voluntary():
+    rows = hand_stat_rows(folded_to_the_big_blind(GameService()))
+    assert counters(rows)[2] == (0, 0, 0, 0, 0, 0, 1, 20)
+    assert counters(rows)[1] == (0, 0, 0, 0, 0, 0, 0, -20)
+    assert not any(row.showdown for row in rows)
+
+
+def rollup(rows):
+    """player_stats rows as RECORD_HANDS_QUERY sums them, per player and seat."""
+    totals = {}
+    for row in rows:
+        total = totals.setdefault((row.player_name, row.position), dict.fromkeys(STAT_COLUMNS, 0))
+        total["hands"] += 1
+        for column, value in zip(STAT_COLUMNS[1:], tuple(row)[3:]):
+            total[column] += value
+    return totals
+
+
+def test_summary_rates_of_a_rollup():
+    service = GameService()
+    rows = [row for hand in (raised_to_showdown(service), folded_to_the_big_blind(service), raised_to_showdown(service))
+            for row in hand_stat_rows(hand)]
+    seat_three = stats_summary(rollup(rows)[("Player 4", 3)])
+    assert (seat_three["hands"], seat_three["vpip_hands"], seat_three["showdowns"]) == (3, 2, 2)
+    assert seat_three["vpip"] == seat_three["pfr"] == seat_three["went_to_showdown"] == 0.6667
+    assert seat_three["aggression_factor"] == 1.0
+    assert seat_three["won_at_showdown"] == 1.0
+    # 1720 chips over 3 hands with a 40 chip big blind.
+    assert seat_three["bb_per_100"] == pytest.approx(1720 / 40 / 3 * 100, abs=0.01)
+
+    seat_five = stats_summary(rollup(rows)[("Player 6", 5)])
+    assert seat_five["aggression_factor"] is None
+    assert seat_five["won_at_showdown"] == 0.0
+
+
+def test_summary_of_an_empty_rollup_has_no_rates():
+    summary = stats_summary(dict.fromkeys(STAT_COLUMNS, 0))
+    assert all(summary[rate] is None for rate in (
+        "vpip", "pfr", "aggression_factor", "went_to_showdown", "won_at_showdown", "bb_per_100",
+    ))
+
+
+def test_record_params_are_one_array_per_field():
+    rows = hand_stat_rows(folded_to_the_big_blind(GameService()))
+    params = record_hands_params(rows)
+    assert len(params) == len(SeatStats._fields)
+    assert params[2] == [0, 1, 2, 3, 4, 5] and params[-1] == [row.net_winnings for row in rows]
+    assert record_hands_params([]) == ([],) * len(SeatStats._fields)
+
+
+class FlakyStatsRepository:
+    def __init__(self):
+        self.rows = []
+        self.fail = True
+
+    async def record_hands(self, rows):
+        if self.fail:
+            self.fail = False
+            raise ConnectionError("database went away")
+        self.rows.extend(rows)
+        return len(rows)
+
+
+def test_recorder_keeps_hands_queued_until_a_flush_succeeds():
+    async def run():
+        service = GameService()
+        repository = FlakyStatsRepository()
+        recorder = StatsRecorder(repository, flush_interval=60)
+        hand = raised_to_showdown(service)
+        await recorder.record(hand)
+        await recorder.record(hand)
+        assert await recorder.flush() is False
+        assert recorder.stats()["pending_hands"] == 1
+        assert await recorder.flush() is True
+        assert len(repository.rows) == 6 and recorder.stats()["recorded"] == 1
+
+    asyncio.run(run())
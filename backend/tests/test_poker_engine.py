@@ -0,0 +1,38 @@
+from app.services.game_service import GameService
+from app.services.poker_engine import PokerEngine
+
+HOLE_CARDS = {0: "AhKs", 1: "QdJc", 2: "9h8s", 3: "7c6d", 4: "5h4s", 5: "3c2d"}
+
+
+def play_to_showdown(service, hand):
+    """Three folds, the blinds and the dealer check it down; returns the hand before the last check."""
+    for position, action in ((3, "fold"), (4, "fold"), (5, "fold"), (0, "call"), (1, "call"), (2, "check")):
+        hand = service.add_action(hand, position, action)
+    for board in ("AdKd2c", "AdKd2c3h", "AdKd2c3h7s"):
+        hand = service.deal_board_cards(hand, board)
+        for position in (1, 2, 0):
+            if board == "AdKd2c3h7s" and position == 0:
+                return hand
+            hand = service.add_action(hand, position, "check")
+    return hand
+
+
+def test_settle_refuses_showdown_with_unknown_hole_cards():
+    service = GameService()
+    hand = play_to_showdown(service, service.create_new_hand([1000] * 6))
+    session = PokerEngine().create_session(hand)
+    hand = service.add_action(hand, 0, "check")
+    session.apply(hand, hand.actions[-1])
+    assert session.is_finished()
+    assert session.settle(hand) is None
+
+
+def test_settle_pays_known_showdown_and_sums_to_zero():
+    service = GameService()
+    hand = service.deal_hole_cards(service.create_new_hand([1000] * 6), HOLE_CARDS)
+    hand = play_to_showdown(service, hand)
+    session = PokerEngine().create_session(hand)
+    hand = service.add_action(hand, 0, "check")
+    session.apply(hand, hand.actions[-1])
+    winnings = session.settle(hand)
+    assert winnings == {0: 80, 1: -40, 2: -40, 3: 0, 4: 0, 5: 0}
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from app.services import preflop_equity
+from app.services.preflop_equity import (
+    CLASS_COUNT, CLASS_NAMES, TABLE_SHAPE, PreflopEquityTable, build_table, class_combos, hand_class,
+)
+
+
+@pytest.fixture(scope="module")
+def table() -> PreflopEquityTable:
+    try:
+        return PreflopEquityTable()
+    except FileNotFoundError:
+        pytest.skip("no preflop equity table built (python -m app.services.preflop_equity)")
+
+
+def test_classes_cover_every_holding_once():
+    combos = [class_combos(index) for index in range(CLASS_COUNT)]
+    assert sum(len(c) for c in combos) == 52 * 51 // 2
+    assert sorted(len(c) for c in combos) == [4] * 78 + [6] * 13 + [12] * 78
+    assert len({pair for c in combos for pair in c}) == 52 * 51 // 2
+    for hole, name in (("AhAs", "AA"), ("KsAs", "AKs"), ("Ah7d", "A7o"), ("2c3c", "32s"), ("2d2c", "22")):
+        assert CLASS_NAMES[hand_class(hole)] == name
+        assert hand_class(hole[2:] + hole[:2]) == hand_class(hole)
+    with pytest.raises(ValueError):
+        hand_class("AhAh")
+
+
+def test_build_mirrors_the_sampled_upper_triangle(monkeypatch):
+    rng = np.random.default_rng(5)
+
+    def sampled_row(args):
+        index, _, _ = args
+        row = np.zeros(TABLE_SHAPE[1:], dtype=np.float32)
+        tie = rng.uniform(0, 0.1, CLASS_COUNT)
+        win = rng.uniform(0, 1 - tie)
+        row[:, 1], row[:, 2] = np.append(win, np.zeros(5)), np.append(tie, np.zeros(5))
+        row[:, 0] = row[:, 1] + row[:, 2] / 2
+        # Only the upper triangle is sampled; the rest must not leak through.
+        row[:index] = np.nan
+        return row
+
+    monkeypatch.setattr(preflop_equity, "_sample_row", sampled_row)
+    check_symmetry(build_table(samples=1))
+
+
+def test_built_table_is_symmetric(table):
+    check_symmetry(table.table)
+
+
+def test_heads_up_lookups(table):
+    for hole, other in (("AhKh", "QdQc"), ("AsAd", "7c2h"), ("9s8s", "AdKc")):
+        equity, win, tie = table.heads_up(hole, other)
+        other_equity, other_win, other_tie = table.heads_up(other, hole)
+        assert equity + other_equity == pytest.approx(1, abs=1e-6)
+        assert win + other_win + tie == pytest.approx(1, abs=1e-6) and tie == other_tie
+    assert table.heads_up("AsAd", "KhKc")[0] > 0.75
+    assert table.heads_up("AhKh", "Ah2c")[0] == table.heads_up("AsKs", "Ad2h")[0]
+    assert table.heads_up("7h7d", "7s7c")[0] == 0.5
+    field = [table.versus_field("AsAd", opponents)[0] for opponents in range(1, 6)]
+    assert field == sorted(field, reverse=True)
+
+
+def check_symmetry(values: np.ndarray):
+    assert values.shape == TABLE_SHAPE and values.dtype == np.float32
+    heads_up = values[:, :CLASS_COUNT]
+    equity, win, tie = heads_up[..., 0], heads_up[..., 1], heads_up[..., 2]
+    assert not np.isnan(heads_up).any()
+    assert np.allclose(equity + equity.T, 1, atol=1e-6)
+    assert np.array_equal(tie, tie.T)
+    assert np.allclose(win + win.T + tie, 1, atol=1e-6)
+    assert np.all(np.diagonal(equity) == 0.5)
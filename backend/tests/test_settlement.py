@@ -0,0 +1,72 @@
+import random
+import pytest
+from app.models.cards import RANKS, SUITS
+from app.services.game_service import GameService
+from app.services.settlement import settle_hand, settle_hands, showdown_cards_known
+
+DECK = [rank + suit for rank in RANKS for suit in SUITS]
+
+
+def showdown(invested, hole_cards, board="2c7d9hJc3s", folded=()):
+    """A completed hand with the given investments, cards and folds per position."""
+    hand = GameService().create_new_hand([1000] * 6)
+    for player in hand.players:
+        player.total_invested = invested.get(player.position, 0)
+        player.stack = 1000 - player.total_invested
+        player.current_bet = 0
+        player.hole_cards = hole_cards.get(player.position)
+        player.is_folded = player.position in folded or player.position not in invested
+    hand.board_cards = board
+    hand.is_completed = True
+    return hand
+
+
+def test_side_pot_goes_to_the_best_hand_that_covered_it():
+    # Position 0 is all in for 100 with the best hand; 1 beats 2 for the side pot.
+    hand = showdown({0: 100, 1: 300, 2: 300}, {0: "AhAs", 1: "KhKs", 2: "QhQs"})
+    assert settle_hand(hand) == {0: 200, 1: 100, 2: -300, 3: 0, 4: 0, 5: 0}
+
+
+def test_folded_chips_stay_in_the_pot():
+    hand = showdown({0: 100, 1: 300, 2: 300, 3: 50}, {0: "AhAs", 1: "KhKs", 2: "QhQs"}, folded=(3,))
+    assert settle_hand(hand) == {0: 250, 1: 100, 2: -300, 3: -50, 4: 0, 5: 0}
+
+
+def test_unknown_contender_cards_are_not_settled_unless_split():
+    hand = showdown({0: 100, 1: 300, 2: 300}, {0: "AhAs", 1: "KhKs"})
+    assert not showdown_cards_known(hand)
+    assert settle_hands([hand]) == [None]
+    with pytest.raises(ValueError):
+        settle_hand(hand)
+    # Every contender ranks the same, so each pot is split among those eligible for it.
+    assert settle_hand(hand, split_unknown=True) == {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+
+
+def test_unknown_cards_of_an_uncontested_winner_do_not_matter():
+    hand = showdown({0: 40, 1: 100}, {}, folded=(0,))
+    assert showdown_cards_known(hand)
+    assert settle_hand(hand) == {0: -40, 1: 40, 2: 0, 3: 0, 4: 0, 5: 0}
+
+
+def test_settlement_is_zero_sum():
+    rng = random.Random(5)
+    hands = []
+    for _ in range(300):
+        cards = rng.sample(DECK, 17)
+        invested = {position: rng.choice((0, 20, 40, 100, 250, 1000)) for position in range(6)}
+        invested = {position: amount for position, amount in invested.items() if amount}
+        folded = [position for position in invested if rng.random() < 0.3]
+        hole_cards = {position: cards[2 * position] + cards[2 * position + 1] for position in range(6)}
+        hands.append(showdown(invested, hole_cards, "".join(cards[12:]), folded))
+    for hand, winnings in zip(hands, settle_hands(hands)):
+        assert sum(winnings.values()) == 0
+        assert all(winnings[p.position] >= -p.total_invested for p in hand.players)
+
+
+def test_complete_hand_splits_showdown_with_unknown_cards():
+    service = GameService()
+    hand = showdown({0: 100, 1: 300, 2: 300}, {0: "AhAs", 1: "KhKs"})
+    hand.is_completed = False
+    hand = service.complete_hand(hand)
+    assert hand.is_completed
+    assert hand.winnings == {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
@@ -0,0 +1,60 @@
+from collections import Counter
+import uuid
+import pytest
+from app.services.sharding import HashRing, ShardMap
+
+KEYS = [str(uuid.UUID(int=i * 7919 + 1)) for i in range(20000)]
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in KEYS if before.shard_for(key) != after.shard_for(key)]
+    assert all(after.shard_for(key) == "d" for key in moved)
+    # About a quarter of the keys go to the new shard.
+    assert 0.18 < len(moved) / len(KEYS) < 0.32
+
+
+def test_removing_a_shard_only_moves_its_keys():
+    before = HashRing(["a", "b", "c", "d"])
+    after = HashRing(["a", "b", "d"])
+    for key in KEYS:
+        if before.shard_for(key) != "c":
+            assert after.shard_for(key) == before.shard_for(key)
+
+
+def test_placement_ignores_shard_order_and_spreads_keys():
+    ring = HashRing(["a", "b", "c"])
+    assert [ring.shard_for(key) for key in KEYS[:500]] == [HashRing(["c", "a", "b"]).shard_for(key) for key in KEYS[:500]]
+    shares = Counter(ring.shard_for(key) for key in KEYS)
+    assert all(0.25 < count / len(KEYS) < 0.42 for count in shares.values())
+
+
+def test_empty_ring_is_rejected():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_shard_map_routes_to_the_owner():
+    shards = {"a": "http://worker-a:8000", "b": "http://worker-b:8000"}
+    local = ShardMap(shards, "a")
+    remote = ShardMap(shards, "b")
+    for key in KEYS[:200]:
+        owner = local.owner(key)
+        assert local.is_local(key) == (owner == "a") and remote.is_local(key) == (owner == "b")
+        assert local.url_for(key, f"/api/hands/{key}") == f"{shards[owner]}/api/hands/{key}"
+
+
+def test_unsharded_map_owns_everything():
+    shard_map = ShardMap()
+    assert shard_map.owner(KEYS[0]) is None and shard_map.is_local(KEYS[0])
+    with pytest.raises(ValueError):
+        ShardMap({"a": "http://worker-a:8000"}, "z")
+
+
+def test_shard_map_from_env(monkeypatch):
+    monkeypatch.setenv("SHARDS", " a=http://worker-a:8000/ , b=http://worker-b:8000,")
+    monkeypatch.setenv("SHARD_ID", "b")
+    shard_map = ShardMap.from_env()
+    assert shard_map.shards == {"a": "http://worker-a:8000", "b": "http://worker-b:8000"}
+    assert shard_map.local_id == "b"
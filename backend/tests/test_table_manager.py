@@ -0,0 +1,50 @@
+import asyncio
+from app.models.table import Table
+from app.services.table_manager import TableManager
+
+
+class TableRepository:
+    def __init__(self):
+        self.saved = []
+
+    async def get_table_by_id(self, table_id):
+        return None
+
+    async def save_table(self, table):
+        self.saved.append(table.id)
+        return True
+
+
+def test_unknown_tables_get_no_lock():
+    async def run():
+        manager = TableManager(game_service=None, repository=TableRepository())
+        for i in range(100):
+            async with manager.locked_table(f"missing-{i}") as table:
+                assert table is None
+        assert len(manager._locks) == 0
+
+    asyncio.run(run())
+
+
+def test_table_closed_while_waiting_for_its_lock():
+    async def run():
+        manager = TableManager(game_service=None, repository=TableRepository())
+        table = Table(id="t1", player_names=[f"P{i}" for i in range(6)], stacks=[1000] * 6, buy_in=1000)
+        manager._tables[table.id] = table
+        seen = []
+
+        async def close():
+            async with manager.locked_table("t1") as held:
+                await asyncio.sleep(0.01)
+                await manager.close_table(held)
+
+        async def use():
+            await asyncio.sleep(0)
+            async with manager.locked_table("t1") as held:
+                seen.append(held)
+
+        await asyncio.gather(close(), use())
+        assert seen == [None]
+        assert len(manager._locks) == 0
+
+    asyncio.run(run())